@@ -1,15 +1,21 @@
 ﻿# Importing necessary libraries
 from requests_oauthlib import OAuth2Session
 from dotenv import load_dotenv
-import json
 import webbrowser
 import os
+import threading
 import colorama
 from colorama import Fore, Style, Back
-import requests # For non-authenticated requests (like the manifest)
-import sqlite3  # For interacting with the SQLite database
-import zipfile  # For handling the .zip file
-import io       
+from manifest_packed import open_manifest_reader, reader_is_current
+from api_cache import create_response_cache
+from rate_limiter import RequestScheduler, INTERACTIVE, endpoint_family
+from api_pipeline import FetchPipeline, format_timings
+from http_client import configure_session, http_metrics
+from instrumentation import METRICS_ENABLED, count, request_timings, server_timing_header, start_request_timings, timed
+from json_stream import STREAM_CHUNK_SIZE, iter_json
+from profile_model import PROFILE_STREAM_PATHS, PROFILE_STREAMING, collect_profile, parse_profile, profile_components_param
+from manifest_store import ensure_manifest
+from token_store import OAuthTokens, TokenStore
 
 # Load environment variables
 load_dotenv()
@@ -40,10 +46,20 @@ REDIRECT_URL = "https://github.com/JCassarino/Conflux"
 TOKEN_URL = f"{BASE_API_URL}/app/oauth/token/"
 GET_USER_DETAILS_ENDPOINT = f"{BASE_API_URL}/User/GetCurrentBungieNetUser/"
 GET_DESTINY_PROFILE_ENDPOINT_TEMPLATE = f"{BASE_API_URL}/Destiny2/{{}}/Profile/{{}}/" # Templated: use .format(membership_type, membership_id)
-GET_MANIFEST_ENDPOINT = f"{BASE_API_URL}/Destiny2/Manifest/"
 
 # Manifest
 MANIFEST_DB_PATH = None  # This will be set after downloading the manifest
+MANIFEST_READER = None  # Long-lived reader over MANIFEST_DB_PATH, created on first query
+MANIFEST_READER_LOCK = threading.Lock()  # Serializes replacing MANIFEST_READER
+
+# Cache of API responses (see api_cache.py); configured through API_CACHE_BACKEND.
+API_CACHE = create_response_cache()
+
+# Every Bungie call goes through the rate limiter (see rate_limiter.py).
+API_SCHEDULER = RequestScheduler()
+
+# Key the command line app's token is saved under in the encrypted token store (see token_store.py).
+CLI_TOKEN_KEY = "cli"
 
 def load_credentials():
     """Loads API credentials from environment variables."""
@@ -103,24 +119,41 @@ def perform_oauth_flow(client_id_val, client_secret_val):
         return None
 
 
-def get_api_data(current_session, url, headers, params=None):
+def get_api_data(current_session, url, headers, params=None, priority=INTERACTIVE, stream_paths=None):
     """
     Generalized function that performs a GET request on a Bungie API endpoint.
+    Responses are served from API_CACHE while fresh, and revalidated with conditional requests once stale.
+    Upstream calls are rate limited by API_SCHEDULER, which retries throttled calls; priority orders queued calls.
     Returns the parsed JSON response if successful; None if an error occurs.
+    Streaming mode (stream_paths given) bypasses the cache and instead returns a generator of (path, value) for the
+    matching parts of the body as they arrive (see json_stream.iter_json).
     """
 
     # print(f"Calling API: {url} with params: {params if params else 'None'}") # Uncomment for debugging
 
+    # Every session shares the process-wide connection pool, default timeouts and compression settings.
+    configure_session(current_session)
+
+    endpoint = endpoint_family(url)
     try:
-        response = current_session.get(url=url, headers=headers, params=params)
-        response.raise_for_status()  # Raises an HTTPError for bad responses (4XX or 5XX)
-        parsed_response = response.json()
-        # print(f"API Call Successful. Status: {response.status_code}") # Uncomment for debugging
+        with timed("api_request_seconds", endpoint=endpoint):
+            if stream_paths:
+                response = API_SCHEDULER.send(current_session, url, headers, params, priority, stream=True)
+                response.raise_for_status()
+                return iter_json(response.iter_content(STREAM_CHUNK_SIZE), stream_paths)
+
+            send = lambda session, url, headers, params: API_SCHEDULER.send(session, url, headers, params, priority)
+            parsed_response = API_CACHE.get_json(current_session, url, headers, params, send)  # Raises an HTTPError for bad responses (4XX or 5XX)
+
+        # Bungie reports some failures as HTTP 200 with a non-success ErrorCode.
+        if isinstance(parsed_response, dict) and parsed_response.get('ErrorCode', 1) != 1:
+            count("api_errors_total", endpoint=endpoint, code=parsed_response['ErrorCode'])
         return parsed_response
     except Exception as e:
         print(f"ERROR during API call to {url}: {e}")
         if hasattr(e, 'response') and e.response is not None:
             print(f"API Error Details: {e.response.text}")
+        count("api_errors_total", endpoint=endpoint, code=e.response.status_code if getattr(e, 'response', None) is not None else type(e).__name__)
         return None
 
 
@@ -157,10 +190,10 @@ def select_destiny_profile(parsed_linked_profiles_val):
     }
 
 
-def get_character_info(session, headers, destiny_profile):
+def get_profile(session, headers, destiny_profile, components=("Characters",)):
     """
-    Fetches character data for a given Destiny profile.
-    Returns character data or None if it fails.
+    Fetches a Destiny profile with every requested component (see profile_model.COMPONENTS) in a single call.
+    Returns a Profile or None if it fails.
     """
 
     membership_type =  destiny_profile['membership_type']
@@ -172,95 +205,100 @@ def get_character_info(session, headers, destiny_profile):
 
     # Build the Destiny profile endpoint URL using the provided membership type and ID
     destiny_profile_url = GET_DESTINY_PROFILE_ENDPOINT_TEMPLATE.format(membership_type, membership_id)
-    profile_components = {'components': '200'}
-
-    # Call the API to get the Destiny profile data. Component 200 returns basic character info for all characters on a profile.
+    profile_components = {'components': profile_components_param(components)}
+
+    # Large profiles can be parsed as they arrive, without ever holding the whole response.
+    if PROFILE_STREAMING:
+        try:
+            events = get_api_data(session, destiny_profile_url, headers, params=profile_components, stream_paths=PROFILE_STREAM_PATHS)
+            profile = collect_profile(events, membership_type, membership_id) if events else None
+        except Exception as e:
+            print(f"{ERROR}Failed to stream Destiny profile: {e}")
+            return None
+        if not profile or not profile.characters:
+            print(ERROR + "Failed to retrieve Destiny profile or character list.")
+            return None
+        return profile
+
+    # Call the API to get the Destiny profile data, all components at once.
     profile_data = get_api_data(session, destiny_profile_url, headers, params=profile_components)
 
     if not profile_data or "Response" not in profile_data or "characters" not in profile_data["Response"]:
         print(ERROR + "Failed to retrieve Destiny profile or character list.")
         return None
-    
-    return profile_data.get("Response", {}).get("characters", {}).get("data")
+
+    # Only the compact model is kept; the raw response dicts are dropped here.
+    return parse_profile(profile_data["Response"], membership_type, membership_id)
 
 
-def get_manifest_location(headers):
+def linked_profiles_url_for(bnet_membership_id):
     """
-    Fetches the location of the latest manifest file from Bungie API
+    Builds the LinkedProfiles URL for a Bungie.net membership id.
     """
 
-    # Tries to fetch the manifest URL from the Bungie API. If fails, an HTTP Error is raised. If successful, it returns the manifest URL.
-    try:
-        manifest_response = requests.get(GET_MANIFEST_ENDPOINT, headers=headers)
-        manifest_response.raise_for_status() 
-        manifest_url = BASE_BUNGIE_URL + manifest_response.json()['Response']['mobileWorldContentPaths']['en']
-
-    except Exception as e: 
-        print(f"{ERROR}Failed to fetch manifest loation: {e}")
-        return None
-
-    return manifest_url
+    # Using membershipType 254 (BungieNext) to get linked profiles.
+    return f"{BASE_API_URL}/Destiny2/254/Profile/{bnet_membership_id}/LinkedProfiles/"
 
 
-def download_manifest(manifest_url):
+def get_manifest_reader():
     """
-    Downloads the Destiny 2 manifest file from the provided URL. Extracts the contents and saves them to a local SQLite database.
-    Returns the path to the SQLite database file or None if it fails.
+    Returns the shared ManifestReader for the current manifest database, replacing it if the database has changed.
+    The swap happens under a lock, and the old reader isn't closed: threads still querying it keep it alive, and its
+    connections close once the last of them lets go of it.
     """
 
-    try:
-        # Downloading the manifest file.
-        response = requests.get(manifest_url)
-
-        # Extracting the contents of the zip file
-        with zipfile.ZipFile(io.BytesIO(response.content)) as manifest_zip:
-            files = manifest_zip.namelist()
-            manifest_zip.extract(files[0])
-
-        return files[0]
-
-
-
-    except Exception as e:
-        print(f"{ERROR}Failed to download or extract manifest: {e}")
-        return None
+    global MANIFEST_READER
+    reader = MANIFEST_READER
+    if reader_is_current(reader, MANIFEST_DB_PATH):
+        return reader
+    with MANIFEST_READER_LOCK:
+        if not reader_is_current(MANIFEST_READER, MANIFEST_DB_PATH):
+            MANIFEST_READER = open_manifest_reader(MANIFEST_DB_PATH)
+        return MANIFEST_READER
 
 
 def query_manifest(table_name, hash_id):
     """
     Given a table name and hash ID, queries the local SQLite database for the corresponding data.
+    Lookups go through a pooled, cached ManifestReader rather than opening a new connection each time.
     """
 
     try:
+        with timed("manifest_query_seconds", table=table_name):
+            return get_manifest_reader().get(table_name, hash_id)
 
-        # .connect is opening the SQLite database file. Also creates a cursor object to execute SQL queries.
-        con = sqlite3.connect(MANIFEST_DB_PATH)
-        cur = con.cursor()
-
-        # Converting hash_id
-        if hash_id > 2147483647:
-            hash_id = hash_id - 4294967296
-
-        # Template SQL query string to fetch the JSON data for the passed hash ID from the passed table.
-        query_str = f"SELECT json FROM {table_name} WHERE id = ?"
-
-        cur.execute(query_str, (hash_id,))
+    except Exception as e:
+        print(f"{ERROR}Error querying manifest database: {e}")
+        return None
 
-        result = cur.fetchone()
 
-        con.close()
+def query_manifest_hot(hashes_by_table):
+    """
+    Looks up the hot fields (name, icon, item type, ...) of many hashes in one pass, given a dict of {table_name: [hashes]}.
+    Served from the slim manifest index when it exists, so no definition JSON is decoded.
+    Returns a dict of {table_name: {hash: fields}}, or an empty dict if the lookup fails.
+    """
 
-        if result:
-            return json.loads(result[0])
+    try:
+        reader = get_manifest_reader()
+        definitions = {}
+        # One lookup per table either way; timing them separately gives per-table latency.
+        for table_name, hash_ids in hashes_by_table.items():
+            with timed("manifest_query_seconds", table=table_name):
+                definitions.update(reader.lookup_hot_many({table_name: hash_ids}))
+        return definitions
 
     except Exception as e:
         print(f"{ERROR}Error querying manifest database: {e}")
-        return None
+        return {}
 
 
 def main():
     """Main function to orchestrate the application flow."""
 
+    # Collects a timing breakdown of this run when METRICS_ENABLED is set.
+    start_request_timings()
+
     # Load API credentials using load_credentials(); Exits if any credential is missing.
     api_key_val, client_id_val, client_secret_val = load_credentials()
     if not api_key_val:
@@ -269,20 +307,35 @@ def main():
     # Header for API calls; Bungie requires an API key for all calls.
     additional_headers_val = {'X-API-KEY': api_key_val}
 
-    # Downloads the manifest database if it doesn't exist.
+    # Uses the locally stored manifest database, only downloading it when Bungie has published a new version.
+    # This runs in the background while the user goes through the OAuth flow.
+    pipeline = FetchPipeline()
     global MANIFEST_DB_PATH
     if not MANIFEST_DB_PATH:
-        MANIFEST_DB_PATH = download_manifest(get_manifest_location(additional_headers_val))
-
-    # Gets an authenticated session using perform_oauth_flow(); Exits if it fails.
-    authenticated_session = perform_oauth_flow(client_id_val, client_secret_val)
-    if not authenticated_session:
-        print("OAuth authorization failed. Exiting.")
-        return
+        pipeline.submit('manifest', ensure_manifest, additional_headers_val)
+
+    # Reuses the saved (and, if needed, refreshed) token from a previous run, so returning users skip the browser.
+    # Otherwise gets an authenticated session using perform_oauth_flow() and saves its token; Exits if it fails.
+    oauth_tokens = OAuthTokens(TokenStore(), TOKEN_URL, client_id_val, client_secret_val)
+    authenticated_session = oauth_tokens.session_for(CLI_TOKEN_KEY)
+    if authenticated_session:
+        print(f"{CHECK} Using your saved Bungie.net authorization.")
+    else:
+        authenticated_session = perform_oauth_flow(client_id_val, client_secret_val)
+        if not authenticated_session:
+            print("OAuth authorization failed. Exiting.")
+            return
+        oauth_tokens.store.save(CLI_TOKEN_KEY, authenticated_session.token)
+        authenticated_session = oauth_tokens.session_for(CLI_TOKEN_KEY, authenticated_session.token)
 
     # Fetches the current Bungie.net user details using the authenticated session.
-    #print("Fetching account information...")
-    parsed_user_details_val = get_api_data(authenticated_session, GET_USER_DETAILS_ENDPOINT, additional_headers_val)
+    # The token carries the Bungie.net membership id, so the linked profiles are fetched at the same time.
+    token_membership_id = authenticated_session.token.get('membership_id')
+    pipeline.submit('user', get_api_data, authenticated_session, GET_USER_DETAILS_ENDPOINT, additional_headers_val)
+    if token_membership_id:
+        pipeline.submit('linked', get_api_data, authenticated_session, linked_profiles_url_for(token_membership_id), additional_headers_val)
+
+    parsed_user_details_val = pipeline.result('user')
     if not parsed_user_details_val: return
     
     bnet_membership_id = parsed_user_details_val.get('Response', {}).get('membershipId')
@@ -292,43 +345,53 @@ def main():
         print(f"{ERROR}Could not find Bungie.net membershipId. Exiting.")
         return
 
-    # Using membershipType 254 (BungieNext) to get linked profiles.
-    linked_profiles_url = f"{BASE_API_URL}/Destiny2/254/Profile/{bnet_membership_id}/LinkedProfiles/"
-    parsed_linked_profiles_val = get_api_data(authenticated_session, linked_profiles_url, additional_headers_val)
+    if not token_membership_id:
+        pipeline.submit('linked', get_api_data, authenticated_session, linked_profiles_url_for(bnet_membership_id), additional_headers_val)
+    parsed_linked_profiles_val = pipeline.result('linked')
     
     selected_destiny_profile = select_destiny_profile(parsed_linked_profiles_val)
     if not selected_destiny_profile:
         print(ERROR + "Could not determine a Destiny profile to analyze.")
         return
 
-    character_data_dict = get_character_info(authenticated_session, additional_headers_val, selected_destiny_profile)
+    profile = get_profile(authenticated_session, additional_headers_val, selected_destiny_profile)
     
-    if not character_data_dict:
+    if not profile or not profile.characters:
         print("Could not retrieve character data.")
         return
 
+    if not MANIFEST_DB_PATH:
+        MANIFEST_DB_PATH = pipeline.result('manifest')
+
     # Final output
     print(f"Welcome, {INFO + bnet_display_name}!")
     print(ACTION + "Please select a character below to analyze:")
     print(BORDER)
     
-    for char_id, char_info in character_data_dict.items():
+    # Resolving every character's class and race up front, one query per table.
+    hashes_by_table = profile.hashes_by_table()
+    definitions = query_manifest_hot({
+        'DestinyClassDefinition': hashes_by_table['DestinyClassDefinition'],
+        'DestinyRaceDefinition': hashes_by_table['DestinyRaceDefinition']
+    })
 
-        class_hash = char_info.get('classHash')
-        race_hash = char_info.get('raceHash')
-        light = char_info.get('light')
+    for character in profile.characters.values():
 
-        # Querying the manifest for Guardian class.
-        class_dict = query_manifest('DestinyClassDefinition', class_hash)
+        class_hash = character.class_hash
+        race_hash = character.race_hash
+        light = character.light
+
+        # Looking up the Guardian class.
+        class_dict = definitions.get('DestinyClassDefinition', {}).get(class_hash)
         if class_dict:
-            class_str = class_dict['displayProperties']['name']
+            class_str = class_dict['name']
         else: 
             class_str = "Unknown Class"
 
-        # Querying the manifest for Guardian race.
-        race_dict = query_manifest('DestinyRaceDefinition', race_hash)
+        # Looking up the Guardian race.
+        race_dict = definitions.get('DestinyRaceDefinition', {}).get(race_hash)
         if race_dict:
-            race_str = race_dict['displayProperties']['name']
+            race_str = race_dict['name']
         else: 
             race_str = "Unknown Race"
 
@@ -336,5 +399,11 @@ def main():
     
     print(BORDER)
 
+    if os.getenv("API_TIMING_LOG"):
+        print(f"API timings: {format_timings(pipeline.timings)}")
+        print(f"HTTP: {http_metrics()}")
+    if METRICS_ENABLED:
+        print(f"Timing breakdown: {server_timing_header(request_timings())}")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,15 +1,28 @@
 # Importing necessary libraries
-from flask import Flask, render_template, request, redirect, session
+from flask import Flask, Response, render_template, request, redirect, session, g, url_for, jsonify, send_from_directory, stream_with_context, before_render_template, template_rendered
 from requests_oauthlib import OAuth2Session
 from dotenv import load_dotenv
 import json
+import mimetypes
+import queue
 import webbrowser
 import os
-import requests # For non-authenticated requests (like the manifest)
-import sqlite3  # For interacting with the SQLite database (manifest)
-import zipfile  # For handling the .zip file (manifest)
-import io       
+import re
+import threading
 import time
+from manifest_packed import MANIFEST_MODE, open_manifest_reader, reader_is_current
+from api_cache import create_response_cache
+from rate_limiter import RequestScheduler, INTERACTIVE, BACKGROUND, endpoint_family
+from api_pipeline import FetchPipeline, format_timings
+from http_client import configure_session, get_http_session, http_metrics
+from instrumentation import METRICS, METRICS_ENABLED, count, request_timings, server_timing_header, start_request_timings, timed
+from json_stream import STREAM_CHUNK_SIZE, iter_json
+from profile_model import DASHBOARD_COMPONENTS, EQUIPMENT_SLOTS, PROFILE_STREAM_PATHS, PROFILE_STREAMING, collect_profile, parse_profile, profile_components_param
+from manifest_store import ensure_manifest, get_manifest_info, read_current
+from token_store import OAuthTokens, TokenStore
+from render_cache import FragmentCache
+from global_data import DAILY, create_global_cache, next_reset
+from profile_prefetch import PREFETCH_KEEPALIVE, PREFETCH_STREAM_SECONDS, PREFETCH_STREAMS, ProfilePrefetcher, profile_changes, sse_event
 
 # Load environment variables
 load_dotenv()
@@ -24,10 +37,27 @@ REDIRECT_URL = os.getenv("REDIRECT_URL", "https://127.0.0.1:5000/callback")
 TOKEN_URL = f"{BASE_API_URL}/app/oauth/token/"
 GET_USER_DETAILS_ENDPOINT = f"{BASE_API_URL}/User/GetCurrentBungieNetUser/"
 GET_DESTINY_PROFILE_ENDPOINT_TEMPLATE = f"{BASE_API_URL}/Destiny2/{{}}/Profile/{{}}/"
-GET_MANIFEST_ENDPOINT = f"{BASE_API_URL}/Destiny2/Manifest/"
+GET_PUBLIC_MILESTONES_ENDPOINT = f"{BASE_API_URL}/Destiny2/Milestones/"
+GET_PUBLIC_VENDORS_ENDPOINT = f"{BASE_API_URL}/Destiny2/Vendors/"
 MANIFEST_DB_PATH = None
+MANIFEST_READER = None
+MANIFEST_READER_LOCK = threading.Lock()
 LAST_MANIFEST_CHECK = 0
 MANIFEST_CACHE_DURATION = 3600
+API_CACHE = create_response_cache()
+API_SCHEDULER = RequestScheduler()
+OAUTH_TOKENS = OAuthTokens(TokenStore(), TOKEN_URL, os.getenv("CLIENT_ID"), os.getenv("CLIENT_SECRET"))
+RENDER_CACHE = FragmentCache()
+# Data that is the same for every player, fetched once per daily/weekly reset window (see global_data.py).
+GLOBAL_DATA = create_global_cache()
+# "external": pages <use> icons from the content-hashed sprite by URL, so browsers cache it and it stays out of the HTML.
+# "inline": pages inline a subset holding only the icons their template uses. Both are written by build_sprite.py.
+SPRITE_MODE = os.getenv("SPRITE_MODE", "external")
+SPRITE_MANIFEST_FILE = "sprite-manifest.json"
+# Written by build_assets.py; maps static file names to their hashed, precompressed copies under static/dist.
+ASSET_MANIFEST_FILE = "dist/assets-manifest.json"
+HASHED_STATIC_NAME = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+STATIC_FILE_CACHE = {}
 
 # --- Helper Functions ---
 def load_credentials():
@@ -36,15 +66,27 @@ def load_credentials():
     client_secret = os.getenv("CLIENT_SECRET")
     return api_key, client_id, client_secret
 
-def get_api_data(current_session, url, headers, params=None):
+def get_api_data(current_session, url, headers, params=None, priority=INTERACTIVE, stream_paths=None):
+    # Every OAuth session shares the process-wide connection pools, default timeouts and compression settings.
+    configure_session(current_session)
+    endpoint = endpoint_family(url)
     try:
-        response = current_session.get(url=url, headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
+        with timed("api_request_seconds", endpoint=endpoint):
+            # Streaming mode skips the cache and yields (path, value) for the matching parts of the body as they arrive.
+            if stream_paths:
+                response = API_SCHEDULER.send(current_session, url, headers, params, priority, stream=True)
+                response.raise_for_status()
+                return iter_json(response.iter_content(STREAM_CHUNK_SIZE), stream_paths)
+            send = lambda session, url, headers, params: API_SCHEDULER.send(session, url, headers, params, priority)
+            parsed_response = API_CACHE.get_json(current_session, url, headers, params, send)
+        if isinstance(parsed_response, dict) and parsed_response.get('ErrorCode', 1) != 1:
+            count("api_errors_total", endpoint=endpoint, code=parsed_response['ErrorCode'])
+        return parsed_response
     except Exception as e:
         print(f"ERROR during API call to {url}: {e}")
         if hasattr(e, 'response') and e.response is not None:
             print(f"API Error Details: {e.response.text}")
+        count("api_errors_total", endpoint=endpoint, code=e.response.status_code if getattr(e, 'response', None) is not None else type(e).__name__)
         return None
 
 def select_destiny_profile(parsed_linked_profiles_val):
@@ -54,65 +96,231 @@ def select_destiny_profile(parsed_linked_profiles_val):
     selected_profile = next((p for p in destiny_profiles if p.get('isCrossSavePrimary')), destiny_profiles[0])
     return selected_profile
 
-def get_character_info(session, headers, destiny_profile, components):
+def get_profile(session, headers, destiny_profile, components=DASHBOARD_COMPONENTS, priority=INTERACTIVE):
+    # One GetProfile call for every component the caller declared, parsed into the compact profile model.
     membership_type =  destiny_profile.get('membershipType')
     membership_id = destiny_profile.get('membershipId')
     if not all([membership_type, membership_id]): return None
     destiny_profile_url = GET_DESTINY_PROFILE_ENDPOINT_TEMPLATE.format(membership_type, membership_id)
-    profile_components = {'components': components}
-    profile_data = get_api_data(session, destiny_profile_url, headers, params=profile_components)
+    profile_components = {'components': profile_components_param(components)}
+    if PROFILE_STREAMING:
+        try:
+            events = get_api_data(session, destiny_profile_url, headers, params=profile_components, priority=priority, stream_paths=PROFILE_STREAM_PATHS)
+            return collect_profile(events, membership_type, membership_id) if events else None
+        except Exception as e:
+            print(f"ERROR streaming profile from {destiny_profile_url}: {e}")
+            return None
+    profile_data = get_api_data(session, destiny_profile_url, headers, params=profile_components, priority=priority)
     if not profile_data or "Response" not in profile_data: return None
-    return profile_data.get("Response")
+    return parse_profile(profile_data["Response"], membership_type, membership_id)
 
-def get_manifest_location(headers):
-    try:
-        response = requests.get(GET_MANIFEST_ENDPOINT, headers=headers)
-        response.raise_for_status()
-        return BASE_BUNGIE_URL + response.json()['Response']['mobileWorldContentPaths']['en']
-    except Exception as e: return None
+def get_manifest_reader(build=False):
+    """ Returns the shared reader, swapping it under a lock when the manifest changes. The old one isn't closed (other threads may be mid-query); it goes when they drop it. A missing pack is built in the background unless build is set. """
+    global MANIFEST_READER
+    reader = MANIFEST_READER
+    if reader_is_current(reader, MANIFEST_DB_PATH): return reader
+    with MANIFEST_READER_LOCK:
+        if not reader_is_current(MANIFEST_READER, MANIFEST_DB_PATH): MANIFEST_READER = open_manifest_reader(MANIFEST_DB_PATH, build=build)
+        return MANIFEST_READER
 
-def download_manifest(manifest_url):
-    global MANIFEST_DB_PATH
-    try:
-        response = requests.get(manifest_url)
-        response.raise_for_status()
-        with zipfile.ZipFile(io.BytesIO(response.content)) as manifest_zip:
-            db_filename = manifest_zip.namelist()[0]
-            manifest_zip.extract(db_filename)
-            MANIFEST_DB_PATH = db_filename
-            return db_filename
-    except Exception as e: return None
-
-def query_manifest(table_name, hash_id):
-    if not MANIFEST_DB_PATH: return None
+def resolve_manifest_hashes(profile, tables):
+    if not MANIFEST_DB_PATH or not profile: return {}
     try:
-        con = sqlite3.connect(MANIFEST_DB_PATH)
-        cur = con.cursor()
-        if hash_id > 2147483647: hash_id -= 4294967296
-        query_str = f"SELECT json FROM {table_name} WHERE id = ?"
-        cur.execute(query_str, (hash_id,))
-        result = cur.fetchone()
-        con.close()
-        if result: return json.loads(result[0])
-    except Exception as e: return None
+        reader = get_manifest_reader()
+        hashes_by_table = profile.hashes_by_table()
+        definitions = {}
+        # One lookup per table either way; timing them separately gives per-table latency.
+        for table in tables:
+            with timed("manifest_query_seconds", table=table):
+                definitions.update(reader.lookup_hot_many({table: hashes_by_table.get(table, [])}))
+        return definitions
+    except Exception as e: return {}
+
+def get_global_manifest_info(headers):
+    # Manifest updates usually land at reset, but hotfixes don't wait for it, so the version is also rechecked hourly.
+    return GLOBAL_DATA.get('manifest', lambda: get_manifest_info(headers), DAILY, max_age=MANIFEST_CACHE_DURATION)
 
 def update_manifest_if_needed():
     global LAST_MANIFEST_CHECK, MANIFEST_DB_PATH
     current_time = time.time()
     if current_time - LAST_MANIFEST_CHECK > MANIFEST_CACHE_DURATION:
         headers = {'X-API-KEY': os.getenv("API_KEY")}
-        manifest_url = get_manifest_location(headers)
-        if manifest_url:
-            download_manifest(manifest_url)
+        db_path = ensure_manifest(headers, max_age=MANIFEST_CACHE_DURATION, get_info=get_global_manifest_info)
+        if db_path:
+            MANIFEST_DB_PATH = db_path
             LAST_MANIFEST_CHECK = current_time
 
+def get_global_data(name, url, cadence=DAILY, params=None):
+    # Public (API key only) data shared by every user: one upstream call per reset window, whatever the traffic.
+    def fetch():
+        data = get_api_data(get_http_session(), url, {'X-API-KEY': os.getenv("API_KEY")}, params=params)
+        return data['Response'] if data and data.get('ErrorCode', 1) == 1 and 'Response' in data else None
+    return GLOBAL_DATA.get(name, fetch, cadence)
+
+def get_public_milestones():
+    return get_global_data('milestones', GET_PUBLIC_MILESTONES_ENDPOINT)
+
+def get_public_vendors():
+    # Vendors (400) and their sales (402); the rotations change at the daily reset and Xur's at the weekly one.
+    return get_global_data('vendors', GET_PUBLIC_VENDORS_ENDPOINT, params={'components': '400,402'})
+
+def linked_profiles_url_for(bnet_membership_id):
+    # Using membershipType 254 (BungieNext) to get linked profiles.
+    return f"{BASE_API_URL}/Destiny2/254/Profile/{bnet_membership_id}/LinkedProfiles/"
+
+def fetch_dashboard_snapshot(authenticated_session, previous=None):
+    # Background refresh of what the dashboard shows. The account and its selected Destiny profile rarely change, so
+    # after the first fetch only the Profile call is repeated.
+    headers = {'X-API-KEY': os.getenv("API_KEY")}
+    if previous:
+        user_details, selected_profile = previous['user_details'], previous['destiny_profile']
+    else:
+        user_details = get_api_data(authenticated_session, GET_USER_DETAILS_ENDPOINT, headers, priority=BACKGROUND)
+        if not user_details or 'Response' not in user_details: return None
+        bnet_membership_id = authenticated_session.token.get('membership_id') or user_details['Response'].get('membershipId')
+        selected_profile = select_destiny_profile(get_api_data(authenticated_session, linked_profiles_url_for(bnet_membership_id), headers, priority=BACKGROUND))
+        if not selected_profile: return None
+    profile = get_profile(authenticated_session, headers, selected_profile, priority=BACKGROUND)
+    if not profile: return None
+    return {'user_details': user_details, 'destiny_profile': selected_profile, 'profile': profile}
+
+PROFILE_PREFETCHER = ProfilePrefetcher(fetch_dashboard_snapshot)
+
+def read_static_file(filename):
+    # Build outputs are read once per process, and again only after the file changes.
+    file_path = os.path.join(app.static_folder, filename)
+    mtime = os.path.getmtime(file_path)
+    cached = STATIC_FILE_CACHE.get(file_path)
+    if cached and cached[0] == mtime: return cached[1]
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    STATIC_FILE_CACHE[file_path] = (mtime, content)
+    return content
+
+def load_sprite_manifest():
+    try: return json.loads(read_static_file(SPRITE_MANIFEST_FILE))
+    except Exception as e: return {}
+
+def load_asset_manifest():
+    try: return json.loads(read_static_file(ASSET_MANIFEST_FILE))
+    except Exception as e: return {}
+
+def load_svg_sprite(template_name='dashboard.html'):
+    # Only inline mode puts the sprite in the page; falls back to the full sprite if the template has no subset.
+    if SPRITE_MODE != "inline": return ""
+    try:
+        return read_static_file(load_sprite_manifest().get('subsets', {}).get(template_name, 'Conflux-Icons.svg'))
+    except Exception as e:
+        print(f"Warning: Could not read SVG sprite file. Icons may not display. Error: {e}")
+        return ""
+
+# In packed manifest mode the pack is mapped at import time, so under gunicorn's preload_app the master maps it once
+# and every forked worker shares the same pages instead of building its own copy.
+if MANIFEST_MODE == "packed":
+    MANIFEST_DB_PATH = read_current()[1]
+    if MANIFEST_DB_PATH: get_manifest_reader(build=True)
+
 # Flask app initialization
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv("FLASK_SECRET_KEY")
 
+def get_send_file_max_age(filename):
+    # Content-hashed build outputs never change under the same name, so browsers may keep them for a year.
+    if filename and HASHED_STATIC_NAME.search(filename): return 31536000
+    return Flask.get_send_file_max_age(app, filename)
+
+app.get_send_file_max_age = get_send_file_max_age
+
+@app.url_defaults
+def hashed_static_url(endpoint, values):
+    # url_for('static', filename=...) points at the hashed build output when build_assets.py has published one.
+    if endpoint == 'static' and 'filename' in values:
+        asset = load_asset_manifest().get(values['filename'])
+        if asset: values['filename'] = asset['path']
+
+@app.route('/static/dist/<path:filename>')
+def dist_asset(filename):
+    # Hashed files never change under the same name: cached as immutable, and served precompressed when the client
+    # accepts it, so no compression work happens per request.
+    encodings = next((asset['encodings'] for asset in load_asset_manifest().values() if asset['path'] == f"dist/{filename}"), [])
+    encoding = next((name for name in ('br', 'gzip') if name in encodings and request.accept_encodings[name]), None)
+    suffix = {'br': '.br', 'gzip': '.gz'}.get(encoding, '')
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = send_from_directory(os.path.join(app.static_folder, 'dist'), filename + suffix, mimetype=mimetype, max_age=31536000)
+    if encoding: response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@app.context_processor
+def inject_sprite_url():
+    # Prefix for <use href="{{ sprite_url }}#icon">: the hashed external sprite, or nothing when the sprite is inlined.
+    if SPRITE_MODE == "inline": return {'sprite_url': ''}
+    return {'sprite_url': url_for('static', filename=load_sprite_manifest().get('sprite', 'Conflux-Icons.svg'))}
+
+def collect_component_metrics():
+    # Counters kept by the cache, HTTP pool, rate limiter and manifest reader, reported on every /metrics scrape.
+    for name, value in API_CACHE.stats().items():
+        yield f"api_cache_{name}_total", "counter", f"Response cache {name}.", {}, value
+    for name, value in http_metrics().items():
+        metric_type = "gauge" if name.endswith("ratio") else "counter"
+        yield f"http_{name}" + ("" if metric_type == "gauge" else "_total"), metric_type, f"Shared HTTP client {name.replace('_', ' ')}.", {}, value
+    scheduler_stats = API_SCHEDULER.stats()
+    for name in ("sent", "throttled", "retries"):
+        yield f"api_{name}_total", "counter", f"Bungie API calls {name} by the rate limiter.", {}, scheduler_stats[name]
+    for bucket, rate in scheduler_stats["rates"].items():
+        yield "api_rate_limit", "gauge", "Current adaptive request rate per endpoint family.", {"endpoint": bucket}, rate
+    for name, value in PROFILE_PREFETCHER.stats().items():
+        metric_type = "gauge" if name in ("active_users", "open_streams") else "counter"
+        yield f"profile_prefetch_{name}" + ("" if metric_type == "gauge" else "_total"), metric_type, f"Background profile prefetch {name.replace('_', ' ')}.", {}, value
+    for name, value in GLOBAL_DATA.stats().items():
+        yield f"global_data_{name}_total", "counter", f"Reset-window global data cache {name}.", {}, value
+    for name, value in RENDER_CACHE.stats().items():
+        yield f"render_cache_{name}_total", "counter", f"Rendered character fragment cache {name}.", {}, value
+    if MANIFEST_READER is not None:
+        for name, value in MANIFEST_READER.stats().items():
+            if isinstance(value, (int, float)):
+                yield f"manifest_reader_{name}", "gauge", f"Manifest reader {name}.", {}, value
+
+METRICS.register_collector(collect_component_metrics)
+
+@before_render_template.connect_via(app)
+def start_template_timer(sender, template, context, **extra):
+    g.template_timer = timed("template_render_seconds", template=template.name)
+    g.template_timer.__enter__()
+
+@template_rendered.connect_via(app)
+def stop_template_timer(sender, template, context, **extra):
+    timer = g.pop('template_timer', None)
+    if timer is not None: timer.__exit__(None, None, None)
+
 # --- Web Routes ---
+@app.before_request
+def start_token_refresh():
+    # Keeps stored tokens fresh in the background; started once per worker process.
+    OAUTH_TOKENS.start_background_refresh()
+    PROFILE_PREFETCHER.start()
+
+@app.before_request
+def start_timing():
+    start_request_timings()
+
+@app.after_request
+def add_server_timing(response):
+    # Per-request breakdown (API calls, manifest lookups, rendering) for the browser's network panel.
+    timings = request_timings()
+    if timings: response.headers['Server-Timing'] = server_timing_header(timings)
+    return response
+
+@app.route('/metrics')
+def metrics():
+    if not METRICS_ENABLED: return "Metrics are disabled.", 404
+    return METRICS.render_prometheus(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 @app.route('/')
 def welcome():
+    # Returning users with a stored token go straight to their dashboard.
+    if session.get('token_key') and OAUTH_TOKENS.store.load(session['token_key']): return redirect('/dashboard')
     return render_template('welcome.html')
 
 @app.route('/login')
@@ -132,42 +340,83 @@ def callback():
     current_session = OAuth2Session(client_id=client_id_val, redirect_uri=REDIRECT_URL)
     try:
         token = current_session.fetch_token(TOKEN_URL, client_secret=client_secret_val, authorization_response=request.url)
-        session['oauth_token'] = token
+        # Tokens live in the encrypted server-side store when it's available; the cookie only carries the key.
+        if OAUTH_TOKENS.store.enabled and token.get('membership_id'):
+            OAUTH_TOKENS.store.save(token['membership_id'], token)
+            session['token_key'] = token['membership_id']
+        else:
+            session['oauth_token'] = token
     except Exception as e:
         return f"Error: Failed to fetch token: {e}"
     return redirect('/dashboard')
 
+def get_authenticated_session(client_id_val):
+    # The signed-in user's OAuth session, from the server-side token store or the cookie session; None if signed out.
+    if session.get('token_key'):
+        authenticated_session = OAUTH_TOKENS.session_for(session['token_key'])
+        # The stored token expired and couldn't be refreshed; authorize again.
+        if not authenticated_session: session.pop('token_key')
+        return authenticated_session
+    if session.get('oauth_token'):
+        return OAuth2Session(client_id=client_id_val, token=session['oauth_token'])
+    return None
+
+def background_session_factory(client_id_val):
+    # How the prefetcher gets the signed-in user's session outside this request; None once the token can't be used.
+    if session.get('token_key'):
+        token_key = session['token_key']
+        return lambda: OAUTH_TOKENS.session_for(token_key)
+    token = dict(session.get('oauth_token') or {})
+    return lambda: OAuth2Session(client_id=client_id_val, token=token) if token.get('expires_at', 0) > time.time() else None
+
 @app.route('/dashboard')
 def dashboard():
     """ The main dashboard route where data is fetched and displayed. """
     api_key_val, client_id_val, client_secret_val = load_credentials()
     if not api_key_val: return "Error: Missing credentials"
     
-    token = session.get('oauth_token')
-    if not token: return redirect('/')
+    authenticated_session = get_authenticated_session(client_id_val)
+    if not authenticated_session: return redirect('/')
+    token = authenticated_session.token
     
     additional_headers_val = {'X-API-KEY': api_key_val}
-    authenticated_session = OAuth2Session(client_id=client_id_val, token=token)
 
-    update_manifest_if_needed()
+    # Independent work runs concurrently: the manifest check, the sprite read, and the account lookups.
+    # The token carries the Bungie.net membership id, so LinkedProfiles doesn't have to wait for the user details.
+    pipeline = FetchPipeline(user_key=token.get('membership_id'))
+    pipeline.submit('manifest', update_manifest_if_needed)
+    pipeline.submit('sprite', load_svg_sprite)
 
-    svg_sprite_content = ""
-    try:
-        sprite_path = os.path.join(app.static_folder, 'Conflux-Icons.svg')
-        with open(sprite_path, 'r', encoding='utf-8') as f:
-            svg_sprite_content = f.read()
-    except Exception as e:
-        print(f"Warning: Could not read SVG sprite file. Icons may not display. Error: {e}")
+    # Users active recently have a snapshot the prefetcher keeps fresh; it's served straight away and the open page
+    # is patched over /api/profile/events as it changes. Everyone else waits on the calls inline.
+    snapshot = PROFILE_PREFETCHER.snapshot(token.get('membership_id'))
+    if snapshot:
+        user_details, selected_profile, profile = snapshot['user_details'], snapshot['destiny_profile'], snapshot['profile']
+    else:
+        pipeline.submit('user', get_api_data, authenticated_session, GET_USER_DETAILS_ENDPOINT, additional_headers_val)
+        if token.get('membership_id'):
+            pipeline.submit('linked', get_api_data, authenticated_session, linked_profiles_url_for(token['membership_id']), additional_headers_val)
 
-    user_details = get_api_data(authenticated_session, GET_USER_DETAILS_ENDPOINT, additional_headers_val)
-    if not user_details: return "Error fetching user details."
+        user_details = pipeline.result('user')
+        if not user_details: return "Error fetching user details."
 
-    bnet_membership_id = user_details.get('Response', {}).get('membershipId')
-    linked_profiles_url = f"{BASE_API_URL}/Destiny2/254/Profile/{bnet_membership_id}/LinkedProfiles/"
-    linked_profiles = get_api_data(authenticated_session, linked_profiles_url, additional_headers_val)
-    
-    selected_profile = select_destiny_profile(linked_profiles)
-    if not selected_profile: return "Could not determine Destiny profile."
+        bnet_membership_id = user_details.get('Response', {}).get('membershipId')
+        if not token.get('membership_id'):
+            pipeline.submit('linked', get_api_data, authenticated_session, linked_profiles_url_for(bnet_membership_id), additional_headers_val)
+        linked_profiles = pipeline.result('linked')
+
+        selected_profile = select_destiny_profile(linked_profiles)
+        if not selected_profile: return "Could not determine Destiny profile."
+
+        # Characters, their equipment and the item instances all come back from a single Profile call.
+        pipeline.submit('profile', get_profile, authenticated_session, additional_headers_val, selected_profile)
+        profile = pipeline.result('profile')
+        if profile: PROFILE_PREFETCHER.store(token.get('membership_id'), {'user_details': user_details, 'destiny_profile': selected_profile, 'profile': profile})
+    PROFILE_PREFETCHER.touch(token.get('membership_id'), background_session_factory(client_id_val))
+    svg_sprite_content = pipeline.result('sprite')
+
+    # Remembered for the equipment endpoint the dropdown panels call.
+    session['destiny_profile'] = {'membershipType': selected_profile.get('membershipType'), 'membershipId': selected_profile.get('membershipId')}
 
     user_platforms = []
     applicable_types = selected_profile.get('applicableMembershipTypes', [])
@@ -176,86 +425,147 @@ def dashboard():
         if platform_name:
             user_platforms.append({
                 "Name": platform_name,
-                "IconPath": f"/static/Media/{platform_name.lower()}.png"
+                "IconPath": url_for('static', filename=f"Media/{platform_name.lower()}.png")
             })
-            
-    raw_character_data_full = get_character_info(authenticated_session, additional_headers_val, selected_profile, "200,205")
-    raw_character_info = raw_character_data_full.get("characters", {}).get("data")
-    raw_character_equipment = raw_character_data_full.get("characterEquipment", {}).get("data")
     
-    processed_char_info = []
-    if raw_character_data_full:
-        for char_id, char_info in raw_character_info.items():
-            current_character = {}
-            class_def = query_manifest('DestinyClassDefinition', char_info.get('classHash'))
-            race_def = query_manifest('DestinyRaceDefinition', char_info.get('raceHash'))
-            title_def = query_manifest('DestinyRecordDefinition', char_info.get('titleRecordHash'))
-            
-            current_character['id'] = char_id
-            current_character['Race'] = race_def['displayProperties']['name'] if race_def else "Unknown Race"
-            current_character['Class'] = class_def['displayProperties']['name'] if class_def else "Unknown Class"
-            current_character['Light'] = char_info.get('light')
-            current_character['Title'] = title_def['titleInfo']['titlesByGender']['Male'] if title_def and 'titleInfo' in title_def else ""
-            current_character['EmblemPath'] = BASE_BUNGIE_URL + char_info.get('emblemPath', '')
-            current_character['EmblemBackgroundPath'] = BASE_BUNGIE_URL + char_info.get('emblemBackgroundPath', '')
-
-            for item in raw_character_equipment.get(char_id, {}).get('items', []):
-                item_hash = item.get('itemHash')
-                if not item_hash:
-                    continue
+    # A character's rendered card is reused while the profile (by its mint time), the manifest and the sprite are
+    # unchanged; only characters without one need manifest lookups and rendering.
+    pipeline.result('manifest')
+    membership_id = selected_profile.get('membershipId')
+    render_version = (profile.minted, os.path.basename(MANIFEST_DB_PATH or ""), inject_sprite_url()['sprite_url']) if profile and profile.minted else None
+    characters = list(profile.characters.values()) if profile else []
+    character_fragments = {character.character_id: RENDER_CACHE.get((membership_id, character.character_id), render_version) for character in characters}
+
+    # Resolves the hashes the cards show (hot fields only), one query per manifest table. Equipment is resolved
+    # per character by /api/characters/<id>/equipment when its dropdown is opened.
+    definitions = {}
+    if not all(character_fragments.values()):
+        definitions = resolve_manifest_hashes(profile, ['DestinyClassDefinition', 'DestinyRaceDefinition', 'DestinyRecordDefinition'])
+    class_defs = definitions.get('DestinyClassDefinition', {})
+    race_defs = definitions.get('DestinyRaceDefinition', {})
+    record_defs = definitions.get('DestinyRecordDefinition', {})
+
+    for character in characters:
+        if character_fragments[character.character_id]: continue
+        current_character = {}
+        class_def = class_defs.get(character.class_hash)
+        race_def = race_defs.get(character.race_hash)
+        title_def = record_defs.get(character.title_record_hash)
+
+        current_character['id'] = str(character.character_id)
+        current_character['Race'] = race_def['name'] if race_def else "Unknown Race"
+        current_character['Class'] = class_def['name'] if class_def else "Unknown Class"
+        current_character['Light'] = character.light
+        current_character['Title'] = title_def['title'] if title_def and title_def['title'] else ""
+        current_character['EmblemPath'] = BASE_BUNGIE_URL + character.emblem_path
+        current_character['EmblemBackgroundPath'] = BASE_BUNGIE_URL + character.emblem_background_path
+
+        fragment = render_template('_character.html', character=current_character)
+        RENDER_CACHE.set((membership_id, character.character_id), render_version, fragment)
+        character_fragments[character.character_id] = fragment
 
-                item_def = query_manifest('DestinyInventoryItemDefinition', item_hash)
-                item_name = item_def['displayProperties']['name'] if item_def else "Unknown Item"
-
-                bucket_hash = item.get('bucketHash')
-                if bucket_hash == 1498876634:
-                    current_character['Kinetic Slot'] = item_name
-                elif bucket_hash == 2465295065:
-                    current_character['Energy Slot'] = item_name
-                elif bucket_hash == 953998645:
-                    current_character['Power Slot'] = item_name
-                elif bucket_hash == 3448274439:
-                    current_character['Helmet'] = item_name
-                elif bucket_hash == 3551918588:
-                    current_character['Gauntlets'] = item_name
-                elif bucket_hash == 14239492:
-                    current_character['Chest Armor'] = item_name
-                elif bucket_hash == 20886954:
-                    current_character['Leg Armor'] = item_name
-                elif bucket_hash == 1585787867:
-                    current_character['Class Item'] = item_name
-                elif bucket_hash == 4023194814:
-                    current_character['Ghost'] = item_name
-                elif bucket_hash == 2025709351:
-                    current_character['Vehicle'] = item_name
-                elif bucket_hash == 284967655:
-                    current_character['Ship'] = item_name
-                elif bucket_hash == 3284755031:
-                    current_character['Subclass'] = item_name
-            
-            processed_char_info.append(current_character)
-
-
-    # TEST: Seeing if i can display the currently equipped weapons
-    character_equipment_dict = get_character_info(authenticated_session, additional_headers_val, selected_profile, 205)
-
-    simple_char_equip = []
-    if character_equipment_dict:
-        for character in character_equipment_dict.get('characterEquipment', {}).get('data', {}).values():
-            for item in character.get('items', {}):
-                item_def = query_manifest('DestinyInventoryItemDefinition', item.get('itemHash'))
-                simple_char_equip.append({
-                    'itemname': item_def['displayProperties']['name'] if item_def else "Unkown Item"
-                    })
-        print(f"RAW Character Equipment Data: {json.dumps(character_equipment_dict, indent=4)}")
-        print(f"CLEANED Character Data:{simple_char_equip}")
-
-    # Pass the SVG sprite content to the template
+    if os.getenv("API_TIMING_LOG"): print(f"Dashboard API timings: {format_timings(pipeline.timings)} | HTTP: {http_metrics()}")
+
+    # Pass the SVG sprite content to the template (empty unless SPRITE_MODE is inline)
     return render_template('dashboard.html', 
                            user_details=user_details, 
                            platforms=user_platforms,
-                           char_data=processed_char_info,
+                           character_fragments=list(character_fragments.values()),
+                           profile_version=profile.minted if profile and PREFETCH_STREAMS else "",
                            svg_sprite_content=svg_sprite_content)
 
+@app.route('/api/characters/<int:character_id>/equipment')
+def character_equipment(character_id):
+    """ One character's equipped items by slot, fetched by the dashboard when that character's dropdown is opened. """
+    api_key_val, client_id_val, client_secret_val = load_credentials()
+    authenticated_session = get_authenticated_session(client_id_val)
+    if not authenticated_session: return jsonify(error="Not signed in."), 401
+    destiny_profile = session.get('destiny_profile')
+    if not destiny_profile: return jsonify(error="No Destiny profile selected; open the dashboard first."), 404
+
+    # The prefetched snapshot when there is one; otherwise the same components as the dashboard's call, so this is
+    # normally served from the response cache.
+    snapshot = PROFILE_PREFETCHER.snapshot(authenticated_session.token.get('membership_id'))
+    if snapshot and snapshot['destiny_profile'].get('membershipId') == destiny_profile.get('membershipId'):
+        profile = snapshot['profile']
+    else:
+        profile = get_profile(authenticated_session, {'X-API-KEY': api_key_val}, destiny_profile)
+    if not profile: return jsonify(error="Could not load the profile."), 502
+    character = profile.characters.get(character_id)
+    if not character: return jsonify(error="Character not found."), 404
+
+    update_manifest_if_needed()
+    cache_key = (destiny_profile.get('membershipId'), character_id, 'equipment')
+    cache_version = (profile.minted, os.path.basename(MANIFEST_DB_PATH or "")) if profile.minted else None
+    slots = RENDER_CACHE.get(cache_key, cache_version)
+    if slots is None:
+        equipped = [item for item in character.equipment if item.item_hash and item.bucket_hash in EQUIPMENT_SLOTS]
+        item_defs = {}
+        if MANIFEST_DB_PATH and equipped:
+            try:
+                with timed("manifest_query_seconds", table='DestinyInventoryItemDefinition'):
+                    item_defs = get_manifest_reader().lookup_hot_many({'DestinyInventoryItemDefinition': [item.item_hash for item in equipped]}).get('DestinyInventoryItemDefinition', {})
+            except Exception as e: item_defs = {}
+        slots = {}
+        for item in equipped:
+            item_def = item_defs.get(item.item_hash)
+            slots[EQUIPMENT_SLOTS[item.bucket_hash]] = item_def['name'] if item_def else "Unknown Item"
+        RENDER_CACHE.set(cache_key, cache_version, slots)
+
+    # Revalidated on every use (the ETag makes that a 304 when nothing changed), since a live update re-requests this
+    # URL as soon as the equipment changes and must not get the browser's cached copy.
+    response = jsonify(characterId=str(character_id), slots=slots)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
+
+@app.route('/api/world')
+def world_data():
+    """ Public milestones and vendor rotations, the same for every player until the next daily reset. """
+    milestones, vendors = get_public_milestones(), get_public_vendors()
+    if milestones is None and vendors is None: return jsonify(error="Could not load global data."), 502
+    response = jsonify(milestones=milestones, vendors=vendors)
+    response.headers['Cache-Control'] = f"public, max-age={max(int(next_reset() - time.time()), 0)}"
+    return response
+
+@app.route('/api/profile/events')
+def profile_events():
+    """ Server-Sent Events stream of changes to the signed-in user's characters, found by the background prefetcher. """
+    api_key_val, client_id_val, client_secret_val = load_credentials()
+    authenticated_session = get_authenticated_session(client_id_val)
+    if not authenticated_session: return jsonify(error="Not signed in."), 401
+    user_key = authenticated_session.token.get('membership_id')
+    if not user_key or not PROFILE_PREFETCHER.enabled or not PREFETCH_STREAMS: return jsonify(error="Live updates are not available."), 404
+    session_factory = background_session_factory(client_id_val)
+    # The profile version the page has (from its last event on a reconnect, else the one it was rendered from);
+    # anything newer is sent as soon as the stream opens.
+    since = request.headers.get('Last-Event-ID') or request.args.get('since', '')
+
+    def format_event(name, data, version):
+        if 'emblemBackgroundPath' in data: data = dict(data, emblemBackgroundPath=BASE_BUNGIE_URL + data['emblemBackgroundPath'])
+        if 'emblemPath' in data: data = dict(data, emblemPath=BASE_BUNGIE_URL + data['emblemPath'])
+        return sse_event(name, data, version)
+
+    def stream():
+        events = PROFILE_PREFETCHER.subscribe(user_key)
+        try:
+            PROFILE_PREFETCHER.touch(user_key, session_factory)
+            snapshot = PROFILE_PREFETCHER.snapshot(user_key, max_age=None)
+            if snapshot and snapshot['profile'].minted and snapshot['profile'].minted != since:
+                for name, data in profile_changes(None, snapshot['profile']): yield format_event(name, data, snapshot['profile'].minted)
+            PROFILE_PREFETCHER.refresh_if_stale(user_key)
+            deadline = time.monotonic() + PREFETCH_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                try: name, data, version = events.get(timeout=PREFETCH_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                finally: PROFILE_PREFETCHER.touch(user_key, session_factory)
+                yield format_event(name, data, version)
+        finally:
+            PROFILE_PREFETCHER.unsubscribe(user_key, events)
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 if __name__ == '__main__':
     app.run(port=5000, debug=True, ssl_context=("localhost+2.pem", "localhost+2-key.pem"))
@@ -0,0 +1,291 @@
+# Importing necessary libraries
+import hashlib
+import json
+import os
+import re
+import sqlite3  # For the on-disk cache backend
+import threading
+import time
+from collections import OrderedDict
+
+# --- Constants & Configuration ---
+
+# "memory", "sqlite" or "off".
+API_CACHE_BACKEND = os.getenv("API_CACHE_BACKEND", "memory")
+API_CACHE_PATH = os.getenv("API_CACHE_PATH", "api_cache.sqlite")
+API_CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", "2048"))
+
+# Upper bounds on how long a response is served without asking Bungie again. Authenticated (per-user) responses are
+# kept much shorter than public ones, whatever Cache-Control says.
+API_CACHE_PUBLIC_TTL = int(os.getenv("API_CACHE_PUBLIC_TTL", "300"))
+API_CACHE_PRIVATE_TTL = int(os.getenv("API_CACHE_PRIVATE_TTL", "30"))
+
+# How often (in writes) the SQLite backend sweeps expired entries and trims itself to API_CACHE_MAX_ENTRIES.
+SQLITE_EVICT_EVERY = 64
+
+# A hit only rewrites the SQLite entry's last-access time once it is this many seconds old, so reads don't each
+# commit a write; LRU order is kept to this granularity.
+SQLITE_TOUCH_INTERVAL = 60
+
+
+class MemoryCacheBackend:
+    """In-process LRU of cache entries, bounded by max_entries."""
+
+    def __init__(self, max_entries=API_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the entry for key, or None."""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        """Stores an entry, evicting the least recently used past max_entries."""
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Drops the entry for key, if any."""
+
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drops every entry."""
+
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCacheBackend:
+    """
+    On-disk cache shared by every worker on the machine. Entries are evicted least-recently-used once there are more
+    than max_entries, and expired entries past their revalidation window are swept periodically.
+    """
+
+    def __init__(self, path=API_CACHE_PATH, max_entries=API_CACHE_MAX_ENTRIES):
+        # Connections are opened per thread, later; a relative path would follow any change of working directory.
+        self.path = os.path.abspath(path)
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self._schema_pid = None
+        self._schema_lock = threading.Lock()
+
+    def _connection(self):
+        """
+        Returns this thread's connection to the cache database, opening it (and creating the table) on first use.
+        Nothing is opened at construction and connections are per process, so a backend created before Gunicorn forks
+        (preload_app) never shares a SQLite handle between workers.
+        """
+
+        pid = os.getpid()
+        con = getattr(self._local, 'con', None)
+        if con is None or self._local.pid != pid:
+            con = sqlite3.connect(self.path, timeout=5)
+            self._local.con, self._local.pid = con, pid
+            with self._schema_lock:
+                if self._schema_pid != pid:
+                    con.execute("PRAGMA journal_mode=WAL")
+                    con.execute("CREATE TABLE IF NOT EXISTS api_cache (key TEXT PRIMARY KEY, entry TEXT NOT NULL, stale_at REAL NOT NULL, accessed REAL NOT NULL)")
+                    con.execute("CREATE INDEX IF NOT EXISTS api_cache_accessed ON api_cache (accessed)")
+                    con.commit()
+                    self._schema_pid = pid
+        return con
+
+    def get(self, key):
+        """Returns the entry for key, or None."""
+
+        con = self._connection()
+        row = con.execute("SELECT entry, accessed FROM api_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[1] >= SQLITE_TOUCH_INTERVAL:
+            con.execute("UPDATE api_cache SET accessed = ? WHERE key = ?", (now, key))
+            con.commit()
+        return json.loads(row[0])
+
+    def set(self, key, entry):
+        """Stores an entry, sweeping and trimming the table every SQLITE_EVICT_EVERY writes."""
+
+        con = self._connection()
+        now = time.time()
+        # Entries with validators stay around after expiring, so they can be revalidated with a conditional request.
+        stale_at = entry['expires_at'] + (API_CACHE_PUBLIC_TTL if entry.get('etag') or entry.get('last_modified') else 0)
+        con.execute("INSERT OR REPLACE INTO api_cache (key, entry, stale_at, accessed) VALUES (?, ?, ?, ?)", (key, json.dumps(entry), stale_at, now))
+
+        self._writes += 1
+        if self._writes % SQLITE_EVICT_EVERY == 0:
+            con.execute("DELETE FROM api_cache WHERE stale_at < ?", (now,))
+            con.execute("DELETE FROM api_cache WHERE key IN (SELECT key FROM api_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+        con.commit()
+
+    def delete(self, key):
+        """Drops the entry for key, if any."""
+
+        con = self._connection()
+        con.execute("DELETE FROM api_cache WHERE key = ?", (key,))
+        con.commit()
+
+    def clear(self):
+        """Drops every entry."""
+
+        con = self._connection()
+        con.execute("DELETE FROM api_cache")
+        con.commit()
+
+
+def max_age_of(cache_control):
+    """
+    Returns the max-age (seconds) from a Cache-Control header, 0 if the response must be revalidated before every reuse
+    (no-cache, or no-store), or None if unspecified.
+    """
+
+    if not cache_control:
+        return None
+    directives = cache_control.lower()
+    if 'no-store' in directives or 'no-cache' in directives:
+        return 0
+    match = re.search(r'max-age=(\d+)', directives)
+    return int(match.group(1)) if match else None
+
+
+def is_no_store(cache_control):
+    """Returns True if a Cache-Control header forbids storing the response at all."""
+
+    return bool(cache_control) and 'no-store' in cache_control.lower()
+
+
+class ResponseCache:
+    """
+    Response cache for Bungie API GETs, keyed by URL, params and the caller's Bungie.net membership.
+    Fresh entries are served without any upstream call. Stale entries with an ETag or Last-Modified are revalidated
+    with a conditional request, and a 304 just extends them. Freshness comes from Cache-Control, capped at
+    API_CACHE_PUBLIC_TTL (API_CACHE_PRIVATE_TTL for authenticated requests); no-cache responses with a validator are
+    stored already stale, so every reuse revalidates, and only no-store responses are never stored. A response minted
+    earlier than the one already cached (Response.responseMintedTimestamp) never replaces it.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+
+    def key_for(self, url, params, membership_id):
+        """Builds the cache key for a request."""
+
+        raw_key = json.dumps([url, sorted((params or {}).items()), membership_id], default=str)
+        return hashlib.sha256(raw_key.encode('utf-8')).hexdigest()
+
+    def ttl_for(self, response, private):
+        """Returns how many seconds a response may be served from the cache."""
+
+        ceiling = API_CACHE_PRIVATE_TTL if private else API_CACHE_PUBLIC_TTL
+        max_age = max_age_of(response.headers.get('Cache-Control'))
+        return ceiling if max_age is None else min(max_age, ceiling)
+
+    def get_json(self, session, url, headers=None, params=None, send=None):
+        """
+        Performs a (possibly cached) GET and returns the parsed JSON body. Raises like requests on HTTP errors.
+        Upstream calls go through send(session, url, headers, params) when given (e.g. RequestScheduler.send).
+        """
+
+        token = getattr(session, 'token', None) or {}
+        private = bool(token)
+        if send is None:
+            send = lambda session, url, headers, params: session.get(url=url, headers=headers, params=params)
+        if self.backend is None:
+            response = send(session, url, headers, params)
+            response.raise_for_status()
+            return response.json()
+
+        # Private responses are keyed by membership; tokens without one fall back to the (hashed) access token.
+        key = self.key_for(url, params, token.get('membership_id') or token.get('access_token'))
+        entry = self.backend.get(key)
+        now = time.time()
+
+        if entry and entry['expires_at'] > now:
+            with self._lock:
+                self.hits += 1
+            return json.loads(entry['body'])
+
+        # Revalidating a stale entry instead of re-downloading it, when Bungie gave us a validator.
+        request_headers = dict(headers or {})
+        if entry and entry.get('etag'):
+            request_headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            request_headers['If-Modified-Since'] = entry['last_modified']
+
+        response = send(session, url, request_headers, params)
+        if response.status_code == 304 and entry:
+            with self._lock:
+                self.revalidated += 1
+            entry['expires_at'] = now + self.ttl_for(response, private)
+            self.backend.set(key, entry)
+            return json.loads(entry['body'])
+
+        response.raise_for_status()
+        with self._lock:
+            self.misses += 1
+        parsed = response.json()
+
+        ttl = self.ttl_for(response, private)
+        etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+        # Bungie reports some failures (e.g. throttling) as HTTP 200 with a non-success ErrorCode; those aren't cached.
+        # Without a validator a response that can't be served fresh is of no use later either.
+        if is_no_store(response.headers.get('Cache-Control')) or (ttl <= 0 and not (etag or last_modified)):
+            return parsed
+        if not isinstance(parsed, dict) or parsed.get('ErrorCode', 1) != 1:
+            return parsed
+
+        response_body = parsed.get('Response')
+        minted = response_body.get('responseMintedTimestamp') if isinstance(response_body, dict) else None
+        if entry and minted and entry.get('minted') and minted < entry['minted']:
+            # An older snapshot than the one we already hold (e.g. from a lagging edge cache); keep ours.
+            entry['expires_at'] = now + ttl
+            self.backend.set(key, entry)
+            return json.loads(entry['body'])
+
+        self.backend.set(key, {
+            "body": response.text,
+            "etag": etag,
+            "last_modified": last_modified,
+            "minted": minted,
+            "expires_at": now + ttl
+        })
+        return parsed
+
+    def invalidate(self, url, params=None, membership_id=None):
+        """Drops the cached response for a request, e.g. after an action that changes the profile."""
+
+        if self.backend is not None:
+            self.backend.delete(self.key_for(url, params, membership_id))
+
+    def stats(self):
+        """Returns the cache counters."""
+
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "revalidated": self.revalidated}
+
+
+def create_response_cache(backend_name=API_CACHE_BACKEND):
+    """Creates the ResponseCache for the configured API_CACHE_BACKEND."""
+
+    if backend_name == "sqlite":
+        return ResponseCache(SQLiteCacheBackend())
+    if backend_name == "memory":
+        return ResponseCache(MemoryCacheBackend())
+    return ResponseCache(None)
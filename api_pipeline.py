@@ -0,0 +1,173 @@
+# Importing necessary libraries
+import contextvars
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# --- Constants & Configuration ---
+
+# Threads shared by every pipeline in the process.
+API_MAX_WORKERS = int(os.getenv("API_MAX_WORKERS", "16"))
+
+# Maximum number of Bungie calls in flight at once for a single user.
+API_USER_CONCURRENCY = int(os.getenv("API_USER_CONCURRENCY", "4"))
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+# One gate per user, shared by all of that user's pipelines. Entries disappear once no pipeline holds them.
+_user_gates = weakref.WeakValueDictionary()
+_user_gates_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Returns the process-wide thread pool, creating it on first use.
+    A pool inherited through fork (e.g. gunicorn preload_app) has no live threads, so each process gets its own.
+    """
+
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=API_MAX_WORKERS, thread_name_prefix="bungie-api")
+            _executor_pid = os.getpid()
+        return _executor
+
+
+class UserGate:
+    """
+    Admits one user's calls to the shared pool at most max_concurrency at a time. Calls over the cap wait in the
+    gate's own queue, not in a pool thread, and go to the pool as the user's earlier calls finish, so a user with a
+    backlog never ties up threads other users' calls are waiting for.
+    """
+
+    def __init__(self, max_concurrency=API_USER_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._running = 0
+        self._pending = deque()
+        self._lock = threading.Lock()
+
+    def submit(self, func):
+        """Schedules func() and returns its Future."""
+
+        future = Future()
+        with self._lock:
+            admit = self._running < self.max_concurrency
+            if admit:
+                self._running += 1
+            else:
+                self._pending.append((future, func))
+        if admit:
+            get_executor().submit(self._run, future, func)
+        return future
+
+    def _run(self, future, func):
+        """Runs one admitted call on a pool thread, then hands its slot to the user's next queued call, if any."""
+
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(func())
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            with self._lock:
+                next_call = self._pending.popleft() if self._pending else None
+                if next_call is None:
+                    self._running -= 1
+            if next_call is not None:
+                get_executor().submit(self._run, *next_call)
+
+
+def get_user_gate(user_key, max_concurrency=API_USER_CONCURRENCY):
+    """Returns the UserGate capping concurrent calls for a user. A user_key of None gets a private one."""
+
+    if user_key is None:
+        return UserGate(max_concurrency)
+    with _user_gates_lock:
+        gate = _user_gates.get(user_key)
+        if gate is None:
+            gate = UserGate(max_concurrency)
+            _user_gates[user_key] = gate
+        return gate
+
+
+class FetchPipeline:
+    """
+    Runs independent Bungie API calls (or any other blocking work) concurrently on a shared thread pool.
+    Calls for the same user_key never exceed max_concurrency at once (the rest queue per user, outside the pool), and
+    each named call's timing is recorded.
+
+    Usage:
+        pipeline = FetchPipeline(user_key=membership_id)
+        pipeline.submit('user', get_api_data, session, url, headers)
+        pipeline.submit('manifest', update_manifest_if_needed)
+        user_details = pipeline.result('user')
+    """
+
+    def __init__(self, user_key=None, max_concurrency=API_USER_CONCURRENCY):
+        self.gate = get_user_gate(user_key, max_concurrency)
+        self.started_at = time.perf_counter()
+        self.timings = {}
+        self._futures = {}
+
+    def _run(self, name, func, args, kwargs):
+        """Runs one call (admitted by the user's gate) and records when it started and how long it took."""
+
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.timings[name] = {
+                "start": start - self.started_at,
+                "seconds": time.perf_counter() - start
+            }
+
+    def submit(self, name, func, *args, **kwargs):
+        """
+        Schedules func(*args, **kwargs) under the given name and returns its Future. Past the user's concurrency cap it
+        waits in the user's gate until one of their calls finishes.
+        The call runs in a copy of the caller's context, so per-request state (e.g. request timings) follows it.
+        """
+
+        context = contextvars.copy_context()
+        future = self.gate.submit(lambda: context.run(self._run, name, func, args, kwargs))
+        self._futures[name] = future
+        return future
+
+    def result(self, name, timeout=None):
+        """Waits for a named call and returns its result (re-raising its exception, if any)."""
+
+        return self._futures[name].result(timeout=timeout)
+
+    def gather(self, timeout=None):
+        """Waits for every submitted call and returns a dict of {name: result}."""
+
+        return {name: future.result(timeout=timeout) for name, future in self._futures.items()}
+
+    def map(self, name_prefix, func, items, *args, key=None, **kwargs):
+        """
+        Submits func(item, *args, **kwargs) for every item, named "<name_prefix>:<key(item)>" (e.g. one call per
+        character). key defaults to the item itself; give one for items like dicts whose text isn't a short, unique id.
+        Returns the list of names, in the same order as items.
+        """
+
+        names = []
+        for item in items:
+            name = f"{name_prefix}:{item if key is None else key(item)}"
+            self.submit(name, func, item, *args, **kwargs)
+            names.append(name)
+        return names
+
+
+def format_timings(timings):
+    """Formats a pipeline's timings as one line, e.g. "user=0.212s linked=0.198s(+0.001s)"."""
+
+    return " ".join(
+        f"{name}={timing['seconds']:.3f}s(+{timing['start']:.3f}s)"
+        for name, timing in sorted(timings.items(), key=lambda item: item[1]['start'])
+    )
@@ -0,0 +1,91 @@
+"""
+Times the clan batch report (clan_report.run_clan_report) against the local Bungie stand-in: member listing, concurrent
+profile ingestion behind the rate limiter, and the shared manifest lookup.
+
+Run from the repository root:
+    python -m benchmarks.bench_clan --groups 3 --members 100 --latency 0.05
+
+Each run analyzes `groups` synthetic clans of `members` members, with the manifest already on disk, in a fresh
+process-wide rate limiter so runs don't throttle each other. Throughput is reported in members per second, overall and
+for the ingestion phase alone. Results are written to benchmarks/results/<commit>/clan.json.
+"""
+
+# Importing necessary libraries
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import statistics
+import tempfile
+
+# Configuration the modules under test read at import time.
+os.environ.setdefault("API_KEY", "synthetic-api-key")
+os.environ.setdefault("API_CACHE_BACKEND", "off")
+
+import Conflux
+import clan_report
+import manifest_store
+from benchmarks.fake_bungie import FakeBungieServer, point_at
+from benchmarks.results import write_results
+from rate_limiter import RequestScheduler
+
+# Synthetic group ids; any number works against the stand-in.
+FIRST_GROUP_ID = 4100000
+
+
+def run(groups=3, members=100, latency=0.05, runs=3, concurrency=clan_report.CLAN_CONCURRENCY, manifest_rows=20000):
+    """Runs the report `runs` times and returns the results dict."""
+
+    results = {"config": {"groups": groups, "members": members, "latency_s": latency, "runs": runs, "concurrency": concurrency, "manifest_rows": manifest_rows}}
+    work_dir = tempfile.mkdtemp(prefix="conflux-bench-")
+    previous_dir = os.getcwd()
+    try:
+        with FakeBungieServer(manifest_rows=manifest_rows, latency=latency, clan_members=members) as bungie:
+            point_at(bungie.base_url, Conflux, manifest_store)
+            os.chdir(work_dir)
+            Conflux.MANIFEST_DB_PATH = manifest_store.ensure_manifest({'X-API-KEY': os.environ["API_KEY"]})
+
+            reports = []
+            for _ in range(runs):
+                Conflux.API_SCHEDULER = RequestScheduler()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    report = clan_report.run_clan_report([FIRST_GROUP_ID + index for index in range(groups)], concurrency)
+                if report is None or report['overall']['profiles'] != groups * members:
+                    raise RuntimeError(f"clan report incomplete: {report and report['overall']}")
+                reports.append(report['throughput'])
+
+            for name in ("members_per_second", "ingest_members_per_second", "seconds", "listing_seconds", "ingest_seconds"):
+                results[name] = round(statistics.median(throughput[name] for throughput in reports), 3)
+            results["api_calls"] = reports[-1]["api_calls"]
+            results["class_mix"] = report['overall']['class_mix']
+            results["requests"] = dict(bungie.counts)
+    finally:
+        os.chdir(previous_dir)
+        if Conflux.MANIFEST_READER is not None:
+            Conflux.MANIFEST_READER.close()
+        Conflux.MANIFEST_READER = None
+        Conflux.MANIFEST_DB_PATH = None
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--groups', type=int, default=3)
+    parser.add_argument('--members', type=int, default=100, help="members per clan")
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds the stand-in adds to every API call")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=clan_report.CLAN_CONCURRENCY)
+    parser.add_argument('--output', help="write results to this path instead of benchmarks/results/<commit>/")
+    args = parser.parse_args()
+
+    results = run(args.groups, args.members, args.latency, args.runs, args.concurrency)
+    print(f"{results['members_per_second']} members/s overall, {results['ingest_members_per_second']} members/s ingesting "
+          f"({results['seconds']} s for {args.groups * args.members} members, {results['api_calls']} API calls)")
+    print(f"requests served: {results['requests']}")
+    print(f"results: {write_results('clan', results, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
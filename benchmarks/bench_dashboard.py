@@ -0,0 +1,122 @@
+"""
+Times GET /dashboard end to end through Flask's test client against the local Bungie stand-in.
+
+Run from the repository root:
+    python -m benchmarks.bench_dashboard --latency 0.05 --runs 10
+
+The signed-in session carries a pre-issued token, so each request runs the whole dashboard: user details, linked
+profiles, the profile call, the manifest check, hash resolution and template rendering. Three cases are timed:
+  cold:     no local manifest, so the first request downloads and indexes it
+  warm:     manifest already checked and open (the steady state)
+  snapshot: warm, with the background prefetcher's profile snapshot served instead of the profile call
+Cold and warm run with the prefetcher off, so every request makes the full set of API calls.
+Results are written to benchmarks/results/<commit>/dashboard.json.
+"""
+
+# Importing necessary libraries
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+# Configuration the modules under test read at import time.
+os.environ.setdefault("API_KEY", "synthetic-api-key")
+os.environ.setdefault("CLIENT_ID", "12345")
+os.environ.setdefault("CLIENT_SECRET", "synthetic-client-secret")
+os.environ.setdefault("FLASK_SECRET_KEY", "synthetic-flask-secret")
+os.environ.setdefault("OAUTHLIB_INSECURE_TRANSPORT", "1")
+os.environ.setdefault("API_CACHE_BACKEND", "off")
+# Global data stays in the process, so nothing cached from an earlier run's stand-in (its URLs) carries over.
+os.environ.setdefault("GLOBAL_CACHE_BACKEND", "memory")
+# The prefetcher is only switched on for the snapshot case; otherwise it would serve cold and warm runs too.
+os.environ.setdefault("PREFETCH_ENABLED", "0")
+os.environ.setdefault("TOKEN_STORE_PATH", os.path.join(tempfile.gettempdir(), "conflux-bench-tokens.enc"))
+
+import ConfluxWeb
+import manifest_store
+from benchmarks.fake_bungie import FakeBungieServer, fake_token, point_at
+from benchmarks.results import summarize, write_results
+
+
+def reset_manifest(work_dir):
+    """Forgets the open manifest and removes the local store, so the next request starts cold."""
+
+    if ConfluxWeb.MANIFEST_READER is not None:
+        ConfluxWeb.MANIFEST_READER.close()
+    ConfluxWeb.MANIFEST_READER = None
+    ConfluxWeb.MANIFEST_DB_PATH = None
+    ConfluxWeb.LAST_MANIFEST_CHECK = 0
+    shutil.rmtree(os.path.join(work_dir, manifest_store.MANIFEST_STORE_DIR), ignore_errors=True)
+
+
+def get_dashboard(client):
+    """Requests the dashboard once. Returns (elapsed seconds, response size in bytes)."""
+
+    start = time.perf_counter()
+    response = client.get('/dashboard')
+    elapsed = time.perf_counter() - start
+    if response.status_code != 200 or b"Error" in response.data[:200]:
+        raise RuntimeError(f"/dashboard failed ({response.status_code}): {response.data[:500]!r}")
+    return elapsed, len(response.data)
+
+
+def run(manifest_rows=20000, latency=0.05, runs=10, vault=400):
+    """Runs both cases and returns the results dict."""
+
+    results = {"config": {"manifest_rows": manifest_rows, "latency_s": latency, "runs": runs, "vault": vault}}
+    work_dir = tempfile.mkdtemp(prefix="conflux-bench-")
+    previous_dir = os.getcwd()
+    try:
+        with FakeBungieServer(manifest_rows=manifest_rows, latency=latency, vault=vault) as bungie:
+            point_at(bungie.base_url, ConfluxWeb, manifest_store)
+            os.chdir(work_dir)
+            client = ConfluxWeb.app.test_client()
+            with client.session_transaction() as flask_session:
+                flask_session['oauth_token'] = fake_token()
+
+            cold = []
+            for _ in range(runs):
+                reset_manifest(work_dir)
+                elapsed, page_bytes = get_dashboard(client)
+                cold.append(elapsed)
+            warm = [get_dashboard(client)[0] for _ in range(runs)]
+            results["requests"] = dict(bungie.counts)
+
+            # The first request stores a snapshot, which every timed one after it is served from.
+            ConfluxWeb.PROFILE_PREFETCHER.enabled = True
+            get_dashboard(client)
+            snapshot = [get_dashboard(client)[0] for _ in range(runs)]
+
+            results["dashboard_cold"] = summarize(cold)
+            results["dashboard_warm"] = summarize(warm)
+            results["dashboard_snapshot"] = summarize(snapshot)
+            results["page_bytes"] = page_bytes
+            results["snapshot_requests"] = {name: count - results["requests"].get(name, 0) for name, count in bungie.counts.items()}
+    finally:
+        os.chdir(previous_dir)
+        ConfluxWeb.PROFILE_PREFETCHER.enabled = False
+        reset_manifest(work_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000, help="definitions in the synthetic manifest")
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds the stand-in adds to every API call")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--vault', type=int, default=400, help="vault items in the synthetic profile")
+    parser.add_argument('--output', help="write results to this path instead of benchmarks/results/<commit>/")
+    args = parser.parse_args()
+
+    results = run(args.rows, args.latency, args.runs, args.vault)
+    for case in ("dashboard_cold", "dashboard_warm", "dashboard_snapshot"):
+        print(f"{case:>18}: median {results[case]['median_ms']:>9} ms, p95 {results[case]['p95_ms']:>9} ms")
+    print(f"page: {results['page_bytes']} bytes, requests served: {results['requests']} (cold and warm), "
+          f"{results['snapshot_requests']} (snapshot)")
+    print(f"results: {write_results('dashboard', results, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
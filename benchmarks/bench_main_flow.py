@@ -0,0 +1,112 @@
+"""
+Times the command line app's main() flow and the manifest download end to end against the local Bungie stand-in.
+
+Run from the repository root:
+    python -m benchmarks.bench_main_flow --latency 0.05 --runs 5
+
+The browser OAuth step is replaced by a pre-issued token; everything after it (user details, linked profiles, the
+profile call, manifest check/download/prune/index and the manifest lookups) runs for real. Three cases are timed:
+  cold:   no local manifest, so it is downloaded, pruned and indexed during the run
+  warm:   manifest on disk, one version check against the stand-in
+  hot:    manifest already open in the process (repeat run)
+download_manifest is also timed on its own. Results are written to benchmarks/results/<commit>/main_flow.json.
+"""
+
+# Importing necessary libraries
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+
+# Configuration the modules under test read at import time.
+os.environ.setdefault("API_KEY", "synthetic-api-key")
+os.environ.setdefault("CLIENT_ID", "12345")
+os.environ.setdefault("CLIENT_SECRET", "synthetic-client-secret")
+os.environ.setdefault("OAUTHLIB_INSECURE_TRANSPORT", "1")
+os.environ.setdefault("API_CACHE_BACKEND", "off")
+os.environ.setdefault("TOKEN_STORE_PATH", os.path.join(tempfile.gettempdir(), "conflux-bench-tokens.enc"))
+
+from requests_oauthlib import OAuth2Session
+
+import Conflux
+import manifest_store
+from benchmarks.fake_bungie import FakeBungieServer, fake_token, point_at
+from benchmarks.results import summarize, write_results
+
+
+def run_main(work_dir, reset_manifest, drop_store):
+    """Runs Conflux.main() once with its output captured. Returns the elapsed seconds."""
+
+    if reset_manifest:
+        if Conflux.MANIFEST_READER is not None:
+            Conflux.MANIFEST_READER.close()
+        Conflux.MANIFEST_READER = None
+        Conflux.MANIFEST_DB_PATH = None
+    if drop_store:
+        shutil.rmtree(os.path.join(work_dir, manifest_store.MANIFEST_STORE_DIR), ignore_errors=True)
+
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        Conflux.main()
+    elapsed = time.perf_counter() - start
+    if "Character:" not in output.getvalue():
+        raise RuntimeError(f"main() did not reach the character list:\n{output.getvalue()}")
+    return elapsed
+
+
+def run(manifest_rows=20000, latency=0.05, runs=5, vault=400):
+    """Runs every case and returns the results dict."""
+
+    results = {"config": {"manifest_rows": manifest_rows, "latency_s": latency, "runs": runs, "vault": vault}}
+    work_dir = tempfile.mkdtemp(prefix="conflux-bench-")
+    previous_dir = os.getcwd()
+    original_oauth_flow = Conflux.perform_oauth_flow
+    try:
+        with FakeBungieServer(manifest_rows=manifest_rows, latency=latency, vault=vault) as bungie:
+            point_at(bungie.base_url, Conflux, manifest_store)
+            Conflux.perform_oauth_flow = lambda client_id, client_secret: OAuth2Session(client_id=client_id, token=fake_token())
+            os.chdir(work_dir)
+
+            results["main_cold"] = summarize([run_main(work_dir, True, True) for _ in range(runs)])
+            results["main_warm"] = summarize([run_main(work_dir, True, False) for _ in range(runs)])
+            results["main_hot"] = summarize([run_main(work_dir, False, False) for _ in range(runs)])
+
+            download_dir = os.path.join(work_dir, "download")
+            os.makedirs(download_dir)
+            samples = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                os.remove(manifest_store.download_manifest(bungie.manifest_url, download_dir))
+                samples.append(time.perf_counter() - start)
+            results["download_manifest"] = summarize(samples)
+            results["download_manifest"]["zip_bytes"] = os.path.getsize(bungie.manifest_zip_path)
+            results["requests"] = dict(bungie.counts)
+    finally:
+        Conflux.perform_oauth_flow = original_oauth_flow
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000, help="definitions in the synthetic manifest")
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds the stand-in adds to every API call")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--vault', type=int, default=400, help="vault items in the synthetic profile")
+    parser.add_argument('--output', help="write results to this path instead of benchmarks/results/<commit>/")
+    args = parser.parse_args()
+
+    results = run(args.rows, args.latency, args.runs, args.vault)
+    for case in ("main_cold", "main_warm", "main_hot", "download_manifest"):
+        print(f"{case:>18}: median {results[case]['median_ms']:>9} ms, p95 {results[case]['p95_ms']:>9} ms")
+    print(f"requests served: {results['requests']}")
+    print(f"results: {write_results('main_flow', results, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Compares peak RSS of the old in-memory manifest download against the streaming download in manifest_store.
+
+Run from the repository root:
+    python -m benchmarks.bench_manifest_download --rows 200000
+
+Each mode runs in its own subprocess so peak RSS isn't shared between them. Unix only (uses the resource module).
+"""
+
+# Importing necessary libraries
+import argparse
+import functools
+import http.server
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+
+from benchmarks.fixtures import build_synthetic_manifest_zip
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    """Static file handler that doesn't log every request to stderr."""
+
+    def log_message(self, format, *args):
+        pass
+
+
+def legacy_download_manifest(manifest_url, dest_dir):
+    """The pre-streaming implementation: whole zip in memory, then extracted."""
+
+    import requests
+    response = requests.get(manifest_url)
+    with zipfile.ZipFile(io.BytesIO(response.content)) as manifest_zip:
+        files = manifest_zip.namelist()
+        return manifest_zip.extract(files[0], dest_dir)
+
+
+def peak_rss_kb():
+    """Returns this process's peak RSS in KB."""
+
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and KB on Linux.
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def run_child(mode, manifest_url, dest_dir):
+    """Runs one download in this process and prints its timings and memory as JSON."""
+
+    import requests  # Imported up front so the baseline includes it for both modes
+    from manifest_store import download_manifest
+
+    baseline_kb = peak_rss_kb()
+    download = legacy_download_manifest if mode == 'legacy' else download_manifest
+
+    start = time.perf_counter()
+    db_path = download(manifest_url, dest_dir)
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        "mode": mode,
+        "seconds": round(elapsed, 3),
+        "baseline_rss_kb": baseline_kb,
+        "peak_rss_kb": peak_rss_kb(),
+        "download_rss_kb": peak_rss_kb() - baseline_kb,
+        "db_bytes": os.path.getsize(db_path)
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000, help="definitions in the synthetic manifest")
+    parser.add_argument('--output', help="write results as JSON to this path")
+    parser.add_argument('--child', nargs=3, metavar=('MODE', 'URL', 'DEST'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        zip_path = os.path.join(work_dir, "manifest.zip")
+        build_synthetic_manifest_zip(zip_path, rows=args.rows)
+
+        # Serving the fixture zip locally so both modes go through requests exactly like production.
+        handler = functools.partial(QuietHandler, directory=work_dir)
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        manifest_url = f"http://127.0.0.1:{server.server_address[1]}/manifest.zip"
+
+        results = {"zip_bytes": os.path.getsize(zip_path), "runs": []}
+        for mode in ('legacy', 'streaming'):
+            dest_dir = tempfile.mkdtemp(dir=work_dir)
+            child = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_manifest_download', '--child', mode, manifest_url, dest_dir],
+                capture_output=True, text=True, check=True
+            )
+            results["runs"].append(json.loads(child.stdout))
+
+        server.shutdown()
+
+    for run in results["runs"]:
+        print(f"{run['mode']:>10}: {run['seconds']:.3f}s, +{run['download_rss_kb'] / 1024:.1f} MB peak RSS over baseline "
+              f"(zip {results['zip_bytes'] / 1048576:.1f} MB, db {run['db_bytes'] / 1048576:.1f} MB)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
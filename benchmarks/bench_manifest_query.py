@@ -0,0 +1,108 @@
+"""
+Measures manifest lookups at scale: per-lookup latency of every lookup path, on a synthetic manifest.
+
+Run from the repository root:
+    python -m benchmarks.bench_manifest_query --rows 200000 --lookups 20000
+
+Cases (all on the same random sample of real hashes):
+  sqlite_get_cold:   ManifestReader.get() on a fresh reader, so every lookup queries SQLite and decodes JSON
+  sqlite_get_warm:   the same lookups again, served from the reader's LRU
+  sqlite_name:       lookup_name() from the slim index (no JSON decoded)
+  sqlite_hot_many:   lookup_hot_many() in profile-sized batches of 500
+  packed_get:        PackedManifest.get() from the memory-mapped pack
+  packed_hot_many:   PackedManifest.lookup_hot_many() in batches of 500
+Results are written to benchmarks/results/<commit>/manifest_query.json.
+"""
+
+# Importing necessary libraries
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from benchmarks.fixtures import build_synthetic_manifest_db
+from benchmarks.results import write_results
+from manifest import ManifestReader, build_slim_index
+from manifest_packed import PackedManifest, build_manifest_pack
+
+BATCH_SIZE = 500
+
+
+def per_lookup(seconds, lookups):
+    """Returns the mean time per lookup in microseconds."""
+
+    return round(seconds / lookups * 1e6, 2)
+
+
+def time_each(lookup, sample):
+    """Times lookup(table, hash) over the sample. Returns microseconds per lookup."""
+
+    start = time.perf_counter()
+    for table_name, hash_id in sample:
+        lookup(table_name, hash_id)
+    return per_lookup(time.perf_counter() - start, len(sample))
+
+
+def time_batched(lookup_many, sample):
+    """Times lookup_many({table: [hashes]}) over the sample in batches. Returns microseconds per lookup."""
+
+    batches = []
+    for start in range(0, len(sample), BATCH_SIZE):
+        batch = {}
+        for table_name, hash_id in sample[start:start + BATCH_SIZE]:
+            batch.setdefault(table_name, []).append(hash_id)
+        batches.append(batch)
+
+    start = time.perf_counter()
+    for batch in batches:
+        lookup_many(batch)
+    return per_lookup(time.perf_counter() - start, len(sample))
+
+
+def run(rows=200000, lookups=20000, seed=2014):
+    """Builds the synthetic manifest, its slim index and pack, runs every case and returns the results dict."""
+
+    work_dir = tempfile.mkdtemp(prefix="conflux-bench-")
+    try:
+        db_path = os.path.join(work_dir, "world_sql_content_synthetic.content")
+        written = build_synthetic_manifest_db(db_path, rows, seed)
+        build_slim_index(db_path)
+        pack_path = build_manifest_pack(db_path)
+        sample = random.Random(seed).choices(written, k=lookups)
+
+        results = {"config": {"rows": rows, "lookups": lookups, "batch_size": BATCH_SIZE}, "us_per_lookup": {}}
+        timings = results["us_per_lookup"]
+
+        reader = ManifestReader(db_path, cache_size=lookups)
+        timings["sqlite_get_cold"] = time_each(reader.get, sample)
+        timings["sqlite_get_warm"] = time_each(reader.get, sample)
+        timings["sqlite_name"] = time_each(reader.lookup_name, sample)
+        timings["sqlite_hot_many"] = time_batched(reader.lookup_hot_many, sample)
+        reader.close()
+
+        packed = PackedManifest(pack_path, db_path)
+        timings["packed_get"] = time_each(packed.get, sample)
+        timings["packed_hot_many"] = time_batched(packed.lookup_hot_many, sample)
+        packed.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000, help="definitions in the synthetic manifest")
+    parser.add_argument('--lookups', type=int, default=20000)
+    parser.add_argument('--output', help="write results to this path instead of benchmarks/results/<commit>/")
+    args = parser.parse_args()
+
+    results = run(args.rows, args.lookups)
+    for case, micros in results["us_per_lookup"].items():
+        print(f"{case:>16}: {micros:>8} us/lookup")
+    print(f"results: {write_results('manifest_query', results, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
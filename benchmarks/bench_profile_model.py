@@ -0,0 +1,55 @@
+"""
+Compares the memory retained by one loaded profile: the raw GetProfile JSON dicts (what get_character_info used to
+return) against the compact profile_model.Profile built from the same response.
+
+Run from the repository root:
+    python -m benchmarks.bench_profile_model --vault 400
+
+Both are measured with tracemalloc as the bytes still allocated once loading has finished, starting from the JSON text.
+"""
+
+# Importing necessary libraries
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from benchmarks.fixtures import build_synthetic_profile_response
+from profile_model import parse_profile
+
+
+def retained_bytes(load, text):
+    """Returns (bytes retained by load(text)'s result, seconds it took)."""
+
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load(text)
+    seconds = time.perf_counter() - start
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return retained, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--characters', type=int, default=3)
+    parser.add_argument('--inventory', type=int, default=60, help="inventory items per character")
+    parser.add_argument('--vault', type=int, default=400)
+    args = parser.parse_args()
+
+    text = json.dumps({"Response": build_synthetic_profile_response(args.characters, inventory=args.inventory, vault=args.vault)})
+    raw_bytes, raw_seconds = retained_bytes(lambda body: json.loads(body)["Response"], text)
+    model_bytes, model_seconds = retained_bytes(lambda body: parse_profile(json.loads(body)["Response"], 3, 4611686018400000000), text)
+
+    print(f"response size: {len(text) / 1024:.0f} KB")
+    print(f"  raw dicts: {raw_bytes / 1024:8.0f} KB retained ({raw_seconds * 1000:.1f} ms)")
+    print(f"    Profile: {model_bytes / 1024:8.0f} KB retained ({model_seconds * 1000:.1f} ms), "
+          f"{100 * (1 - model_bytes / raw_bytes):.0f}% less")
+
+
+if __name__ == '__main__':
+    main()
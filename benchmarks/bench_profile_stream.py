@@ -0,0 +1,114 @@
+"""
+Compares loading a large GetProfile response with response.json() + parse_profile() against streaming it through
+json_stream.iter_json() + stream_profile(), served from a local HTTP server.
+
+Run from the repository root:
+    python -m benchmarks.bench_profile_stream --vault 600 --inventory 120
+
+Reports the tracemalloc peak while loading (the body bytes requests buffers count towards the non-streaming side, as
+they do in production), the memory retained by the finished Profile, and the time until the first Item is available.
+"""
+
+# Importing necessary libraries
+import argparse
+import gc
+import http.server
+import json
+import threading
+import time
+import tracemalloc
+
+import requests
+
+from benchmarks.fixtures import build_synthetic_profile_response
+from json_stream import STREAM_CHUNK_SIZE, iter_json
+from profile_model import PROFILE_STREAM_PATHS, parse_profile, stream_profile
+
+
+class ProfileHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the same pre-encoded profile body for every GET."""
+
+    body = b""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def load_whole(session, url):
+    """The non-streaming path: download, response.json(), then build the model. Returns (profile, first item at)."""
+
+    response = session.get(url)
+    profile = parse_profile(response.json()["Response"], 3, 4611686018400000000)
+    return profile, time.perf_counter()
+
+
+def load_streaming(session, url):
+    """The streaming path: items come out of the model as the body arrives. Returns (profile, first item at)."""
+
+    response = session.get(url, stream=True)
+    items = stream_profile(iter_json(response.iter_content(STREAM_CHUNK_SIZE), PROFILE_STREAM_PATHS), 3, 4611686018400000000)
+    first_item_at = None
+    while True:
+        try:
+            next(items)
+            first_item_at = first_item_at or time.perf_counter()
+        except StopIteration as finished:
+            return finished.value, first_item_at
+
+
+def measure(load, session, url):
+    """Returns {peak_kb, retained_kb, first_item_ms, total_ms} for one load."""
+
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    profile, first_item_at = load(session, url)
+    total = time.perf_counter() - start
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del profile
+    return {
+        "peak_kb": round(peak / 1024),
+        "retained_kb": round(retained / 1024),
+        "first_item_ms": round((first_item_at - start) * 1000, 1),
+        "total_ms": round(total * 1000, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--characters', type=int, default=3)
+    parser.add_argument('--inventory', type=int, default=120, help="inventory items per character")
+    parser.add_argument('--vault', type=int, default=600)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    response = build_synthetic_profile_response(args.characters, inventory=args.inventory, vault=args.vault)
+    ProfileHandler.body = json.dumps({"Response": response, "ErrorCode": 1, "Message": "Ok"}).encode('utf-8')
+    del response
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ProfileHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/Platform/Destiny2/3/Profile/4611686018400000000/"
+    session = requests.Session()
+
+    print(f"response size: {len(ProfileHandler.body) / 1024 / 1024:.1f} MB")
+    for name, load in (("json()", load_whole), ("streaming", load_streaming)):
+        runs = [measure(load, session, url) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run["total_ms"])
+        print(f"{name:>10}: peak {best['peak_kb']:>7} KB, retained {best['retained_kb']:>6} KB, "
+              f"first item {best['first_item_ms']:>6} ms, total {best['total_ms']:>6} ms")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
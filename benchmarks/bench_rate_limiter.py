@@ -0,0 +1,119 @@
+"""
+Measures sustained successful requests per second against a local stand-in that throttles like Bungie.
+
+Run from the repository root:
+    python -m benchmarks.bench_rate_limiter --server-rate 15 --requests 300
+
+The stand-in allows --server-rate requests per second (sliding one-second window) and answers anything beyond that
+with HTTP 429 and a Bungie-style {"ErrorCode": 36, "ThrottleSeconds": 1} body. "direct" fires requests from a thread
+pool with no limiter (throttled calls are lost, as get_api_data did before); "scheduled" sends them through
+RequestScheduler with its adaptive buckets and retries.
+"""
+
+# Importing necessary libraries
+import argparse
+import collections
+import http.server
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from rate_limiter import RequestScheduler
+
+
+class ThrottlingHandler(http.server.BaseHTTPRequestHandler):
+    """Answers GETs with a tiny Bungie-style payload, or a throttle error past the server's rate."""
+
+    rate = 15
+    window = collections.deque()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        now = time.monotonic()
+        with self.lock:
+            while self.window and now - self.window[0] > 1:
+                self.window.popleft()
+            allowed = len(self.window) < self.rate
+            if allowed:
+                self.window.append(now)
+
+        if allowed:
+            status, body = 200, {"ErrorCode": 1, "ErrorStatus": "Success", "Response": {"ok": True}}
+        else:
+            status, body = 429, {"ErrorCode": 36, "ErrorStatus": "ThrottleLimitExceeded", "ThrottleSeconds": 1}
+
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run(mode, url, total, threads, client_rate):
+    """Sends `total` requests from `threads` threads and returns throughput numbers."""
+
+    session = requests.Session()
+    scheduler = RequestScheduler(rate_limit=client_rate, family_rate_limit=client_rate)
+    headers = {'X-API-KEY': 'benchmark'}
+
+    def one(_):
+        if mode == 'scheduled':
+            response = scheduler.send(session, url, headers)
+        else:
+            response = session.get(url, headers=headers)
+        return response.status_code == 200
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+
+    succeeded = sum(results)
+    return {
+        "mode": mode,
+        "seconds": round(elapsed, 2),
+        "succeeded": succeeded,
+        "failed": total - succeeded,
+        "success_rps": round(succeeded / elapsed, 2),
+        "scheduler": scheduler.stats() if mode == 'scheduled' else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server-rate', type=int, default=15, help="requests per second the stand-in allows")
+    parser.add_argument('--client-rate', type=float, default=20, help="starting scheduler rate (deliberately above the server's)")
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--output', help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    ThrottlingHandler.rate = args.server_rate
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ThrottlingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/Platform/Destiny2/3/Profile/1/"
+
+    results = []
+    for mode in ('direct', 'scheduled'):
+        ThrottlingHandler.window.clear()
+        time.sleep(1.1)
+        result = run(mode, url, args.requests, args.threads, args.client_rate)
+        results.append(result)
+        print(f"{mode:>9}: {result['succeeded']}/{args.requests} succeeded in {result['seconds']}s "
+              f"({result['success_rps']} successful req/s)" + (f", {result['scheduler']}" if result['scheduler'] else ""))
+
+    server.shutdown()
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"server_rate": args.server_rate, "results": results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
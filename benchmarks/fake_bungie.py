@@ -0,0 +1,338 @@
+"""
+Local stand-in for the parts of the Bungie.net API Conflux uses, for offline benchmarks.
+
+Serves GetCurrentBungieNetUser, LinkedProfiles, GetProfile (only the requested components), the Manifest endpoint and
+a synthetic manifest zip, GetPublicMilestones and GetPublicVendors, GroupV2 groups and their members (synthetic clans
+whose members each have their own profile), plus the OAuth token endpoint. Responses are synthetic (see benchmarks.fixtures) unless a
+directory of recorded responses is given: user.json, linked_profiles.json, profile.json, manifest.json, milestones.json and vendors.json holding full
+response envelopes, each used in place of the synthetic one when present.
+
+Latency (added to every API call) and throttling (Bungie-style 429 / ErrorCode 36 past a request rate) are configurable.
+
+    with FakeBungieServer(manifest_rows=20000, latency=0.05) as bungie:
+        point_at(bungie.base_url, Conflux, manifest_store)
+        ...
+"""
+
+# Importing necessary libraries
+import collections
+import gzip
+import http.server
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+from benchmarks.fixtures import (
+    SYNTHETIC_DB_NAME, attach_manifest_hashes, build_synthetic_account, build_synthetic_manifest_zip,
+    build_synthetic_clan, build_synthetic_profile_response, build_synthetic_public_data
+)
+
+# --- Constants & Configuration ---
+
+# GetProfile component numbers and the response keys they fill.
+COMPONENT_KEYS = {
+    "102": ("profileInventory",),
+    "200": ("characters",),
+    "201": ("characterInventories",),
+    "205": ("characterEquipment",),
+    "300": ("itemComponents", "instances"),
+    "304": ("itemComponents", "stats")
+}
+
+MANIFEST_VERSION = "synthetic.2026.10.17"
+MANIFEST_PATH = f"/common/destiny2_content/sqlite/en/{SYNTHETIC_DB_NAME}.zip"
+
+# GetMembersOfGroup page size.
+GROUP_MEMBERS_PAGE_SIZE = 100
+
+ROUTES = [
+    ("user", re.compile(r"^/Platform/User/GetCurrentBungieNetUser/$")),
+    ("linked_profiles", re.compile(r"^/Platform/Destiny2/254/Profile/\d+/LinkedProfiles/$")),
+    ("profile", re.compile(r"^/Platform/Destiny2/-?\d+/Profile/\d+/$")),
+    ("manifest", re.compile(r"^/Platform/Destiny2/Manifest/$")),
+    ("milestones", re.compile(r"^/Platform/Destiny2/Milestones/$")),
+    ("vendors", re.compile(r"^/Platform/Destiny2/Vendors/$")),
+    ("group", re.compile(r"^/Platform/GroupV2/\d+/$")),
+    ("group_members", re.compile(r"^/Platform/GroupV2/\d+/Members/$")),
+    ("manifest_zip", re.compile(r"^" + re.escape(MANIFEST_PATH) + r"$"))
+]
+
+
+def envelope(response):
+    """Wraps a Response body in Bungie's standard envelope."""
+
+    return {"Response": response, "ErrorCode": 1, "ThrottleSeconds": 0, "ErrorStatus": "Success", "Message": "Ok", "MessageData": {}}
+
+
+def point_at(base_url, *modules):
+    """
+    Rewrites the Bungie URL constants of the given modules (Conflux, ConfluxWeb, manifest_store, ...) to the stand-in.
+    Only constants a module actually defines are touched.
+    """
+
+    api_url = f"{base_url}/Platform"
+    urls = {
+        "BASE_BUNGIE_URL": base_url,
+        "BASE_API_URL": api_url,
+        "BASE_AUTH_URL": f"{base_url}/en/oauth/authorize",
+        "TOKEN_URL": f"{api_url}/app/oauth/token/",
+        "GET_USER_DETAILS_ENDPOINT": f"{api_url}/User/GetCurrentBungieNetUser/",
+        "GET_DESTINY_PROFILE_ENDPOINT_TEMPLATE": f"{api_url}/Destiny2/{{}}/Profile/{{}}/",
+        "GET_MANIFEST_ENDPOINT": f"{api_url}/Destiny2/Manifest/",
+        "GET_PUBLIC_MILESTONES_ENDPOINT": f"{api_url}/Destiny2/Milestones/",
+        "GET_PUBLIC_VENDORS_ENDPOINT": f"{api_url}/Destiny2/Vendors/"
+    }
+    for module in modules:
+        for name, url in urls.items():
+            if hasattr(module, name):
+                setattr(module, name, url)
+        if hasattr(module, "OAUTH_TOKENS"):
+            module.OAUTH_TOKENS.token_url = urls["TOKEN_URL"]
+
+
+def fake_token(bnet_membership_id="24681357", lifetime=3600):
+    """Returns an OAuth token shaped like Bungie's, accepted by the stand-in."""
+
+    return {
+        "access_token": "synthetic-access-token", "token_type": "Bearer", "expires_in": lifetime,
+        "expires_at": time.time() + lifetime, "refresh_token": "synthetic-refresh-token",
+        "refresh_expires_in": 7776000, "membership_id": bnet_membership_id
+    }
+
+
+class FakeBungieHandler(http.server.BaseHTTPRequestHandler):
+    """Routes requests to the FakeBungieServer that owns this HTTP server."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, keep-alive clients wait out a delayed ACK (~40 ms).
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        fake = self.server.fake
+        path, _, query = self.path.partition("?")
+        route = next((name for name, pattern in ROUTES if pattern.match(path)), None)
+        if route is None:
+            return self._send_json(404, {"ErrorCode": 7, "ErrorStatus": "ParameterParseFailure", "Message": "Not found"})
+
+        if route == "manifest_zip":
+            fake.record(route)
+            return self._send_file(fake.manifest_zip_path)
+
+        if fake.latency:
+            time.sleep(fake.latency)
+        if not fake.admit():
+            fake.record("throttled")
+            return self._send_json(429, {"ErrorCode": 36, "ErrorStatus": "ThrottleLimitExceeded", "ThrottleSeconds": 1, "Message": "Throttled"})
+
+        fake.record(route)
+        if route in ("group", "group_members"):
+            group, members = fake.clan(int(path.split("/")[3]))
+            if route == "group":
+                return self._send_json(200, envelope(group))
+            page = re.search(r"currentpage=(\d+)", query)
+            start = (int(page.group(1)) - 1 if page else 0) * GROUP_MEMBERS_PAGE_SIZE
+            results = members[start:start + GROUP_MEMBERS_PAGE_SIZE]
+            return self._send_json(200, envelope({"results": results, "totalResults": len(members), "hasMore": start + len(results) < len(members)}))
+        if route == "profile" and path.rstrip("/").rsplit("/", 1)[-1] in fake.member_profiles:
+            return self._send_body(200, fake.member_profile_body(path.rstrip("/").rsplit("/", 1)[-1]))
+        if route == "profile":
+            components = re.search(r"components=([\d,%C]+)", query)
+            requested = components.group(1).replace("%2C", ",").replace("%2c", ",").split(",") if components else []
+            return self._send_body(200, fake.profile_body(tuple(sorted(requested))))
+        return self._send_body(200, fake.bodies[route])
+
+    def do_POST(self):
+        fake = self.server.fake
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path.split("?")[0] != "/Platform/app/oauth/token/":
+            return self._send_json(404, {"error": "not_found"})
+        fake.record("token")
+        return self._send_json(200, fake_token(fake.bnet_membership_id))
+
+    def _send_json(self, status, payload):
+        self._send_body(status, json.dumps(payload).encode('utf-8'))
+
+    def _send_body(self, status, body):
+        gzipped = 'gzip' in self.headers.get('Accept-Encoding', '')
+        if gzipped:
+            body = self.server.fake.gzipped(body)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_file(self, file_path):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Length', str(os.path.getsize(file_path)))
+        self.end_headers()
+        with open(file_path, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile, 1024 * 1024)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeBungieServer:
+    """
+    The stand-in server, run on a background thread. Builds its synthetic manifest zip in work_dir (a temporary
+    directory by default) on start.
+    """
+
+    def __init__(self, manifest_rows=20000, latency=0.0, rate_limit=None, fixtures_dir=None, seed=2014,
+                 work_dir=None, characters=3, inventory=60, vault=400, clan_members=100):
+        self.manifest_rows = manifest_rows
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.fixtures_dir = fixtures_dir
+        self.seed = seed
+        self.work_dir = work_dir
+        self.profile_shape = {"characters": characters, "inventory": inventory, "vault": vault}
+        self.clan_members = clan_members
+        self.bnet_membership_id = "24681357"
+        self.clans = {}
+        self.member_profiles = {}
+        self.counts = collections.Counter()
+        self.bodies = {}
+        self._profile_bodies = {}
+        self._gzipped = {}
+        self._window = collections.deque()
+        self._lock = threading.Lock()
+        self._own_work_dir = False
+        self._httpd = None
+
+    def _recorded(self, name):
+        """Returns the raw bytes of a recorded fixture, or None if there isn't one."""
+
+        if not self.fixtures_dir:
+            return None
+        file_path = os.path.join(self.fixtures_dir, f"{name}.json")
+        if not os.path.isfile(file_path):
+            return None
+        with open(file_path, 'rb') as f:
+            return f.read()
+
+    def start(self):
+        """Builds the fixtures and starts serving. Returns the base URL (what BASE_BUNGIE_URL would be)."""
+
+        if self.work_dir is None:
+            self.work_dir = tempfile.mkdtemp(prefix="fake-bungie-")
+            self._own_work_dir = True
+        self.manifest_zip_path = os.path.join(self.work_dir, os.path.basename(MANIFEST_PATH))
+        written = build_synthetic_manifest_zip(self.manifest_zip_path, self.manifest_rows, self.seed)
+
+        user, linked_profiles = build_synthetic_account(self.bnet_membership_id)
+        milestones, vendors = build_synthetic_public_data(seed=self.seed)
+        # Clan members' classes and races resolve against the synthetic manifest too.
+        self._clan_hashes = {
+            table_name: [hash_id for table, hash_id in written if table == table_name][:3]
+            for table_name in ("DestinyClassDefinition", "DestinyRaceDefinition")
+        }
+        self.profile = attach_manifest_hashes(build_synthetic_profile_response(seed=self.seed, **self.profile_shape), written, self.seed)
+        manifest = {"version": MANIFEST_VERSION, "mobileWorldContentPaths": {"en": MANIFEST_PATH}}
+        for name, response in (("user", user), ("linked_profiles", linked_profiles), ("manifest", manifest), ("milestones", milestones), ("vendors", vendors)):
+            self.bodies[name] = self._recorded(name) or json.dumps(envelope(response)).encode('utf-8')
+        self._recorded_profile = self._recorded("profile")
+
+        self._httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), FakeBungieHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self.manifest_url = self.base_url + MANIFEST_PATH
+        return self.base_url
+
+    def stop(self):
+        """Stops serving and removes the temporary work directory, if one was created."""
+
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        if self._own_work_dir:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def record(self, route):
+        """Counts a request to a route."""
+
+        with self._lock:
+            self.counts[route] += 1
+
+    def admit(self):
+        """Returns False if this request goes over rate_limit (requests in the last second)."""
+
+        if not self.rate_limit:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            while self._window and now - self._window[0] > 1:
+                self._window.popleft()
+            if len(self._window) >= self.rate_limit:
+                return False
+            self._window.append(now)
+            return True
+
+    def profile_body(self, components):
+        """Returns the encoded GetProfile body holding only the requested components (cached per combination)."""
+
+        if self._recorded_profile is not None:
+            return self._recorded_profile
+        with self._lock:
+            body = self._profile_bodies.get(components)
+        if body is None:
+            response = {"responseMintedTimestamp": self.profile["responseMintedTimestamp"]}
+            for component in components:
+                keys = COMPONENT_KEYS.get(component)
+                if keys is None:
+                    continue
+                if len(keys) == 1:
+                    response[keys[0]] = self.profile[keys[0]]
+                else:
+                    response.setdefault(keys[0], {})[keys[1]] = self.profile[keys[0]][keys[1]]
+            body = json.dumps(envelope(response)).encode('utf-8')
+            with self._lock:
+                self._profile_bodies[components] = body
+        return body
+
+    def clan(self, group_id):
+        """Returns (group response, member results) for a group, building the synthetic clan on first request."""
+
+        with self._lock:
+            if group_id not in self.clans:
+                group, members, profiles = build_synthetic_clan(
+                    group_id, self.clan_members, self._clan_hashes["DestinyClassDefinition"],
+                    self._clan_hashes["DestinyRaceDefinition"], self.seed
+                )
+                self.clans[group_id] = (group, members)
+                self.member_profiles.update((membership_id, json.dumps(envelope(profile)).encode('utf-8')) for membership_id, profile in profiles.items())
+            return self.clans[group_id]
+
+    def member_profile_body(self, membership_id):
+        """Returns the encoded GetProfile body of a clan member (characters only, whatever was requested)."""
+
+        return self.member_profiles[membership_id]
+
+    def gzipped(self, body):
+        """Returns the gzip-compressed body, cached so compression cost doesn't show up in client timings."""
+
+        with self._lock:
+            compressed = self._gzipped.get(body)
+        if compressed is None:
+            compressed = gzip.compress(body, compresslevel=6)
+            with self._lock:
+                self._gzipped[body] = compressed
+        return compressed
@@ -0,0 +1,252 @@
+# Importing necessary libraries
+import json
+import os
+import random
+import sqlite3
+import time
+import zipfile
+
+# --- Constants & Configuration ---
+
+# Tables written into the synthetic manifest, mirroring the real mobile world content layout (id INTEGER, json BLOB).
+SYNTHETIC_TABLES = [
+    "DestinyClassDefinition",
+    "DestinyRaceDefinition",
+    "DestinyInventoryItemDefinition",
+    "DestinyRecordDefinition"
+]
+
+SYNTHETIC_DB_NAME = "world_sql_content_synthetic.content"
+
+
+def build_synthetic_manifest_db(db_path, rows=100000, seed=2014):
+    """
+    Builds a manifest-shaped SQLite database with `rows` random definitions spread across SYNTHETIC_TABLES.
+    Payloads are random, so the zipped size stays close to the real manifest's compression ratio instead of collapsing.
+    Returns the list of (table, unsigned hash) pairs written, for benchmarks that need real lookups.
+    """
+
+    rng = random.Random(seed)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    con = sqlite3.connect(db_path)
+    written = []
+    for table_name in SYNTHETIC_TABLES:
+        con.execute(f"CREATE TABLE {table_name} (id INTEGER PRIMARY KEY NOT NULL, json BLOB)")
+
+    for index in range(rows):
+        table_name = SYNTHETIC_TABLES[index % len(SYNTHETIC_TABLES)]
+        hash_id = rng.getrandbits(32)
+        signed_id = hash_id - 4294967296 if hash_id > 2147483647 else hash_id
+        definition = {
+            "displayProperties": {
+                "name": f"Synthetic {index}",
+                "description": "".join(rng.choice("abcdefghijklmnopqrstuvwxyz ") for _ in range(120)),
+                "icon": f"/common/destiny2_content/icons/{rng.getrandbits(64):016x}.jpg",
+                "hasIcon": True
+            },
+            "itemTypeDisplayName": rng.choice(["Auto Rifle", "Hand Cannon", "Helmet", "Titan", "Exo"]),
+            "hash": hash_id,
+            "index": index,
+            "redacted": False
+        }
+        con.execute(f"INSERT OR IGNORE INTO {table_name} (id, json) VALUES (?, ?)", (signed_id, json.dumps(definition)))
+        written.append((table_name, hash_id))
+
+    con.commit()
+    con.close()
+    return written
+
+
+def build_synthetic_manifest_zip(zip_path, rows=100000, seed=2014):
+    """
+    Builds a synthetic manifest database and zips it the way Bungie ships mobileWorldContentPaths.
+    Returns the list of (table, unsigned hash) pairs written.
+    """
+
+    db_path = zip_path + ".db"
+    written = build_synthetic_manifest_db(db_path, rows, seed)
+    with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as manifest_zip:
+        manifest_zip.write(db_path, SYNTHETIC_DB_NAME)
+    os.remove(db_path)
+    return written
+
+
+def build_synthetic_profile_response(characters=3, equipped=17, inventory=60, vault=400, seed=2014):
+    """
+    Builds a GetProfile "Response" shaped like components 102,200,201,205,300,304 for a fully played account:
+    `equipped` + `inventory` items per character and `vault` items in the profile inventory, every weapon/armor
+    item instanced with a handful of stats.
+    """
+
+    rng = random.Random(seed)
+    instances, stats = {}, {}
+
+    def item(bucket_hash):
+        instance_id = str(6917529000000000000 + rng.getrandbits(40))
+        instances[instance_id] = {
+            "damageType": rng.choice([1, 2, 3, 4, 6]),
+            "primaryStat": {"statHash": 1480404414, "value": rng.randint(1800, 2010)},
+            "itemLevel": 200, "quality": 0, "isEquipped": False, "canEquip": True,
+            "equipRequiredLevel": 0, "unlockHashesRequiredToEquip": [2166136261], "cannotEquipReason": 0, "energy": None
+        }
+        stats[instance_id] = {"stats": {
+            str(stat_hash): {"statHash": stat_hash, "value": rng.randint(2, 42)}
+            for stat_hash in rng.sample([2996146975, 392767087, 1943323491, 1735777505, 144602215, 4244567218], 6)
+        }}
+        return {
+            "itemHash": rng.getrandbits(32), "itemInstanceId": instance_id, "quantity": 1, "bindStatus": 0,
+            "location": 1, "bucketHash": bucket_hash, "transferStatus": 0, "lockable": True, "state": rng.choice([0, 1, 4]),
+            "dismantlePermission": 0, "isWrapper": False, "tooltipNotificationIndexes": [], "versionNumber": 0
+        }
+
+    response = {
+        "responseMintedTimestamp": "2026-10-17T00:00:00Z",
+        "characters": {"data": {}, "privacy": 1},
+        "characterEquipment": {"data": {}, "privacy": 2},
+        "characterInventories": {"data": {}, "privacy": 2},
+        "profileInventory": {"data": {"items": [item(138197802) for _ in range(vault)]}, "privacy": 2},
+        "itemComponents": {"instances": {"data": instances, "privacy": 2}, "stats": {"data": stats, "privacy": 2}}
+    }
+    for index in range(characters):
+        character_id = str(2305843009000000000 + index)
+        response["characters"]["data"][character_id] = {
+            "membershipId": "4611686018400000000", "membershipType": 3, "characterId": character_id,
+            "dateLastPlayed": "2026-10-16T21:04:11Z", "minutesPlayedThisSession": "95", "minutesPlayedTotal": "81234",
+            "light": 2010, "stats": {str(stat_hash): rng.randint(10, 200) for stat_hash in range(1, 9)},
+            "raceHash": 898834093, "genderHash": 3111576190, "classHash": 3655393761, "raceType": 1, "classType": 0,
+            "genderType": 0, "emblemPath": "/common/destiny2_content/icons/emblem.jpg",
+            "emblemBackgroundPath": "/common/destiny2_content/icons/emblem_background.jpg", "emblemHash": 4132147349,
+            "emblemColor": {"red": 12, "green": 20, "blue": 31, "alpha": 255}, "levelProgression": {},
+            "baseCharacterLevel": 50, "percentToNextLevel": 0.0, "titleRecordHash": 2909250963
+        }
+        response["characterEquipment"]["data"][character_id] = {"items": [item(3448274439) for _ in range(equipped)]}
+        response["characterInventories"]["data"][character_id] = {"items": [item(1498876634) for _ in range(inventory)]}
+    return response
+
+
+def attach_manifest_hashes(profile_response, written, seed=2014):
+    """
+    Points the class, race, title and item hashes of a synthetic profile at definitions that exist in a synthetic
+    manifest (the (table, hash) pairs returned by build_synthetic_manifest_db), so lookups hit like they do in production.
+    """
+
+    rng = random.Random(seed)
+    by_table = {}
+    for table_name, hash_id in written:
+        by_table.setdefault(table_name, []).append(hash_id)
+
+    for character in profile_response["characters"]["data"].values():
+        character["classHash"] = rng.choice(by_table["DestinyClassDefinition"])
+        character["raceHash"] = rng.choice(by_table["DestinyRaceDefinition"])
+        character["titleRecordHash"] = rng.choice(by_table["DestinyRecordDefinition"])
+
+    item_lists = [profile_response["profileInventory"]["data"]["items"]]
+    for component in ("characterEquipment", "characterInventories"):
+        item_lists.extend(entry["items"] for entry in profile_response[component]["data"].values())
+    for items in item_lists:
+        for item in items:
+            item["itemHash"] = rng.choice(by_table["DestinyInventoryItemDefinition"])
+    return profile_response
+
+
+def build_synthetic_account(bnet_membership_id="24681357", destiny_membership_id="4611686018400000000", membership_type=3):
+    """
+    Returns the GetCurrentBungieNetUser and LinkedProfiles "Response" bodies for a synthetic account whose Steam
+    profile is the cross save primary.
+    """
+
+    user = {
+        "membershipId": bnet_membership_id, "uniqueName": "Synthetic#0001", "displayName": "Synthetic",
+        "profilePicture": 70500, "profileTheme": 1211, "userTitle": 0, "successMessageFlags": "0",
+        "isDeleted": False, "about": "", "firstAccess": "2017-09-06T17:00:00Z", "lastUpdate": "2026-10-16T21:04:11Z",
+        "locale": "en", "localeInheritDefault": True, "showActivity": True, "profilePicturePath": "/img/profile/avatars/default.jpg",
+        "cachedBungieGlobalDisplayName": "Synthetic", "cachedBungieGlobalDisplayNameCode": 1
+    }
+    linked_profiles = {
+        "profiles": [{
+            "dateLastPlayed": "2026-10-16T21:04:11Z", "isOverridden": False, "isCrossSavePrimary": True,
+            "crossSaveOverride": membership_type, "applicableMembershipTypes": [2, 3, 6], "isPublic": True,
+            "membershipType": membership_type, "membershipId": destiny_membership_id, "displayName": "Synthetic",
+            "bungieGlobalDisplayName": "Synthetic", "bungieGlobalDisplayNameCode": 1
+        }],
+        "bnetMembership": {"membershipId": bnet_membership_id, "membershipType": 254, "displayName": "Synthetic"},
+        "profilesWithErrors": []
+    }
+    return user, linked_profiles
+
+
+def build_synthetic_public_data(milestones=12, vendors=8, sales=20, seed=2014):
+    """
+    Returns the GetPublicMilestones and GetPublicVendors (components 400,402) "Response" bodies: data that is the same
+    for every player.
+    """
+
+    rng = random.Random(seed)
+    public_milestones = {}
+    for _ in range(milestones):
+        milestone_hash = rng.getrandbits(32)
+        public_milestones[str(milestone_hash)] = {
+            "milestoneHash": milestone_hash, "order": rng.randint(0, 1000),
+            "startDate": "2026-10-13T17:00:00Z", "endDate": "2026-10-20T17:00:00Z",
+            "activities": [{"activityHash": rng.getrandbits(32), "challengeObjectiveHashes": [], "modifierHashes": [rng.getrandbits(32) for _ in range(3)]}]
+        }
+    public_vendors = {"vendors": {"data": {}}, "sales": {"data": {}}}
+    for _ in range(vendors):
+        vendor_hash = str(rng.getrandbits(32))
+        public_vendors["vendors"]["data"][vendor_hash] = {
+            "vendorHash": int(vendor_hash), "enabled": True, "canPurchase": True, "nextRefreshDate": "2026-10-18T17:00:00Z"
+        }
+        public_vendors["sales"]["data"][vendor_hash] = {"saleItems": {
+            str(index): {"vendorItemIndex": index, "itemHash": rng.getrandbits(32), "quantity": 1, "costs": [{"itemHash": 3159615086, "quantity": rng.randint(1, 500)}]}
+            for index in range(sales)
+        }}
+    return public_milestones, public_vendors
+
+
+def build_synthetic_clan(group_id, members=100, class_hashes=(3655393761, 671679327, 2271682572),
+                         race_hashes=(898834093, 3887404748, 2803282938), seed=2014):
+    """
+    Builds a clan: the GroupV2 group "Response" body, its member results (as GetMembersOfGroup lists them) and
+    {destiny membership id: GetProfile "Response" with component 200} for every member. Members have one to three
+    characters with varied classes, races and light levels, and last played some time in the past 30 days.
+    """
+
+    rng = random.Random(f"{seed}:{group_id}")
+    now = time.time()
+    group = {"detail": {
+        "groupId": str(group_id), "name": f"Synthetic Clan {group_id}", "groupType": 1, "memberCount": members,
+        "isPublic": True, "locale": "en", "clanInfo": {"clanCallsign": f"S{group_id % 1000}"}
+    }}
+    results, profiles = [], {}
+    for index in range(members):
+        membership_id = str(4611686018500000000 + rng.getrandbits(40))
+        membership_type = rng.choice([1, 2, 3, 3, 3, 6])
+        display_name = f"Member{index:03d}"
+        last_played = now - rng.uniform(0, 30) * 86400
+        results.append({
+            "memberType": 2 if index else 5, "isOnline": rng.random() < 0.1, "groupId": str(group_id),
+            "destinyUserInfo": {
+                "membershipType": membership_type, "membershipId": membership_id, "displayName": display_name,
+                "bungieGlobalDisplayName": display_name, "bungieGlobalDisplayNameCode": index + 1, "crossSaveOverride": membership_type
+            },
+            "joinDate": "2024-02-27T17:00:00Z"
+        })
+        characters = {}
+        for character_index in range(rng.randint(1, 3)):
+            character_id = str(2305843009100000000 + rng.getrandbits(32))
+            characters[character_id] = {
+                "membershipId": membership_id, "membershipType": membership_type, "characterId": character_id,
+                "dateLastPlayed": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(last_played - character_index * 86400)),
+                "light": rng.randint(1900, 2010) - character_index * rng.randint(0, 20),
+                "classHash": rng.choice(class_hashes),
+                "raceHash": rng.choice(race_hashes),
+                "emblemPath": "/common/destiny2_content/icons/emblem.jpg",
+                "emblemBackgroundPath": "/common/destiny2_content/icons/emblem_background.jpg"
+            }
+        profiles[membership_id] = {
+            "responseMintedTimestamp": "2026-10-17T00:00:00Z",
+            "characters": {"data": characters, "privacy": 1}
+        }
+    return group, results, profiles
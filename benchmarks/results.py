@@ -0,0 +1,93 @@
+"""
+Helpers for storing benchmark results as JSON so runs on different commits can be compared.
+"""
+
+# Importing necessary libraries
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+# --- Constants & Configuration ---
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def git_commit():
+    """Returns the current commit hash (with "-dirty" if the tree has changes), or "unknown" outside a git checkout."""
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def summarize(samples):
+    """Summarizes a list of timings in seconds as milliseconds: min / median / p95 / max."""
+
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "runs": len(ordered),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "median_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3)
+    }
+
+
+def write_results(name, results, output=None):
+    """
+    Writes a benchmark's results with the commit, timestamp and interpreter they came from.
+    Defaults to benchmarks/results/<commit>/<name>.json. Returns the path written.
+    """
+
+    commit = git_commit()
+    output = output or os.path.join(RESULTS_DIR, commit, f"{name}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    document = {
+        "benchmark": name,
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    return output
+
+
+def flatten(results, prefix=""):
+    """Flattens nested result dicts into {"a.b.c": number} for comparison."""
+
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline_path, current_path):
+    """Returns lines describing how every numeric result changed between two result files."""
+
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(current_path, encoding='utf-8') as f:
+        current = json.load(f)
+
+    before, after = flatten(baseline["results"]), flatten(current["results"])
+    lines = [f"{current['benchmark']}: {baseline['commit']} -> {current['commit']}"]
+    for name in sorted(before.keys() & after.keys()):
+        old, new = before[name], after[name]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        lines.append(f"  {name:<50} {old:>12} -> {new:<12} ({change})")
+    return lines
@@ -0,0 +1,52 @@
+"""
+Runs the offline benchmark suite (main flow, manifest download, manifest queries, dashboard, clan report) and optionally compares
+the results with an earlier commit's.
+
+Run from the repository root:
+    python -m benchmarks.run_all
+    python -m benchmarks.run_all --compare 448e9e4
+
+Each benchmark writes benchmarks/results/<commit>/<name>.json; --compare prints the change in every number against
+benchmarks/results/<baseline>/ for the benchmarks present in both. Use --quick for a fast smoke run.
+"""
+
+# Importing necessary libraries
+import argparse
+import os
+
+from benchmarks import bench_clan, bench_dashboard, bench_main_flow, bench_manifest_query
+from benchmarks.results import RESULTS_DIR, compare, write_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--compare', metavar='COMMIT', help="baseline commit directory under benchmarks/results/")
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds the stand-in adds to every API call")
+    parser.add_argument('--quick', action='store_true', help="fewer runs and a smaller manifest")
+    args = parser.parse_args()
+
+    runs, rows, query_rows = (2, 5000, 20000) if args.quick else (5, 20000, 200000)
+    suite = [
+        ("main_flow", lambda: bench_main_flow.run(rows, args.latency, runs)),
+        ("manifest_query", lambda: bench_manifest_query.run(query_rows, query_rows // 10)),
+        ("dashboard", lambda: bench_dashboard.run(rows, args.latency, runs * 2)),
+        ("clan", lambda: bench_clan.run(1 if args.quick else 3, 100, args.latency, 1 if args.quick else 3, manifest_rows=rows))
+    ]
+
+    written = {}
+    for name, benchmark in suite:
+        print(f"Running {name}...")
+        written[name] = write_results(name, benchmark())
+        print(f"  {written[name]}")
+
+    if args.compare:
+        for name, current_path in written.items():
+            baseline_path = os.path.join(RESULTS_DIR, args.compare, f"{name}.json")
+            if not os.path.exists(baseline_path):
+                print(f"{name}: no baseline at {baseline_path}")
+                continue
+            print("\n".join(compare(baseline_path, current_path)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# --- Configuration ---
+# The folder the web app serves static files from.
+STATIC_DIR = "static"
+
+# Where hashed (and precompressed) copies are written, and the manifest mapping original names to them.
+# The web app serves everything under here with immutable cache headers.
+DIST_DIR = "static/dist"
+ASSET_MANIFEST_FILE = "static/dist/assets-manifest.json"
+HASH_LENGTH = 12
+
+# Paths under STATIC_DIR that are never served to pages: icon sources, build bookkeeping, editor files.
+SKIP_DIRS = {"dist", os.path.join("Icons", "source")}
+SKIP_FILES = {"desktop.ini", "sprite-manifest.json"}
+
+# Text formats worth precompressing; images are already compressed.
+COMPRESSIBLE_EXTENSIONS = {".svg", ".css", ".js", ".json", ".html", ".txt", ".xml", ".ico", ".map"}
+
+# A precompressed variant is only kept if it saves at least this fraction of the original.
+MIN_COMPRESSION_SAVING = 0.1
+
+# Names that already carry a content hash (e.g. the sprite from build_sprite.py) keep them.
+HASHED_NAME = re.compile(rf'\.[0-9a-f]{{{HASH_LENGTH}}}\.\w+$')
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# PNG chunks that don't affect how the image is drawn.
+PNG_DROPPABLE_CHUNKS = {b'tEXt', b'zTXt', b'iTXt', b'tIME'}
+
+# --- Main Script Logic ---
+
+def optimize_png(data):
+    """
+    Losslessly shrinks a PNG: drops text and timestamp chunks, and recompresses the image data at zlib's maximum level
+    with whichever strategy comes out smallest. Pixel data is untouched. Returns the original bytes if that's smaller.
+    """
+
+    if not data.startswith(PNG_SIGNATURE):
+        return data
+
+    chunks = []
+    position = len(PNG_SIGNATURE)
+    while position < len(data):
+        length, chunk_type = struct.unpack('>I4s', data[position:position + 8])
+        chunks.append((chunk_type, data[position + 8:position + 8 + length]))
+        position += 12 + length
+
+    image_data = zlib.decompress(b''.join(body for chunk_type, body in chunks if chunk_type == b'IDAT'))
+    candidates = []
+    for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+        candidates.append(compressor.compress(image_data) + compressor.flush())
+    recompressed = min(candidates, key=len)
+
+    output = [PNG_SIGNATURE]
+    for chunk_type, body in chunks:
+        if chunk_type in PNG_DROPPABLE_CHUNKS:
+            continue
+        if chunk_type == b'IDAT':
+            # All image data goes out as one chunk, where the first IDAT was.
+            if recompressed is None:
+                continue
+            body, recompressed = recompressed, None
+        output.append(struct.pack('>I4s', len(body), chunk_type) + body + struct.pack('>I', zlib.crc32(chunk_type + body)))
+    optimized = b''.join(output)
+    return optimized if len(optimized) < len(data) else data
+
+
+def precompress(data):
+    """Returns {encoding: compressed bytes} for the gzip and (if the brotli module is installed) br variants worth keeping."""
+
+    variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(data, quality=11)
+    return {encoding: body for encoding, body in variants.items() if len(body) <= len(data) * (1 - MIN_COMPRESSION_SAVING)}
+
+
+def hashed_name(relative_path, data):
+    """Adds a content hash to a file name: Media/ConfluxLogo.png -> Media/ConfluxLogo.<hash>.png."""
+
+    if HASHED_NAME.search(relative_path):
+        return relative_path
+    root, extension = os.path.splitext(relative_path)
+    return f"{root}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{extension}"
+
+
+def write_if_missing(file_path, data):
+    """Writes a file atomically unless it exists; hashed names pin their content. Returns True if it was written."""
+
+    if os.path.exists(file_path):
+        return False
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    temp_path = file_path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, file_path)
+    return True
+
+
+def find_assets():
+    """Returns the sorted paths, relative to STATIC_DIR, of every file to publish."""
+
+    assets = []
+    for directory, subdirectories, filenames in os.walk(STATIC_DIR):
+        relative_dir = os.path.relpath(directory, STATIC_DIR)
+        subdirectories[:] = [d for d in subdirectories if os.path.normpath(os.path.join(relative_dir, d)) not in SKIP_DIRS]
+        for filename in filenames:
+            if filename in SKIP_FILES or filename.endswith('.tmp'):
+                continue
+            assets.append(os.path.normpath(os.path.join(relative_dir, filename)).replace(os.sep, '/'))
+    return sorted(assets)
+
+
+def build_assets():
+    """
+    Publishes every static asset under DIST_DIR with a content-hashed name, PNGs losslessly recompressed and text
+    assets alongside gzip (.gz) and brotli (.br) variants, then writes ASSET_MANIFEST_FILE mapping each original name
+    to its hashed path and available encodings. Unchanged assets are not rewritten, and hashed files no longer in the
+    manifest are removed.
+    Returns the manifest, or None if the build failed.
+    """
+    print("Starting static asset build...")
+
+    if not os.path.isdir(STATIC_DIR):
+        print(f"Error: Static directory not found at '{STATIC_DIR}'")
+        return None
+    if brotli is None:
+        print("Warning: the brotli module is not installed (pip install -r requirements.txt); no .br variants will be "
+              "written and browsers will get the larger gzip ones.", file=sys.stderr)
+
+    manifest = {}
+    written = set()
+    total_before = total_after = 0
+    for relative_path in find_assets():
+        try:
+            with open(os.path.join(STATIC_DIR, relative_path), 'rb') as f:
+                original = f.read()
+
+            data = optimize_png(original) if relative_path.lower().endswith('.png') else original
+            target = hashed_name(relative_path, data)
+            write_if_missing(os.path.join(DIST_DIR, target), data)
+            written.add(target)
+
+            encodings = []
+            if os.path.splitext(relative_path)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                for encoding, body in precompress(data).items():
+                    suffix = ".br" if encoding == "br" else ".gz"
+                    write_if_missing(os.path.join(DIST_DIR, target + suffix), body)
+                    written.add(target + suffix)
+                    encodings.append(encoding)
+
+            manifest[relative_path] = {"path": f"{os.path.basename(DIST_DIR)}/{target}", "encodings": sorted(encodings)}
+            total_before += len(original)
+            total_after += len(data)
+            if len(data) != len(original):
+                print(f"  '{relative_path}': {len(original):,} -> {len(data):,} bytes")
+        except Exception as e:
+            print(f"  Error processing '{relative_path}': {e}")
+            return None
+
+    # Removing outputs of earlier builds.
+    for directory, _, filenames in os.walk(DIST_DIR):
+        for filename in filenames:
+            relative_path = os.path.relpath(os.path.join(directory, filename), DIST_DIR).replace(os.sep, '/')
+            if relative_path not in written and os.path.join(directory, filename) != os.path.normpath(ASSET_MANIFEST_FILE):
+                os.remove(os.path.join(directory, filename))
+
+    content = json.dumps(manifest, indent=2, sort_keys=True) + "\n"
+    try:
+        with open(ASSET_MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            unchanged = f.read() == content
+    except OSError:
+        unchanged = False
+    if not unchanged:
+        with open(ASSET_MANIFEST_FILE + ".tmp", 'w', encoding='utf-8', newline='\n') as f:
+            f.write(content)
+        os.replace(ASSET_MANIFEST_FILE + ".tmp", ASSET_MANIFEST_FILE)
+
+    print(f"\nBuild complete! {len(manifest)} asset(s), {total_before:,} -> {total_after:,} bytes before transfer compression.")
+    print(f"Manifest {'updated' if not unchanged else 'unchanged'}: '{ASSET_MANIFEST_FILE}'")
+    return manifest
+
+# This allows the script to be run from the command line
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Publishes static/ as content-hashed, precompressed files under static/dist. Run build_sprite.py first.")
+    parser.parse_args()
+    if build_assets() is None:
+        sys.exit(1)
@@ -1,82 +1,763 @@
+import argparse
+import hashlib
+import json
+import math
 import os
 import re
+import sys
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
 
 # --- Configuration ---
 # The folder where your individual .svg icons are stored.
-SOURCE_ICON_DIR = "static/Icons/source" 
+SOURCE_ICON_DIR = "static/Icons/source"
 
 # The path where the final combined sprite will be saved.
 DEST_SPRITE_FILE = "static/Conflux-Icons.svg"
 
+# Content-hashed copies for browsers to cache long-term: the full sprite goes next to DEST_SPRITE_FILE, per-template
+# subsets (only the symbols a template uses, for pages that inline their sprite) into SUBSET_DIR. SPRITE_MANIFEST_FILE
+# maps them to their current hashed names, relative to static/, for the web app to read.
+TEMPLATE_DIR = "templates"
+SUBSET_DIR = "static/sprites"
+SPRITE_MANIFEST_FILE = "static/sprite-manifest.json"
+HASH_LENGTH = 12
+
+# Per-icon content hashes and processed <symbol> output from the last build, so unchanged icons aren't reprocessed.
+# Kept outside static/ so it is never served.
+BUILD_CACHE_FILE = ".sprite-build-cache.json"
+
+# Bump whenever process_icon's or optimize_symbol's output changes, so cached symbols from older builds are thrown away.
+BUILD_VERSION = 2
+
+# Below this many icons to (re)process, a process pool costs more to start than it saves.
+PARALLEL_THRESHOLD = 16
+
+# Significant digits kept for coordinates, relative to the icon's viewBox: 4 keeps 2 decimals in a 32-unit viewBox and
+# whole numbers in a 1024-unit one, well under a pixel at any size the icons are drawn.
+SVG_PRECISION = 4
+
+SVG_NS = "http://www.w3.org/2000/svg"
+XLINK_NS = "http://www.w3.org/1999/xlink"
+XML_NS = "http://www.w3.org/XML/1998/namespace"
+
+# Groups that only exist in an editor (IcoMoon's pixel grid), dropped with everything inside them.
+EDITOR_GROUP_IDS = {"icomoon-ignore"}
+
+# Elements that carry no rendering.
+METADATA_TAGS = {"metadata", "desc"}
+
+# Attributes editors leave behind that do nothing in a sprite.
+EDITOR_ATTRIBUTES = {"data-name", "version"}
+
+# Elements whose text content is meaningful.
+TEXT_TAGS = {"title", "style", "text", "tspan"}
+
+# Numeric attributes rounded to the coordinate precision.
+GEOMETRY_ATTRIBUTES = {"x", "y", "x1", "y1", "x2", "y2", "cx", "cy", "r", "rx", "ry", "width", "height"}
+
+# Path commands and how many parameters each takes.
+PATH_ARITY = {"M": 2, "L": 2, "H": 1, "V": 1, "C": 6, "S": 4, "Q": 4, "T": 2, "A": 7, "Z": 0}
+
+# Which parameters of each command are x (0) or y (1) coordinates; the rest (arc radii, rotation, flags) are not
+# shifted when writing a segment relative to the current point.
+PATH_COORDINATES = {
+    "M": (0, 1), "L": (0, 1), "H": (0,), "V": (1,), "C": (0, 1, 0, 1, 0, 1), "S": (0, 1, 0, 1),
+    "Q": (0, 1, 0, 1), "T": (0, 1), "A": (None, None, None, None, None, 0, 1), "Z": ()
+}
+
+# Symbols a template uses: <use href="#id"> (or "{{ sprite_url }}#id"), plus ids listed in a {# sprite: id id #} comment
+# for icons whose id is only known at render time.
+_TEMPLATE_USE = re.compile(r'<use\b[^>]*?href="(?:\{\{\s*sprite_url\s*\}\})?#([\w.-]+)"')
+_TEMPLATE_SPRITE_COMMENT = re.compile(r'\{#\s*sprite:([^#]*)#\}')
+
+_PATH_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+_REFERENCE = re.compile(r'url\(#([^)]+)\)')
+
+# --- Optimization ---
+
+def _format_number(value, decimals):
+    """Shortest text for a number at the given precision: no trailing zeros, no leading zero, no negative zero."""
+
+    text = f"{value:.{decimals}f}"
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    if text in ('-0', ''):
+        return '0'
+    if text.startswith('0.'):
+        return text[1:]
+    if text.startswith('-0.'):
+        return '-' + text[2:]
+    return text
+
+
+def _needs_separator(previous, following):
+    """True if two numbers written back to back would run together."""
+
+    if not previous or following.startswith('-'):
+        return False
+    # ".5" can follow a number that already has a decimal point (or an exponent) directly: "1.5.5" is 1.5 then .5.
+    return not (following.startswith('.') and ('.' in previous or 'e' in previous))
+
+
+def parse_path(d):
+    """
+    Parses path data into a list of (command, params) segments with every command made absolute and uppercase,
+    implicit repeats expanded. Raises ValueError on malformed data.
+    """
+
+    segments = []
+    position, length = 0, len(d)
+    current_x = current_y = start_x = start_y = 0.0
+    command = None
+
+    def skip_separators():
+        nonlocal position
+        while position < length and d[position] in ' \t\r\n,':
+            position += 1
+
+    def read_number():
+        nonlocal position
+        skip_separators()
+        match = _PATH_NUMBER.match(d, position)
+        if not match:
+            raise ValueError(f"Expected a number at {position} in path data")
+        position = match.end()
+        return float(match.group())
+
+    def read_flag():
+        nonlocal position
+        skip_separators()
+        if position >= length or d[position] not in '01':
+            raise ValueError(f"Expected an arc flag at {position} in path data")
+        position += 1
+        return float(d[position - 1])
+
+    while True:
+        skip_separators()
+        if position >= length:
+            break
+        if d[position].isalpha():
+            command = d[position]
+            position += 1
+            if command.upper() not in PATH_ARITY:
+                raise ValueError(f"Unknown path command '{command}'")
+        elif command is None:
+            raise ValueError("Path data doesn't start with a command")
+
+        upper = command.upper()
+        relative = command != upper
+        if upper == "Z":
+            segments.append(("Z", []))
+            current_x, current_y = start_x, start_y
+            command = None
+            continue
+
+        if upper == "A":
+            params = [read_number(), read_number(), read_number(), read_flag(), read_flag(), read_number(), read_number()]
+        else:
+            params = [read_number() for _ in range(PATH_ARITY[upper])]
+
+        if relative:
+            for index, axis in enumerate(PATH_COORDINATES[upper]):
+                if axis is not None:
+                    params[index] += current_x if axis == 0 else current_y
+
+        if upper == "H":
+            current_x = params[0]
+        elif upper == "V":
+            current_y = params[0]
+        else:
+            current_x, current_y = params[-2], params[-1]
+        if upper == "M":
+            start_x, start_y = current_x, current_y
+            # Further coordinate pairs after a moveto are implicit linetos.
+            command = "l" if relative else "L"
+        segments.append((upper, params))
+
+    return segments
+
+
+def round_path(segments, decimals):
+    """Rounds every parameter of absolute segments (flags stay 0/1)."""
+
+    return [(command, [round(value, decimals) for value in params]) for command, params in segments]
+
+
+def path_bbox(segments):
+    """
+    Returns a bounding box (min_x, min_y, max_x, max_y) guaranteed to contain the path: curves lie inside the hull of
+    their control points, and arcs inside a padded box around their endpoints.
+    """
+
+    xs, ys = [], []
+    current_x = current_y = start_x = start_y = 0.0
+    control_x = control_y = None
+    previous = None
+    for command, params in segments:
+        if command == "Z":
+            current_x, current_y = start_x, start_y
+        elif command == "H":
+            xs.append(params[0])
+            ys.append(current_y)
+            current_x = params[0]
+        elif command == "V":
+            xs.append(current_x)
+            ys.append(params[0])
+            current_y = params[0]
+        elif command == "A":
+            end_x, end_y = params[5], params[6]
+            pad = max(2 * max(abs(params[0]), abs(params[1])), math.hypot(end_x - current_x, end_y - current_y))
+            xs.extend((current_x - pad, current_x + pad, end_x - pad, end_x + pad))
+            ys.extend((current_y - pad, current_y + pad, end_y - pad, end_y + pad))
+            current_x, current_y = end_x, end_y
+        else:
+            points = list(zip(params[0::2], params[1::2]))
+            # The implied first control point of S and T is the previous one reflected through the current point.
+            if command in ("S", "T"):
+                if control_x is not None and previous in (("C", "S") if command == "S" else ("Q", "T")):
+                    points.append((2 * current_x - control_x, 2 * current_y - control_y))
+            xs.extend(x for x, _ in points)
+            ys.extend(y for _, y in points)
+            if command in ("C", "S", "Q"):
+                control_x, control_y = params[-4], params[-3]
+            elif command == "T":
+                control_x, control_y = points[-1] if len(points) > 1 else (current_x, current_y)
+            current_x, current_y = params[-2], params[-1]
+            if command == "M":
+                start_x, start_y = current_x, current_y
+        previous = command
+    if not xs:
+        return None
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def serialize_path(segments, decimals):
+    """
+    Writes rounded absolute segments as the shortest path data: each segment absolute or relative, whichever is
+    shorter, with repeated command letters and unneeded separators left out.
+    """
+
+    output = []
+    last_number = ""
+    last_command = None
+    current_x = current_y = start_x = start_y = 0.0
+
+    for command, params in segments:
+        if command == "Z":
+            output.append("z")
+            last_command, last_number = "z", ""
+            current_x, current_y = start_x, start_y
+            continue
+
+        relative_params = list(params)
+        for index, axis in enumerate(PATH_COORDINATES[command]):
+            if axis is not None:
+                relative_params[index] = round(params[index] - (current_x if axis == 0 else current_y), decimals)
+
+        best = None
+        for letter, values in ((command, params), (command.lower(), relative_params)):
+            numbers = [_format_number(value, decimals) for value in values]
+            implicit = letter == last_command and letter not in "Mm" or (last_command, letter) in (("M", "L"), ("m", "l"))
+            text = "" if implicit else letter
+            previous = "" if not implicit else last_number
+            for number in numbers:
+                if _needs_separator(previous, number):
+                    text += " "
+                text += number
+                previous = number
+            if best is None or len(text) < len(best[0]):
+                best = (text, letter, previous)
+
+        text, letter, last_number = best
+        output.append(text)
+        last_command = letter
+        if command == "H":
+            current_x = params[0]
+        elif command == "V":
+            current_y = params[0]
+        else:
+            current_x, current_y = params[-2], params[-1]
+        if command == "M":
+            start_x, start_y = current_x, current_y
+
+    return "".join(output)
+
+
+def _boxes_overlap(a, b):
+    return not (a[2] < b[0] or b[2] < a[0] or a[3] < b[1] or b[3] < a[1])
+
+
+def _local_name(tag):
+    """Returns an SVG element's local name, or None for elements in another namespace (editor metadata)."""
+
+    if not isinstance(tag, str):
+        return None
+    if tag.startswith("{" + SVG_NS + "}"):
+        return tag[len(SVG_NS) + 2:]
+    return None if tag.startswith("{") else tag
+
+
+def _attribute_name(name):
+    """Returns the attribute's name as written in the sprite, or None for editor-namespaced attributes."""
+
+    if name.startswith("{" + XLINK_NS + "}"):
+        return "xlink:" + name[len(XLINK_NS) + 2:]
+    if name.startswith("{" + XML_NS + "}"):
+        return "xml:" + name[len(XML_NS) + 2:]
+    return None if name.startswith("{") else name
+
+
+def _escape(text, attribute=False):
+    text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    return text.replace('"', "&quot;") if attribute else text
+
+
+def _serialize(element, skip_id=False):
+    """Writes an optimized element tree compactly."""
+
+    attributes = "".join(
+        f' {name}="{_escape(value, True)}"' for name, value in element.attrib.items() if not (skip_id and name == "id")
+    )
+    children = "".join(_serialize(child) for child in element)
+    text = _escape(element.text) if element.text and element.tag in TEXT_TAGS else ""
+    if not children and not text:
+        return f"<{element.tag}{attributes}/>"
+    return f"<{element.tag}{attributes}>{text}{children}</{element.tag}>"
+
+
+def _clean(element, decimals, references):
+    """
+    Rebuilds an element tree in place: drops comments, metadata, editor elements and attributes, unreferenced ids,
+    whitespace, empty titles and empty groups; unwraps attribute-less groups; rounds geometry and minifies path data.
+    Returns the list of elements to put in the element's place (empty to remove it).
+    """
+
+    name = _local_name(element.tag)
+    if name is None or name in METADATA_TAGS:
+        return []
+    if name == "g" and element.get("id") in EDITOR_GROUP_IDS:
+        return []
+
+    cleaned = ET.Element(name)
+    for attribute, value in element.attrib.items():
+        attribute = _attribute_name(attribute)
+        if attribute is None or attribute in EDITOR_ATTRIBUTES:
+            continue
+        if attribute == "id" and value not in references:
+            continue
+        if attribute == "style" and not value.strip():
+            continue
+        if attribute in GEOMETRY_ATTRIBUTES and _PATH_NUMBER.fullmatch(value.strip()):
+            value = _format_number(float(value), decimals)
+        elif attribute == "points":
+            value = " ".join(_format_number(float(number), decimals) for number in _PATH_NUMBER.findall(value))
+        elif attribute == "d":
+            try:
+                segments = round_path(parse_path(value), decimals)
+            except ValueError:
+                segments = None
+            if segments is not None:
+                if not segments:
+                    return []
+                value = serialize_path(segments, decimals)
+        cleaned.set(attribute, value)
+
+    if name in TEXT_TAGS:
+        cleaned.text = element.text.strip() if element.text else ""
+        if name == "title" and not cleaned.text:
+            return []
+
+    for child in element:
+        cleaned.extend(_clean(child, decimals, references))
+
+    if name in ("g", "defs") and len(cleaned) == 0:
+        return []
+    if name == "g" and not cleaned.attrib:
+        return list(cleaned)
+    return [cleaned]
+
+
+def _merge_paths(element, decimals):
+    """
+    Merges runs of sibling <path>s with identical attributes into one path. Only paths whose bounding boxes don't
+    overlap are merged, so the fill rule can't turn overlapping areas into holes.
+    """
+
+    for child in element:
+        _merge_paths(child, decimals)
+
+    merged = []
+    group = None
+    for child in list(element):
+        mergeable = child.tag == "path" and "id" not in child.attrib and "d" in child.attrib
+        key = tuple(sorted((k, v) for k, v in child.attrib.items() if k != "d")) if mergeable else None
+        try:
+            segments = parse_path(child.get("d")) if mergeable else None
+            box = path_bbox(segments) if segments else None
+        except ValueError:
+            box = None
+        if box is not None and group is not None and group["key"] == key and not any(_boxes_overlap(box, other) for other in group["boxes"]):
+            group["segments"].extend(segments)
+            group["boxes"].append(box)
+            continue
+        group = {"element": child, "key": key, "segments": segments, "boxes": [box]} if box is not None else None
+        merged.append((child, group))
+
+    for child in list(element):
+        element.remove(child)
+    for child, group in merged:
+        if group is not None and len(group["boxes"]) > 1:
+            child.set("d", serialize_path(group["segments"], decimals))
+        element.append(child)
+
+
+def optimize_symbol(symbol_str):
+    """
+    Shrinks a <symbol> string: removes comments, metadata, editor namespaces and attributes, empty and redundant groups
+    and unreferenced ids; rounds coordinates to SVG_PRECISION significant digits of the viewBox; minifies and merges
+    path data. Referenced ids are prefixed with the symbol id so they stay unique across the sprite, and <defs>
+    entries that carry an id are lifted out to be shared (and deduplicated) at sprite level.
+    Returns (optimized symbol string, [(def id, def markup without its id)]).
+    """
+
+    # The symbol was cut out of its <svg>, so the namespace prefixes it uses are declared again around it.
+    prefixes = set(re.findall(r'</?([A-Za-z_][\w.-]*):[\w.-]+|\s([A-Za-z_][\w.-]*):[\w.-]+=', symbol_str))
+    declared = {prefix for pair in prefixes for prefix in pair if prefix and prefix not in ("xml", "xlink")}
+    namespaces = "".join(f' xmlns:{prefix}="urn:x-editor:{prefix}"' for prefix in sorted(declared))
+    wrapper = ET.fromstring(f'<svg xmlns="{SVG_NS}" xmlns:xlink="{XLINK_NS}"{namespaces}>{symbol_str}</svg>')
+    symbol = wrapper[0]
+
+    symbol_id = symbol.get("id")
+    view_box = [float(value) for value in _PATH_NUMBER.findall(symbol.get("viewBox", "0 0 24 24"))]
+    size = max(abs(view_box[2]), abs(view_box[3]), 1) if len(view_box) == 4 else 24
+    decimals = max(0, SVG_PRECISION - len(str(int(size))))
+
+    # The symbol's own id is what pages reference it by, so it always counts as referenced.
+    references = set(_REFERENCE.findall(symbol_str)) | set(re.findall(r'href="#([^"]+)"', symbol_str)) | {symbol_id}
+    cleaned = _clean(symbol, decimals, references)[0]
+    _merge_paths(cleaned, decimals)
+
+    # Prefixing referenced ids with the symbol id, so two icons' "a" can't collide in one document.
+    renames = {element.get("id"): f"{symbol_id}-{element.get('id')}" for element in cleaned.iter() if element is not cleaned and element.get("id")}
+
+    def rename(value):
+        value = _REFERENCE.sub(lambda match: f"url(#{renames.get(match.group(1), match.group(1))})", value)
+        return "#" + renames.get(value[1:], value[1:]) if value.startswith("#") else value
+
+    for element in cleaned.iter():
+        if element is cleaned:
+            continue
+        for attribute, value in list(element.attrib.items()):
+            if attribute == "id":
+                element.set("id", renames.get(value, value))
+            elif "#" in value:
+                element.set(attribute, rename(value))
+
+    # Lifting referenceable definitions out for the sprite-level <defs>; anything else (e.g. <style>) stays put.
+    definitions = []
+    for defs in [child for child in cleaned if child.tag == "defs"]:
+        for definition in [child for child in defs if child.get("id")]:
+            definitions.append((definition.get("id"), _serialize(definition, skip_id=True)))
+            defs.remove(definition)
+        if len(defs) == 0:
+            cleaned.remove(defs)
+
+    return "  " + _serialize(cleaned), definitions
+
+
+def share_definitions(entries):
+    """
+    Collects every icon's lifted definitions for the sprite-level <defs>, keeping one copy of identical ones and
+    pointing the other icons' references at it.
+    Returns ({def id: markup}, {filename: symbol with references updated}).
+    """
+
+    canonical = {}
+    shared = {}
+    symbols = {}
+    for filename, entry in entries.items():
+        symbol_str = entry["symbol"]
+        for def_id, markup in entry.get("defs", []):
+            kept_id = canonical.setdefault(markup, def_id)
+            if kept_id == def_id:
+                shared[def_id] = re.sub(r'^<([\w:]+)', rf'<\1 id="{def_id}"', markup, count=1)
+            else:
+                symbol_str = re.sub(r'(url\(#|href="#)' + re.escape(def_id) + r'(?=["\)])', rf'\g<1>{kept_id}', symbol_str)
+        symbols[filename] = symbol_str
+    return shared, symbols
+
+
+def assemble_sprite(definitions, symbols):
+    """Builds a sprite document from {def id: markup} and a list of symbol strings."""
+
+    body = ([f"  <defs>{''.join(definitions.values())}</defs>"] if definitions else []) + list(symbols)
+    uses_xlink = any('xlink:' in part for part in body)
+    namespaces = f' xmlns="{SVG_NS}"' + (f' xmlns:xlink="{XLINK_NS}"' if uses_xlink else '')
+    return f'<svg{namespaces} style="display: none;">\n' + '\n'.join(body) + '\n</svg>'
+
+
+def write_if_changed(file_path, content):
+    """Writes a file atomically unless it already holds exactly this content. Returns True if it was written."""
+
+    try:
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    temp_path = file_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(content)
+    os.replace(temp_path, file_path)
+    return True
+
+
+def write_hashed(directory, stem, content):
+    """
+    Writes content as <directory>/<stem>.<hash>.svg (skipped if that file exists, since the name pins the content) and
+    removes earlier builds of the same stem. Returns the file name.
+    """
+
+    digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:HASH_LENGTH]
+    filename = f"{stem}.{digest}.svg"
+    os.makedirs(directory, exist_ok=True)
+    if not os.path.exists(os.path.join(directory, filename)):
+        write_if_changed(os.path.join(directory, filename), content)
+
+    stale = re.compile(rf'^{re.escape(stem)}\.[0-9a-f]{{{HASH_LENGTH}}}\.svg$')
+    for existing in os.listdir(directory):
+        if existing != filename and stale.match(existing):
+            os.remove(os.path.join(directory, existing))
+    return filename
+
+
+def template_symbol_ids(template_path):
+    """Returns the sorted symbol ids a template references."""
+
+    with open(template_path, 'r', encoding='utf-8') as f:
+        source = f.read()
+    ids = set(_TEMPLATE_USE.findall(source))
+    for listed in _TEMPLATE_SPRITE_COMMENT.findall(source):
+        ids.update(listed.split())
+    return sorted(ids)
+
+
+def build_subsets(definitions, symbols_by_id):
+    """
+    Writes, for every template in TEMPLATE_DIR that uses icons, a hashed sprite holding only those symbols and the
+    definitions they reference. Returns {template name: path relative to static/}.
+    """
+
+    if not os.path.isdir(TEMPLATE_DIR):
+        return {}
+
+    subsets = {}
+    for template_name in sorted(os.listdir(TEMPLATE_DIR)):
+        # Partials ("_name.html") are rendered into pages, which list the icons they need.
+        if not template_name.endswith('.html') or template_name.startswith('_'):
+            continue
+        ids = template_symbol_ids(os.path.join(TEMPLATE_DIR, template_name))
+        if not ids:
+            continue
+
+        missing = [symbol_id for symbol_id in ids if symbol_id not in symbols_by_id]
+        if missing:
+            print(f"  Warning: '{template_name}' uses icons that aren't in the sprite: {', '.join(missing)}")
+        symbols = [symbols_by_id[symbol_id] for symbol_id in ids if symbol_id in symbols_by_id]
+        referenced = set(_REFERENCE.findall("".join(symbols))) | set(re.findall(r'href="#([^"]+)"', "".join(symbols)))
+        needed = {def_id: markup for def_id, markup in definitions.items() if def_id in referenced}
+
+        stem = os.path.splitext(template_name)[0]
+        subsets[template_name] = f"{os.path.basename(SUBSET_DIR)}/{write_hashed(SUBSET_DIR, stem, assemble_sprite(needed, symbols))}"
+        print(f"  Subset for '{template_name}': {len(symbols)} of {len(symbols_by_id)} icon(s) -> {subsets[template_name]}")
+    return subsets
+
 # --- Main Script Logic ---
 
-def create_sprite():
+def process_icon(filename, content):
+    """
+    Turns one icon's SVG source into a <symbol> string, with fill and stroke stripped so it can be styled with CSS.
+    Pure function of its arguments, so it can run in a worker process and its output can be cached.
+    """
+
+    # Use regex to find the viewBox attribute from the original <svg> tag
+    viewbox_match = re.search(r'viewBox="([^"]+)"', content)
+    viewbox = viewbox_match.group(1) if viewbox_match else "0 0 24 24" # Default if not found
+
+    # Use regex to extract everything INSIDE the main <svg> tag
+    inner_content_match = re.search(r'<svg[^>]*>(.*?)<\/svg>', content, re.DOTALL)
+    inner_content = inner_content_match.group(1) if inner_content_match else ""
+
+    # Use regex to remove all fill="..." and stroke="..." attributes to make the SVG stylable with CSS
+    inner_content = re.sub(r'\s(fill|stroke)="[^"]+"', '', inner_content)
+
+    # Create a unique ID for the symbol from the filename
+    symbol_id = os.path.splitext(filename)[0].removesuffix('-svgrepo-com')
+
+    # Assemble the final <symbol> tag
+    return f'  <symbol id="{symbol_id}" viewBox="{viewbox}">{inner_content.strip()}</symbol>'
+
+
+def _process_file(filename, content):
+    """Worker entry point: returns (filename, cache fields or None, error or None)."""
+
+    try:
+        symbol_str = process_icon(filename, content)
+        fields = {"symbol": symbol_str, "defs": [], "bytes_before": len(symbol_str.encode('utf-8'))}
+        try:
+            fields["symbol"], fields["defs"] = optimize_symbol(symbol_str)
+        except (ET.ParseError, ValueError) as e:
+            # Left as it was rather than failing the build; the report flags it.
+            fields["optimize_error"] = str(e)
+        fields["bytes_after"] = len(fields["symbol"].encode('utf-8')) + sum(len(markup) for _, markup in fields["defs"])
+        return filename, fields, None
+    except Exception as e:
+        return filename, None, str(e)
+
+
+def load_build_cache():
+    """Returns the cached {filename: entry} from the last build, or {} if there is none or it was built with other settings."""
+
+    try:
+        with open(BUILD_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        return cache["files"] if cache.get("version") == [BUILD_VERSION, SVG_PRECISION] else {}
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def save_build_cache(files):
+    """Writes the per-icon cache atomically."""
+
+    temp_path = BUILD_CACHE_FILE + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": [BUILD_VERSION, SVG_PRECISION], "files": files}, f, sort_keys=True)
+    os.replace(temp_path, BUILD_CACHE_FILE)
+
+
+def create_sprite(force=False, workers=None):
     """
     Finds all .svg files in the source directory, cleans their content using
-    regular expressions, and combines them into a single SVG sprite file.
+    regular expressions, optimizes them, and combines them into a single SVG sprite file.
+
+    The build is incremental: icons whose size and modification time (or, failing that, content hash) match the
+    last build reuse its <symbol> output, and only changed or added icons are processed, in a process pool when there
+    are many. Symbols are ordered by filename so the sprite, and its hash, only change when an icon does. The sprite
+    is not rewritten when the output is identical. Pass force=True to ignore the cache.
+    Alongside it go a content-hashed copy for long-term browser caching and, for every template that uses icons, a
+    hashed subset with just those icons; SPRITE_MANIFEST_FILE records their names.
+    The build fails if optimizing made any icon larger.
+    Returns the SHA-256 of the sprite, or None if the build failed.
     """
     print("Starting robust SVG sprite build process...")
 
     # Ensure the source directory exists
     if not os.path.isdir(SOURCE_ICON_DIR):
         print(f"Error: Source directory not found at '{SOURCE_ICON_DIR}'")
-        return
-
-    # A list to hold the cleaned <symbol> strings
-    all_symbols = []
+        return None
 
     try:
-        svg_files = [f for f in os.listdir(SOURCE_ICON_DIR) if f.endswith('.svg')]
+        svg_files = sorted(f for f in os.listdir(SOURCE_ICON_DIR) if f.endswith('.svg'))
         if not svg_files:
             print(f"Warning: No .svg files found in '{SOURCE_ICON_DIR}'.")
-            return
+            return None
     except Exception as e:
         print(f"Error reading source directory: {e}")
-        return
+        return None
+
+    cached = {} if force else load_build_cache()
+    entries = {}
+    to_process = {}
 
-    # Loop through each .svg file
+    # Finding what changed. An unchanged size and mtime is trusted without reading the file; otherwise the content
+    # hash decides, so touching a file without editing it doesn't cost a reprocess.
     for filename in svg_files:
         try:
-            # Read the entire content of the SVG file as text
-            with open(os.path.join(SOURCE_ICON_DIR, filename), 'r', encoding='utf-8') as f:
-                content = f.read()
+            file_path = os.path.join(SOURCE_ICON_DIR, filename)
+            stat = os.stat(file_path)
+            entry = cached.get(filename)
+            if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                entries[filename] = entry
+                continue
 
-            # Use regex to find the viewBox attribute from the original <svg> tag
-            viewbox_match = re.search(r'viewBox="([^"]+)"', content)
-            viewbox = viewbox_match.group(1) if viewbox_match else "0 0 24 24" # Default if not found
+            with open(file_path, 'rb') as f:
+                raw = f.read()
+            digest = hashlib.sha256(raw).hexdigest()
+            if entry and entry["sha256"] == digest:
+                entries[filename] = dict(entry, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                continue
 
-            # Use regex to extract everything INSIDE the main <svg> tag
-            inner_content_match = re.search(r'<svg[^>]*>(.*?)<\/svg>', content, re.DOTALL)
-            inner_content = inner_content_match.group(1) if inner_content_match else ""
-
-            # Use regex to remove all fill="..." and stroke="..." attributes to make the SVG stylable with CSS
-            inner_content = re.sub(r'\s(fill|stroke)="[^"]+"', '', inner_content)
-            
-            # Create a unique ID for the symbol from the filename
-            symbol_id = os.path.splitext(filename)[0].removesuffix('-svgrepo-com')
+            entries[filename] = {"sha256": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            # Universal newlines, as reading in text mode would give.
+            to_process[filename] = raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+        except Exception as e:
+            print(f"  Error reading '{filename}': {e}")
 
-            # Assemble the final <symbol> tag
-            symbol_str = f'  <symbol id="{symbol_id}" viewBox="{viewbox}">{inner_content.strip()}</symbol>'
-            all_symbols.append(symbol_str)
-            print(f"  Processed '{filename}' -> symbol id='{symbol_id}'")
+    # Processing changed and added icons, in parallel for cold builds.
+    if len(to_process) >= PARALLEL_THRESHOLD and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_process_file, to_process.keys(), to_process.values(), chunksize=8))
+    else:
+        results = [_process_file(filename, content) for filename, content in to_process.items()]
 
-        except Exception as e:
-            print(f"  Error processing '{filename}': {e}")
+    grown = []
+    for filename, fields, error in results:
+        if error is not None:
+            print(f"  Error processing '{filename}': {error}")
+            del entries[filename]
             continue
+        entries[filename].update(fields)
+        before, after = fields["bytes_before"], fields["bytes_after"]
+        note = f", not optimized: {fields['optimize_error']}" if "optimize_error" in fields else ""
+        print(f"  Processed '{filename}': {before:,} -> {after:,} bytes ({(after - before) / before:+.0%}){note}")
+        if after > before:
+            grown.append(filename)
+
+    total_before = sum(entry["bytes_before"] for entry in entries.values())
+    total_after = sum(entry["bytes_after"] for entry in entries.values())
+    print(f"  {len(to_process)} icon(s) processed, {len(entries) - len(to_process)} reused from the build cache.")
+    print(f"  Icons total: {total_before:,} -> {total_after:,} bytes ({(total_after - total_before) / total_before:+.0%}).")
+
+    if grown:
+        print(f"\nError: optimizing made {len(grown)} icon(s) larger: {', '.join(grown)}. Sprite not written.")
+        return None
 
     # Assemble the final sprite file content
-    sprite_header = '<svg xmlns="http://www.w3.org/2000/svg" style="display: none;">\n'
-    sprite_footer = '\n</svg>'
-    final_content = sprite_header + '\n'.join(all_symbols) + sprite_footer
+    definitions, symbols = share_definitions(entries)
+    ordered = [symbols[filename] for filename in svg_files if filename in symbols]
+    final_content = assemble_sprite(definitions, ordered)
+    sprite_hash = hashlib.sha256(final_content.encode('utf-8')).hexdigest()
 
-    # Write the final combined sprite to the destination file
+    # Write the final combined sprite, its hashed copy and the per-template subsets (each left untouched, mtime
+    # included, when nothing changed)
     try:
-        with open(DEST_SPRITE_FILE, 'w', encoding='utf-8') as f:
-            f.write(final_content)
-        print(f"\nBuild complete! Sprite saved to '{DEST_SPRITE_FILE}'")
+        if write_if_changed(DEST_SPRITE_FILE, final_content):
+            print(f"\nSprite saved to '{DEST_SPRITE_FILE}' ({len(final_content):,} bytes, {sprite_hash[:HASH_LENGTH]}).")
+        else:
+            print(f"\n'{DEST_SPRITE_FILE}' is already up to date ({sprite_hash[:HASH_LENGTH]}).")
+
+        stem = os.path.splitext(os.path.basename(DEST_SPRITE_FILE))[0]
+        sprite_manifest = {
+            "sprite": write_hashed(os.path.dirname(DEST_SPRITE_FILE), stem, final_content),
+            "subsets": build_subsets(definitions, {re.search(r'<symbol id="([^"]+)"', symbol_str).group(1): symbol_str for symbol_str in ordered})
+        }
+        write_if_changed(SPRITE_MANIFEST_FILE, json.dumps(sprite_manifest, indent=2, sort_keys=True) + "\n")
+        save_build_cache(entries)
+        print(f"Build complete! External sprite: static/{sprite_manifest['sprite']}")
     except Exception as e:
         print(f"\nError writing final sprite file: {e}")
+        return None
+
+    return sprite_hash
 
 # This allows the script to be run from the command line
 if __name__ == '__main__':
-    create_sprite()
+    parser = argparse.ArgumentParser(description="Builds static/Conflux-Icons.svg from the icons in static/Icons/source.")
+    parser.add_argument('--force', action='store_true', help="ignore the build cache and reprocess every icon")
+    parser.add_argument('--workers', type=int, help="worker processes for large rebuilds (default: one per CPU)")
+    args = parser.parse_args()
+    if create_sprite(force=args.force, workers=args.workers) is None:
+        sys.exit(1)
@@ -0,0 +1,249 @@
+# Importing necessary libraries
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import Conflux
+from api_pipeline import FetchPipeline
+from http_client import get_http_session
+from instrumentation import timed
+from manifest_store import ensure_manifest
+
+# --- Constants & Configuration ---
+
+# Member profiles fetched at once. The rate limiter still paces the calls (API_FAMILY_RATE_LIMIT per endpoint family),
+# and the shared pipeline pool (API_MAX_WORKERS) caps how many threads that can actually be.
+CLAN_CONCURRENCY = int(os.getenv("CLAN_CONCURRENCY", "8"))
+
+# Only the character summaries are needed for the report.
+CLAN_COMPONENTS = ("Characters",)
+
+# Members who played within this many days count as active.
+ACTIVE_DAYS = 7
+
+# Members listed by light in each group's report.
+TOP_MEMBERS = 10
+
+# --- Main Script Logic ---
+
+def get_group(group_id, headers):
+    """Fetches a group's details. Returns the "detail" dict, or None if it fails."""
+
+    group_data = Conflux.get_api_data(get_http_session(), f"{Conflux.BASE_API_URL}/GroupV2/{group_id}/", headers)
+    if not group_data or group_data.get('ErrorCode', 1) != 1 or 'Response' not in group_data:
+        print(f"{Conflux.ERROR}Could not fetch group {group_id}.")
+        return None
+    return group_data['Response'].get('detail', {})
+
+
+def get_group_members(group_id, headers):
+    """
+    Lists every member of a group, page by page. Returns a list of destiny profile dicts (membership_id,
+    membership_type, display_name, as Conflux.get_profile takes them), or None if the listing fails.
+    """
+
+    members = []
+    page = 1
+    while True:
+        members_data = Conflux.get_api_data(get_http_session(), f"{Conflux.BASE_API_URL}/GroupV2/{group_id}/Members/", headers, params={'currentpage': page})
+        if not members_data or members_data.get('ErrorCode', 1) != 1 or 'Response' not in members_data:
+            print(f"{Conflux.ERROR}Could not list the members of group {group_id}.")
+            return None
+        for member in members_data['Response'].get('results', []):
+            user_info = member.get('destinyUserInfo', {})
+            members.append({
+                "membership_id": user_info.get('membershipId'),
+                "membership_type": user_info.get('membershipType'),
+                "display_name": user_info.get('bungieGlobalDisplayName') or user_info.get('displayName')
+            })
+        if not members_data['Response'].get('hasMore'):
+            return members
+        page += 1
+
+
+def ingest_members(members, headers, concurrency=CLAN_CONCURRENCY):
+    """
+    Fetches the profile of every member concurrently, at most `concurrency` at a time, all through the rate limiter.
+    Returns {membership_id: Profile or None}.
+    """
+
+    pipeline = FetchPipeline(max_concurrency=concurrency)
+    names = pipeline.map('member', lambda member: Conflux.get_profile(get_http_session(), headers, member, CLAN_COMPONENTS), members, key=lambda member: member['membership_id'])
+    profiles = {}
+    for member, name in zip(members, names):
+        try:
+            profiles[member['membership_id']] = pipeline.result(name)
+        except Exception as e:
+            print(f"{Conflux.ERROR}Could not fetch the profile of {member['display_name']}: {e}")
+            profiles[member['membership_id']] = None
+    return profiles
+
+
+def last_played(profile):
+    """Returns when any of a profile's characters was last played, or None."""
+
+    dates = []
+    for character in profile.characters.values():
+        try:
+            dates.append(datetime.fromisoformat(character.date_last_played.replace('Z', '+00:00')))
+        except (AttributeError, ValueError):
+            continue
+    return max(dates) if dates else None
+
+
+def summarize_members(members, profiles, definitions, now):
+    """Aggregates light levels, class and race mix and activity over a list of members."""
+
+    class_defs = definitions.get('DestinyClassDefinition', {})
+    race_defs = definitions.get('DestinyRaceDefinition', {})
+    class_mix, race_mix = Counter(), Counter()
+    ranked = []
+    characters = active = 0
+
+    for member in members:
+        profile = profiles.get(member['membership_id'])
+        if not profile or not profile.characters:
+            continue
+        for character in profile.characters.values():
+            characters += 1
+            class_def, race_def = class_defs.get(character.class_hash), race_defs.get(character.race_hash)
+            class_mix[class_def['name'] if class_def else "Unknown Class"] += 1
+            race_mix[race_def['name'] if race_def else "Unknown Race"] += 1
+        best = max(profile.characters.values(), key=lambda character: character.light or 0)
+        best_class = class_defs.get(best.class_hash)
+        ranked.append({"name": member['display_name'], "light": best.light or 0, "class": best_class['name'] if best_class else "Unknown Class"})
+        played = last_played(profile)
+        if played and now - played <= timedelta(days=ACTIVE_DAYS):
+            active += 1
+
+    ranked.sort(key=lambda entry: entry['light'], reverse=True)
+    lights = [entry['light'] for entry in ranked]
+    return {
+        "members": len(members),
+        "profiles": len(ranked),
+        "unavailable": len(members) - len(ranked),
+        "characters": characters,
+        "active_members": active,
+        "light": {
+            "max": max(lights), "median": statistics.median(lights), "mean": round(statistics.mean(lights), 1), "min": min(lights)
+        } if lights else {},
+        "class_mix": dict(class_mix.most_common()),
+        "race_mix": dict(race_mix.most_common()),
+        "top_members": ranked[:TOP_MEMBERS]
+    }
+
+
+def run_clan_report(group_ids, concurrency=CLAN_CONCURRENCY):
+    """
+    Builds one aggregated report over every member of the given groups (clans). Members are listed per group, every
+    distinct member's profile is fetched concurrently behind the rate limiter, and all class/race hashes are resolved
+    in one shared manifest lookup. Returns the report dict, or None if nothing could be fetched.
+    """
+
+    api_key_val, client_id_val, client_secret_val = Conflux.load_credentials()
+    if not api_key_val:
+        print(f"{Conflux.ERROR}Missing API_KEY.")
+        return None
+    headers = {'X-API-KEY': api_key_val}
+    sent_before = Conflux.API_SCHEDULER.stats()
+
+    # The manifest is checked (and if needed downloaded) once, while the member lists are fetched.
+    start = time.perf_counter()
+    pipeline = FetchPipeline(max_concurrency=concurrency)
+    if not Conflux.MANIFEST_DB_PATH:
+        pipeline.submit('manifest', ensure_manifest, headers)
+    for group_id in group_ids:
+        pipeline.submit(f"group:{group_id}", get_group, group_id, headers)
+        pipeline.submit(f"members:{group_id}", get_group_members, group_id, headers)
+
+    groups = []
+    for group_id in group_ids:
+        members = pipeline.result(f"members:{group_id}")
+        if members is None:
+            continue
+        detail = pipeline.result(f"group:{group_id}") or {}
+        groups.append({"group_id": str(group_id), "name": detail.get('name', str(group_id)), "members": members})
+    if not groups:
+        return None
+
+    # A member of several groups is fetched once.
+    unique_members = list({member['membership_id']: member for group in groups for member in group['members']}.values())
+    listed = time.perf_counter()
+    with timed("clan_ingest_seconds"):
+        profiles = ingest_members(unique_members, headers, concurrency)
+    ingested = time.perf_counter()
+
+    if not Conflux.MANIFEST_DB_PATH:
+        Conflux.MANIFEST_DB_PATH = pipeline.result('manifest')
+    hashes_by_table = {'DestinyClassDefinition': set(), 'DestinyRaceDefinition': set()}
+    for profile in profiles.values():
+        if profile:
+            hashes = profile.hashes_by_table()
+            for table_name in hashes_by_table:
+                hashes_by_table[table_name].update(hashes[table_name])
+    definitions = Conflux.query_manifest_hot({table_name: list(hashes) for table_name, hashes in hashes_by_table.items()}) if Conflux.MANIFEST_DB_PATH else {}
+
+    now = datetime.now(timezone.utc)
+    elapsed = time.perf_counter() - start
+    sent_after = Conflux.API_SCHEDULER.stats()
+    return {
+        "groups": [
+            dict(summarize_members(group['members'], profiles, definitions, now), group_id=group['group_id'], name=group['name'])
+            for group in groups
+        ],
+        "overall": summarize_members(unique_members, profiles, definitions, now),
+        "throughput": {
+            "members": len(unique_members),
+            "seconds": round(elapsed, 3),
+            "members_per_second": round(len(unique_members) / elapsed, 2) if elapsed else None,
+            "ingest_members_per_second": round(len(unique_members) / (ingested - listed), 2) if ingested > listed else None,
+            "listing_seconds": round(listed - start, 3),
+            "ingest_seconds": round(ingested - listed, 3),
+            "concurrency": concurrency,
+            "api_calls": sent_after['sent'] - sent_before['sent'],
+            "throttled": sent_after['throttled'] - sent_before['throttled']
+        }
+    }
+
+
+def print_report(report):
+    """Prints the aggregated report."""
+
+    for summary in report['groups'] + [dict(report['overall'], name="All groups")]:
+        print(Conflux.BORDER)
+        print(f"{Conflux.HEADER}{summary['name']}{Conflux.RESET}: {summary['members']} member(s), {summary['profiles']} profile(s), "
+              f"{summary['characters']} character(s), {summary['active_members']} active in the last {ACTIVE_DAYS} days")
+        if summary['light']:
+            light = summary['light']
+            print(f"Light (best character): max {Conflux.ACTION}{light['max']}{Conflux.RESET}, median {light['median']}, mean {light['mean']}, min {light['min']}")
+        print("Classes: " + ", ".join(f"{name} {count}" for name, count in summary['class_mix'].items()))
+        print("Races: " + ", ".join(f"{name} {count}" for name, count in summary['race_mix'].items()))
+        if 'group_id' in summary:
+            for entry in summary['top_members']:
+                print(f"  {Conflux.INFO}{entry['name']}{Conflux.RESET} | {entry['class']} | Light: {entry['light']}")
+    throughput = report['throughput']
+    print(Conflux.BORDER)
+    print(f"{throughput['members']} member(s) in {throughput['seconds']}s: {Conflux.INFO}{throughput['members_per_second']} members/s{Conflux.RESET} "
+          f"({throughput['ingest_members_per_second']} members/s ingesting), {throughput['api_calls']} API call(s), {throughput['throttled']} throttled")
+
+
+# This allows the script to be run from the command line
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Analyzes every member of one or more clans (GroupV2 group ids) and prints one aggregated report.")
+    parser.add_argument('group_ids', nargs='+', type=int, metavar='GROUP_ID')
+    parser.add_argument('--concurrency', type=int, default=CLAN_CONCURRENCY, help="member profiles fetched at once")
+    parser.add_argument('--json', metavar='PATH', help="also write the report to this file as JSON")
+    args = parser.parse_args()
+
+    report = run_clan_report(args.group_ids, args.concurrency)
+    if report is None:
+        sys.exit(1)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,159 @@
+# Importing necessary libraries
+import datetime
+import os
+import threading
+import time
+
+from api_cache import MemoryCacheBackend, SQLiteCacheBackend
+from file_lock import FileLock
+
+# --- Constants & Configuration ---
+
+# "sqlite" shares global data between every worker on the machine; "memory" keeps it per process.
+GLOBAL_CACHE_BACKEND = os.getenv("GLOBAL_CACHE_BACKEND", "sqlite")
+GLOBAL_CACHE_PATH = os.getenv("GLOBAL_CACHE_PATH", "global_cache.sqlite")
+
+# Destiny's daily reset (UTC hour) and the weekday of the weekly reset (Monday is 0, so Tuesday).
+RESET_HOUR_UTC = 17
+WEEKLY_RESET_WEEKDAY = 1
+
+DAILY = "daily"
+WEEKLY = "weekly"
+
+# When a refresh fails, the previous window's value (or nothing) keeps being served and the refresh is retried this
+# much later.
+GLOBAL_RETRY_SECONDS = int(os.getenv("GLOBAL_RETRY_SECONDS", "60"))
+
+
+def last_reset(now=None, cadence=DAILY):
+    """Returns the timestamp of the most recent daily (or weekly) reset at or before now."""
+
+    moment = datetime.datetime.fromtimestamp(time.time() if now is None else now, datetime.timezone.utc)
+    reset = moment.replace(hour=RESET_HOUR_UTC, minute=0, second=0, microsecond=0)
+    if reset > moment:
+        reset -= datetime.timedelta(days=1)
+    if cadence == WEEKLY:
+        reset -= datetime.timedelta(days=(reset.weekday() - WEEKLY_RESET_WEEKDAY) % 7)
+    return reset.timestamp()
+
+
+def next_reset(now=None, cadence=DAILY):
+    """Returns the timestamp of the next daily (or weekly) reset after now."""
+
+    return last_reset(now, cadence) + (7 if cadence == WEEKLY else 1) * 86400
+
+
+class GlobalDataCache:
+    """
+    Data that is the same for every player (manifest version, public milestones, vendor rotations), fetched once per
+    reset window and served to every user from then on.
+
+    get(name, fetch) returns the value fetched since the last reset of its cadence, calling fetch() only when there
+    isn't one. Values live in the backend (by default SQLite, shared by every worker on the machine) with a copy in
+    each process, and a file lock makes sure only one worker fetches a given window. Upstream calls therefore scale
+    with the number of resets, not with the number of users. If fetch() fails, the last value (or None, if there was
+    none) is served until a retry GLOBAL_RETRY_SECONDS later succeeds.
+    """
+
+    def __init__(self, backend=None, lock_path=None):
+        self.backend = backend
+        self.lock_path = lock_path
+        self._local = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.fetches = 0
+        self.failures = 0
+
+    def _lock_for(self, name):
+        """Returns the in-process lock serializing fetches of one name."""
+
+        with self._lock:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def _fresh(self, entry, now):
+        """Returns the entry if it may still be served without a refresh, else None."""
+
+        return entry if entry is not None and entry["expires_at"] > now else None
+
+    def _load(self, name, now):
+        """Returns a fresh entry from this process's copy or the shared backend, or None."""
+
+        entry = self._fresh(self._local.get(name), now)
+        if entry is None and self.backend is not None:
+            entry = self._fresh(self.backend.get(name), now)
+            if entry is not None:
+                self._local[name] = entry
+        return entry
+
+    def get(self, name, fetch, cadence=DAILY, max_age=None):
+        """
+        Returns the value of name for the current reset window, calling fetch() (which returns None on failure) if it
+        hasn't been fetched since the last reset, or more than max_age seconds ago when given. Returns None only if
+        fetch() failed and nothing was ever cached; that is retried after GLOBAL_RETRY_SECONDS.
+        """
+
+        entry = self._load(name, time.time())
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            return entry["value"]
+
+        with self._lock_for(name):
+            # Another thread, or with a shared backend another worker, may have fetched it while we waited.
+            entry = self._load(name, time.time())
+            if entry is None and self.lock_path:
+                with FileLock(self.lock_path):
+                    entry = self._load(name, time.time())
+                    if entry is None:
+                        entry = self._refresh(name, fetch, cadence, max_age)
+            elif entry is None:
+                entry = self._refresh(name, fetch, cadence, max_age)
+            else:
+                with self._lock:
+                    self.hits += 1
+            return entry["value"]
+
+    def _refresh(self, name, fetch, cadence, max_age):
+        """Calls fetch() and stores the result until the next reset (or max_age). Returns the entry to serve."""
+
+        try:
+            value = fetch()
+        except Exception as e:
+            print(f"Warning: Could not fetch global data '{name}': {e}")
+            value = None
+
+        now = time.time()
+        if value is None:
+            with self._lock:
+                self.failures += 1
+            entry = self._local.get(name) or (self.backend.get(name) if self.backend is not None else None)
+            # With nothing to fall back on the failure itself is remembered, so callers don't hit upstream each time.
+            entry = dict(entry or {"value": None, "fetched_at": None}, expires_at=now + GLOBAL_RETRY_SECONDS)
+        else:
+            with self._lock:
+                self.fetches += 1
+            expires_at = next_reset(now, cadence)
+            if max_age:
+                expires_at = min(expires_at, now + max_age)
+            entry = {"value": value, "fetched_at": now, "expires_at": expires_at}
+
+        self._local[name] = entry
+        if self.backend is not None:
+            self.backend.set(name, entry)
+        return entry
+
+    def stats(self):
+        """Returns hit, fetch and failure counts."""
+
+        with self._lock:
+            return {"hits": self.hits, "fetches": self.fetches, "failures": self.failures}
+
+
+def create_global_cache(backend_name=GLOBAL_CACHE_BACKEND):
+    """Creates the GlobalDataCache for the configured GLOBAL_CACHE_BACKEND."""
+
+    if backend_name == "sqlite":
+        backend = SQLiteCacheBackend(GLOBAL_CACHE_PATH)
+        return GlobalDataCache(backend, lock_path=backend.path + ".lock")
+    return GlobalDataCache(MemoryCacheBackend())
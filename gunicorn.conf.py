@@ -0,0 +1,14 @@
+# Gunicorn settings, picked up automatically when gunicorn is started from the repository root.
+import os
+
+# Importing the app in the master before forking lets workers share its memory copy-on-write.
+# Required for MANIFEST_MODE=packed to map the manifest pack once for all workers (worth it from about 12 workers; see
+# benchmarks/bench_shared_manifest.py).
+preload_app = os.getenv("MANIFEST_MODE", "sqlite") == "packed"
+
+# Threaded workers. Each open dashboard holds one thread for its live-update stream (/api/profile/events, up to
+# PREFETCH_STREAM_SECONDS), which would pin a whole worker under the default sync class. With gthread a worker serves
+# up to `threads` requests and streams at once, so size it for the dashboards expected to be open per worker.
+# Deployments that must stay on sync workers should set PREFETCH_STREAMS=0, which turns the streams off.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
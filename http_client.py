@@ -0,0 +1,176 @@
+# Importing necessary libraries
+import os
+import threading
+import weakref
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- Constants & Configuration ---
+
+# Connection pools: how many hosts keep a pool, and how many keep-alive connections each pool holds. Size
+# HTTP_POOL_MAXSIZE to the number of threads making calls in one process (API_MAX_WORKERS by default); every Gunicorn
+# worker gets its own pools.
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", os.getenv("API_MAX_WORKERS", "16")))
+
+# Timeouts in seconds. None were set before, so a stalled Bungie connection could hang a worker forever.
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+
+# Headers every request carries unless the caller overrides them.
+DEFAULT_HEADERS = {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+
+_adapter = None
+_adapter_pid = None
+_session = None
+_adapter_lock = threading.Lock()
+_session_lock = threading.Lock()
+
+
+class HttpMetrics:
+    """Thread-safe counters for the shared HTTP layer."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+
+    def record_request(self, reused):
+        """Counts a request and whether it went out on an already-open connection."""
+
+        with self._lock:
+            self.requests += 1
+            if reused:
+                self.reused_connections += 1
+            else:
+                self.new_connections += 1
+
+    def record_error(self):
+        """Counts a request that failed before a response arrived (connect/read timeout, reset, ...)."""
+
+        with self._lock:
+            self.errors += 1
+
+    def record_body(self, wire_bytes, decoded_bytes):
+        """Counts body bytes as received (possibly compressed) and after decoding."""
+
+        with self._lock:
+            self.wire_bytes += wire_bytes
+            self.decoded_bytes += decoded_bytes
+
+    def snapshot(self):
+        """Returns the counters, plus the connection reuse ratio and compression ratio."""
+
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "new_connections": self.new_connections,
+                "reused_connections": self.reused_connections,
+                "reuse_ratio": round(self.reused_connections / self.requests, 3) if self.requests else 0.0,
+                "wire_bytes": self.wire_bytes,
+                "decoded_bytes": self.decoded_bytes,
+                "compression_ratio": round(self.decoded_bytes / self.wire_bytes, 2) if self.wire_bytes else 0.0
+            }
+
+
+HTTP_METRICS = HttpMetrics()
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    HTTPAdapter shared by every session in the process, so OAuth sessions created per request still reuse the same
+    keep-alive connections. Applies default timeouts and records connection reuse and body bytes in HTTP_METRICS.
+    """
+
+    def __init__(self, pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE, metrics=HTTP_METRICS):
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=False)
+        self.metrics = metrics
+        self._seen_connections = weakref.WeakSet()
+
+    def send(self, request, stream=False, timeout=None, **kwargs):
+        """Sends the request with the default timeouts unless the caller gave one."""
+
+        if timeout is None:
+            timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        try:
+            response = super().send(request, stream=stream, timeout=timeout, **kwargs)
+        except requests.RequestException:
+            self.metrics.record_error()
+            raise
+
+        raw = response.raw
+        connection = getattr(raw, 'connection', None)
+        reused = connection is not None and connection in self._seen_connections
+        if connection is not None:
+            self._seen_connections.add(connection)
+        self.metrics.record_request(reused)
+        self._count_body(raw)
+        return response
+
+    def _count_body(self, raw):
+        """Wraps raw.stream (which requests reads every body through) to count wire and decoded bytes."""
+
+        original_stream = raw.stream
+        metrics = self.metrics
+
+        def counting_stream(*args, **kwargs):
+            wire_before = raw.tell()
+            for chunk in original_stream(*args, **kwargs):
+                wire_now = raw.tell()
+                metrics.record_body(wire_now - wire_before, len(chunk))
+                wire_before = wire_now
+                yield chunk
+
+        raw.stream = counting_stream
+
+
+def get_adapter():
+    """
+    Returns the process-wide PooledAdapter, creating it on first use. Pools inherited through fork would share sockets
+    with the parent, so each process gets its own.
+    """
+
+    global _adapter, _adapter_pid, _session
+    with _adapter_lock:
+        if _adapter is None or _adapter_pid != os.getpid():
+            _adapter = PooledAdapter()
+            _adapter_pid = os.getpid()
+            _session = None
+        return _adapter
+
+
+def configure_session(session):
+    """
+    Mounts the shared adapter and default headers on a requests.Session (e.g. an OAuth2Session) and returns it.
+    Cheap to call repeatedly.
+    """
+
+    adapter = get_adapter()
+    if session.adapters.get("https://") is not adapter:
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+def get_http_session():
+    """Returns the process-wide session for unauthenticated Bungie calls (manifest lookups and downloads)."""
+
+    global _session
+    get_adapter()  # Drops a session inherited through fork along with its pools.
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            configure_session(_session)
+        return _session
+
+
+def http_metrics():
+    """Returns a snapshot of the shared HTTP layer's counters."""
+
+    return HTTP_METRICS.snapshot()
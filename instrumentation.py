@@ -0,0 +1,219 @@
+# Importing necessary libraries
+import contextvars
+import os
+import re
+import threading
+import time
+
+# --- Constants & Configuration ---
+
+# Instrumentation is off unless METRICS_ENABLED=1; when off, timed() hands back a shared no-op and records nothing.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+
+# Prefix of every exported metric name.
+METRICS_PREFIX = "conflux_"
+
+# Latency histogram bucket upper bounds, in seconds.
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Timings recorded while handling the current web request (or CLI run), for the Server-Timing header.
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, Prometheus style."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        """Adds one observation."""
+
+        self.sum += seconds
+        self.count += 1
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.counts[index] += 1
+                break
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and latency histograms, keyed by metric name and labels, plus collectors that report
+    counters kept elsewhere (response cache, HTTP pool, rate limiter, manifest reader) at export time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._collectors = []
+
+    def describe(self, name, help_text):
+        """Sets the HELP text for a metric."""
+
+        self._help[name] = help_text
+
+    def inc(self, name, labels=(), amount=1):
+        """Adds to a counter. labels is a tuple of (label, value) pairs."""
+
+        with self._lock:
+            key = (name, labels)
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, labels, seconds):
+        """Records a latency observation in a histogram."""
+
+        with self._lock:
+            key = (name, labels)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def register_collector(self, collector):
+        """
+        Registers a callable returning (name, type, help, labels, value) tuples, evaluated on every export.
+        type is "counter" or "gauge".
+        """
+
+        self._collectors.append(collector)
+
+    def render_prometheus(self):
+        """Returns every metric in the Prometheus text exposition format."""
+
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+
+        families = {}
+        for (name, labels), value in counters:
+            families.setdefault((name, "counter"), []).append((name, labels, value))
+        for (name, labels), histogram in histograms:
+            samples = families.setdefault((name, "histogram"), [])
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                cumulative += count
+                samples.append((name + "_bucket", labels + (("le", repr(bound)),), cumulative))
+            samples.append((name + "_bucket", labels + (("le", "+Inf"),), histogram.count))
+            samples.append((name + "_sum", labels, round(histogram.sum, 6)))
+            samples.append((name + "_count", labels, histogram.count))
+        for collector in self._collectors:
+            for name, metric_type, help_text, labels, value in collector():
+                self._help.setdefault(name, help_text)
+                families.setdefault((name, metric_type), []).append((name, tuple(sorted(labels.items())), value))
+
+        for (name, metric_type), samples in families.items():
+            full_name = METRICS_PREFIX + name
+            if name in self._help:
+                lines.append(f"# HELP {full_name} {self._help[name]}")
+            lines.append(f"# TYPE {full_name} {metric_type}")
+            for sample_name, labels, value in samples:
+                label_text = ",".join(f'{label}="{_escape(value)}"' for label, value in labels)
+                lines.append(f"{METRICS_PREFIX}{sample_name}{{{label_text}}} {value}" if label_text else f"{METRICS_PREFIX}{sample_name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    """Escapes a label value for the Prometheus text format."""
+
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+METRICS = MetricsRegistry()
+METRICS.describe("api_request_seconds", "Latency of get_api_data calls by Bungie endpoint family.")
+METRICS.describe("api_errors_total", "Failed Bungie API calls by endpoint family and HTTP status / Bungie ErrorCode.")
+METRICS.describe("manifest_query_seconds", "Latency of manifest lookups by table.")
+METRICS.describe("manifest_download_seconds", "Time spent checking for and downloading the manifest.")
+METRICS.describe("template_render_seconds", "Template rendering time by template.")
+
+
+class _Timer:
+    """Times a block, recording it in METRICS and in the current request's timings."""
+
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        METRICS.observe(self.name, self.labels, seconds)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((self.name, self.labels, seconds))
+        return False
+
+
+class _NoopTimer:
+    """Stand-in returned by timed() while instrumentation is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def timed(name, **labels):
+    """
+    Context manager timing a block into the `name` histogram with the given labels, e.g.
+        with timed("manifest_query_seconds", table=table_name): ...
+    """
+
+    if not METRICS_ENABLED:
+        return _NOOP_TIMER
+    return _Timer(name, tuple(sorted(labels.items())))
+
+
+def count(name, amount=1, **labels):
+    """Adds to the `name` counter with the given labels (no-op while instrumentation is disabled)."""
+
+    if METRICS_ENABLED:
+        METRICS.inc(name, tuple(sorted(labels.items())), amount)
+
+
+def start_request_timings():
+    """Starts collecting a per-request timing breakdown in the current context."""
+
+    if METRICS_ENABLED:
+        _request_timings.set([])
+
+
+def request_timings():
+    """Returns the current request's (name, labels, seconds) timings, or an empty list."""
+
+    return _request_timings.get() or []
+
+
+def server_timing_header(timings):
+    """
+    Builds a Server-Timing header value from request timings, summing repeated entries, e.g.
+    'api_Destiny2-Profile;dur=212.4;desc="1 call", manifest_DestinyClassDefinition;dur=0.3;desc="2 calls"'.
+    """
+
+    totals = {}
+    for name, labels, seconds in timings:
+        metric = re.sub(r'[^A-Za-z0-9_-]', '-', "_".join([name.split("_")[0]] + [str(value) for _, value in labels]))
+        total, calls = totals.get(metric, (0.0, 0))
+        totals[metric] = (total + seconds, calls + 1)
+    return ", ".join(
+        f'{metric};dur={total * 1000:.1f};desc="{calls} call{"s" if calls != 1 else ""}"'
+        for metric, (total, calls) in totals.items()
+    )
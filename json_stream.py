@@ -0,0 +1,151 @@
+# Importing necessary libraries
+import codecs
+import json
+
+# --- Constants & Configuration ---
+
+# Bytes read from the response per chunk while streaming.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Consumed text is dropped from the buffer once this much of it has piled up.
+STREAM_COMPACT_AT = 256 * 1024
+
+_WHITESPACE = " \t\n\r"
+_decoder = json.JSONDecoder()
+
+
+def _matches(path, pattern):
+    """True if path matches the start of pattern, where "*" in the pattern matches any key or array index."""
+
+    return all(want == "*" or want == got for got, want in zip(path, pattern))
+
+
+class _ChunkReader:
+    """Text buffer over an iterable of byte chunks, refilled on demand as the parser needs more input."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Appends the next chunk to the buffer. Returns False once the input is exhausted."""
+
+        if self.eof:
+            return False
+        if self.pos >= STREAM_COMPACT_AT:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        for chunk in self._chunks:
+            text = self._utf8.decode(chunk)
+            if text:
+                self.buffer += text
+                return True
+        self.buffer += self._utf8.decode(b"", final=True)
+        self.eof = True
+        return False
+
+    def peek(self):
+        """Skips whitespace and returns the next character without consuming it ("" at end of input)."""
+
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, characters):
+        """Consumes and returns the next character, which must be one of `characters`."""
+
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f"Malformed JSON stream: expected {characters!r}, got {character!r}")
+        self.pos += 1
+        return character
+
+    def value(self):
+        """
+        Decodes the complete JSON value at the current position with the C decoder, reading more input until it's whole.
+        The buffer grows at least geometrically between retries, so large values aren't re-parsed over and over.
+        """
+
+        self.peek()
+        start = self.pos
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, start)
+            except json.JSONDecodeError:
+                if not self._grow(start):
+                    raise
+                start = self.pos
+                continue
+            # A number running into the end of the buffer may continue in the next chunk.
+            if end == len(self.buffer) and not self.eof and self._grow(start):
+                start = self.pos
+                continue
+            self.pos = end
+            return value
+
+    def _grow(self, start):
+        """Reads at least as much input again as the value being decoded has so far. Returns False at end of input."""
+
+        self.pos = start
+        wanted = 2 * (len(self.buffer) - start) + 1
+        grew = False
+        while len(self.buffer) - self.pos < wanted and self.fill():
+            grew = True
+        return grew
+
+
+def iter_json(chunks, paths):
+    """
+    Incrementally parses a JSON document from an iterable of byte chunks (e.g. response.iter_content()) and yields
+    (path, value) for every value whose path matches one of `paths` as soon as it has been read. A path is a tuple of
+    object keys and array indexes; "*" matches any key or index, e.g. ("Response", "profileInventory", "data", "items", "*").
+    Only the containers leading to those paths are walked; every other value is decoded and dropped, so memory tracks
+    the largest single value rather than the whole document.
+    """
+
+    paths = [tuple(path) for path in paths]
+    reader = _ChunkReader(chunks)
+    yield from _walk(reader, (), paths)
+    if reader.peek():
+        raise ValueError("Malformed JSON stream: trailing data")
+
+
+def _walk(reader, path, paths):
+    """Yields the matching values inside the value at the reader's position, whose path is `path`."""
+
+    depth = len(path)
+    if any(len(pattern) == depth and _matches(path, pattern) for pattern in paths):
+        yield path, reader.value()
+        return
+
+    opening = reader.peek()
+    if opening not in ("{", "[") or not any(len(pattern) > depth and _matches(path, pattern) for pattern in paths):
+        reader.value()
+        return
+
+    reader.pos += 1
+    if opening == "{":
+        if reader.peek() == "}":
+            reader.pos += 1
+            return
+        while True:
+            key = reader.value()
+            reader.expect(":")
+            yield from _walk(reader, path + (key,), paths)
+            if reader.expect(",}") == "}":
+                return
+    else:
+        if reader.peek() == "]":
+            reader.pos += 1
+            return
+        index = 0
+        while True:
+            yield from _walk(reader, path + (index,), paths)
+            index += 1
+            if reader.expect(",]") == "]":
+                return
@@ -0,0 +1,439 @@
+# Importing necessary libraries
+import json
+import os
+import sqlite3  # For interacting with the SQLite database (manifest)
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+
+# --- Constants & Configuration ---
+
+# Number of decoded definitions kept in memory per reader. Tune to the worker memory budget.
+MANIFEST_CACHE_SIZE = int(os.getenv("MANIFEST_CACHE_SIZE", "4096"))
+
+# Number of prepared statements sqlite3 keeps per connection.
+STATEMENT_CACHE_SIZE = 256
+
+# Maximum number of hashes bound into a single "WHERE id IN (...)" query. Stays under SQLite's variable limit.
+RESOLVE_CHUNK_SIZE = 500
+
+# Which manifest table each "*Hash" field in a Bungie API response points at. Fields not listed here are ignored.
+HASH_FIELD_TABLES = {
+    "classHash": "DestinyClassDefinition",
+    "raceHash": "DestinyRaceDefinition",
+    "genderHash": "DestinyGenderDefinition",
+    "itemHash": "DestinyInventoryItemDefinition",
+    "emblemHash": "DestinyInventoryItemDefinition",
+    "plugHash": "DestinyInventoryItemDefinition",
+    "plugItemHash": "DestinyInventoryItemDefinition",
+    "bucketHash": "DestinyInventoryBucketDefinition",
+    "statHash": "DestinyStatDefinition",
+    "titleRecordHash": "DestinyRecordDefinition",
+    "recordHash": "DestinyRecordDefinition",
+    "activityHash": "DestinyActivityDefinition",
+    "currentActivityHash": "DestinyActivityDefinition",
+    "currentActivityModeHash": "DestinyActivityModeDefinition",
+    "damageTypeHash": "DestinyDamageTypeDefinition",
+    "energyTypeHash": "DestinyEnergyTypeDefinition",
+    "progressionHash": "DestinyProgressionDefinition",
+    "factionHash": "DestinyFactionDefinition",
+    "objectiveHash": "DestinyObjectiveDefinition",
+    "perkHash": "DestinySandboxPerkDefinition",
+    "collectibleHash": "DestinyCollectibleDefinition",
+    "presentationNodeHash": "DestinyPresentationNodeDefinition",
+    "seasonHash": "DestinySeasonDefinition",
+    "vendorHash": "DestinyVendorDefinition",
+    "milestoneHash": "DestinyMilestoneDefinition"
+}
+
+# Sidecar database holding only the hot fields of the commonly used tables. Lives next to the manifest database.
+SLIM_INDEX_SUFFIX = ".hot.sqlite"
+
+# Tables projected into the slim index.
+HOT_TABLES = [
+    "DestinyClassDefinition",
+    "DestinyRaceDefinition",
+    "DestinyInventoryItemDefinition",
+    "DestinyStatDefinition",
+    "DestinyRecordDefinition",
+    "DestinyActivityDefinition"
+]
+
+# Hot columns in the slim index: (column name, SQLite type, path inside the definition JSON).
+HOT_COLUMNS = [
+    ("name", "TEXT", ("displayProperties", "name")),
+    ("icon", "TEXT", ("displayProperties", "icon")),
+    ("type_name", "TEXT", ("itemTypeDisplayName",)),
+    ("item_type", "INTEGER", ("itemType",)),
+    ("item_sub_type", "INTEGER", ("itemSubType",)),
+    ("tier_type", "INTEGER", ("inventory", "tierType")),
+    ("class_type", "INTEGER", ("classType",)),
+    ("title", "TEXT", ("titleInfo", "titlesByGender", "Male"))
+]
+
+
+def to_signed_hash(hash_id):
+    """
+    Converts an unsigned 32-bit Bungie hash into the signed id used by the manifest tables.
+    """
+
+    if hash_id > 2147483647:
+        return hash_id - 4294967296
+    return hash_id
+
+
+class _ThreadConnections:
+    """
+    One thread's connections, kept in the reader's thread-local state. When the thread exits its thread-local state is
+    dropped, and so is this holder, which closes its connections.
+    """
+
+    def __init__(self):
+        self.connections = {}
+        weakref.finalize(self, _close_all, self.connections)
+
+
+def _close_all(connections):
+    """Closes every connection in a {name: connection} dict."""
+
+    for con in connections.values():
+        con.close()
+    connections.clear()
+
+
+class ManifestReader:
+    """
+    Long-lived, thread-safe reader for the local manifest database.
+    Keeps one read-only connection per thread (closed when the thread exits) and a size-bounded LRU of decoded
+    definitions keyed by (table, hash).
+    """
+
+    def __init__(self, db_path, cache_size=MANIFEST_CACHE_SIZE, index_path=None):
+        self.db_path = db_path
+        self.cache_size = cache_size
+
+        # The slim index is optional; without it the hot-field lookups fall back to decoding full definitions.
+        if index_path is None and os.path.isfile(db_path + SLIM_INDEX_SUFFIX):
+            index_path = db_path + SLIM_INDEX_SUFFIX
+        self.index_path = index_path
+        self.hits = 0
+        self.misses = 0
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._holders = weakref.WeakSet()
+        self._tables = None
+        self._queries = {}
+        self._index_tables = None
+
+    def _connection(self, attr='con', path=None):
+        """
+        Returns this thread's read-only connection to the manifest (or, with attr='index_con', the slim index), opening it on first use.
+        """
+
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            holder = self._local.holder = _ThreadConnections()
+            with self._lock:
+                self._holders.add(holder)
+        con = holder.connections.get(attr)
+        if con is None:
+            db_uri = Path(path or self.db_path).resolve().as_uri() + "?mode=ro"
+            con = sqlite3.connect(db_uri, uri=True, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+            holder.connections[attr] = con
+        return con
+
+    def _index_connection(self, table_name):
+        """
+        Returns this thread's connection to the slim index if it covers table_name, otherwise None.
+        """
+
+        if not self.index_path:
+            return None
+        con = self._connection('index_con', self.index_path)
+        if self._index_tables is None:
+            rows = con.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+            self._index_tables = {row[0] for row in rows}
+        return con if table_name in self._index_tables else None
+
+    def _query_for(self, table_name):
+        """
+        Returns the (cached) SQL string for a table. Reusing the exact same string lets sqlite3 reuse its prepared statement.
+        Raises ValueError for tables that don't exist in the manifest, so table names never reach SQL unchecked.
+        """
+
+        query_str = self._queries.get(table_name)
+        if query_str is None:
+            if self._tables is None:
+                rows = self._connection().execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+                self._tables = {row[0] for row in rows}
+            if table_name not in self._tables:
+                raise ValueError(f"Unknown manifest table: {table_name}")
+            query_str = f"SELECT json FROM {table_name} WHERE id = ?"
+            self._queries[table_name] = query_str
+        return query_str
+
+    def _cache_get(self, key):
+        """Returns a cached definition (marking it recently used) and updates the hit/miss counters."""
+
+        with self._lock:
+            definition = self._cache.get(key)
+            if definition is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return definition
+
+    def _cache_put(self, key, definition):
+        """Stores a decoded definition, evicting the least recently used entries past the size bound."""
+
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[key] = definition
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def has_table(self, table_name):
+        """Returns True if the manifest database contains the given table."""
+
+        try:
+            self._query_for(table_name)
+            return True
+        except ValueError:
+            return False
+
+    def get(self, table_name, hash_id):
+        """
+        Returns the decoded definition for a hash in the given table, or None if it isn't in the manifest.
+        """
+
+        if hash_id is None:
+            return None
+
+        key = (table_name, hash_id)
+        definition = self._cache_get(key)
+        if definition is not None:
+            return definition
+
+        result = self._connection().execute(self._query_for(table_name), (to_signed_hash(hash_id),)).fetchone()
+        if not result:
+            return None
+
+        definition = json.loads(result[0])
+        self._cache_put(key, definition)
+        return definition
+
+    def resolve_many(self, hashes_by_table):
+        """
+        Resolves many hashes at once, given a dict of {table_name: [hashes]}.
+        Cached definitions are served from memory; the rest are fetched with one chunked "WHERE id IN (...)" query per table.
+        Returns a dict of {table_name: {hash: definition}}. Hashes missing from the manifest are left out.
+        """
+
+        resolved = {}
+        for table_name, hash_ids in hashes_by_table.items():
+            self._query_for(table_name)
+            table_defs = {}
+            wanted = {}
+
+            # Serving what we can from the cache; everything else is looked up by its signed id.
+            for hash_id in set(hash_ids):
+                if hash_id is None:
+                    continue
+                definition = self._cache_get((table_name, hash_id))
+                if definition is not None:
+                    table_defs[hash_id] = definition
+                else:
+                    wanted[to_signed_hash(hash_id)] = hash_id
+
+            signed_ids = list(wanted)
+            for start in range(0, len(signed_ids), RESOLVE_CHUNK_SIZE):
+                chunk = signed_ids[start:start + RESOLVE_CHUNK_SIZE]
+                chunk_query = f"SELECT id, json FROM {table_name} WHERE id IN ({','.join('?' * len(chunk))})"
+                for signed_id, json_str in self._connection().execute(chunk_query, chunk):
+                    hash_id = wanted[signed_id]
+                    definition = json.loads(json_str)
+                    self._cache_put((table_name, hash_id), definition)
+                    table_defs[hash_id] = definition
+
+            resolved[table_name] = table_defs
+        return resolved
+
+    def resolve_response(self, api_response):
+        """
+        Walks a Bungie API response (e.g. a Profile response), collects every known "*Hash" field and resolves them in one pass.
+        Returns the same {table_name: {hash: definition}} dict as resolve_many().
+        """
+
+        hashes_by_table = collect_hashes(api_response)
+        return self.resolve_many({table: hashes for table, hashes in hashes_by_table.items() if self.has_table(table)})
+
+    def lookup_hot(self, table_name, hash_id):
+        """
+        Returns the hot fields (see HOT_COLUMNS) of a definition as a dict, or None if it isn't in the manifest.
+        Served straight from the slim index's typed columns when available, so no JSON is decoded.
+        """
+
+        return self.lookup_hot_many({table_name: [hash_id]}).get(table_name, {}).get(hash_id)
+
+    def lookup_name(self, table_name, hash_id):
+        """
+        Returns displayProperties.name for a hash, or None if it isn't in the manifest. Never decodes JSON when the slim index exists.
+        """
+
+        if hash_id is None:
+            return None
+
+        con = self._index_connection(table_name)
+        if con is None:
+            definition = self.get(table_name, hash_id)
+            return definition.get('displayProperties', {}).get('name') if definition else None
+
+        result = con.execute(f"SELECT name FROM {table_name} WHERE id = ?", (to_signed_hash(hash_id),)).fetchone()
+        return result[0] if result else None
+
+    def lookup_hot_many(self, hashes_by_table):
+        """
+        Batched lookup_hot(), given a dict of {table_name: [hashes]}.
+        Returns a dict of {table_name: {hash: hot fields}}. Hashes missing from the manifest are left out.
+        """
+
+        columns = [column for column, _, _ in HOT_COLUMNS]
+        found = {}
+        fallback = {}
+
+        for table_name, hash_ids in hashes_by_table.items():
+            con = self._index_connection(table_name)
+            if con is None:
+                fallback[table_name] = hash_ids
+                continue
+
+            wanted = {to_signed_hash(hash_id): hash_id for hash_id in set(hash_ids) if hash_id is not None}
+            signed_ids = list(wanted)
+            table_rows = {}
+            for start in range(0, len(signed_ids), RESOLVE_CHUNK_SIZE):
+                chunk = signed_ids[start:start + RESOLVE_CHUNK_SIZE]
+                chunk_query = f"SELECT id, {', '.join(columns)} FROM {table_name} WHERE id IN ({','.join('?' * len(chunk))})"
+                for row in con.execute(chunk_query, chunk):
+                    table_rows[wanted[row[0]]] = dict(zip(columns, row[1:]))
+            found[table_name] = table_rows
+
+        # Tables the slim index doesn't cover are resolved in full and projected down to the same shape.
+        for table_name, definitions in self.resolve_many(fallback).items():
+            found[table_name] = {hash_id: project_hot_fields(definition) for hash_id, definition in definitions.items()}
+
+        return found
+
+    def stats(self):
+        """Returns the cache counters, for sizing MANIFEST_CACHE_SIZE."""
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._cache),
+                "capacity": self.cache_size
+            }
+
+    def clear_cache(self):
+        """Drops every cached definition and resets the counters."""
+
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def close(self):
+        """Closes every connection opened by this reader, across all threads."""
+
+        with self._lock:
+            for holder in list(self._holders):
+                _close_all(holder.connections)
+            self._holders.clear()
+        self._local = threading.local()
+
+
+def collect_hashes(api_response, field_tables=HASH_FIELD_TABLES):
+    """
+    Collects every "*Hash" / "*Hashes" field in an API response that maps to a manifest table.
+    Returns a dict of {table_name: set(hashes)}.
+    """
+
+    hashes_by_table = {}
+    pending = [api_response]
+
+    # Iterative walk, so deeply nested profile responses can't hit the recursion limit.
+    while pending:
+        node = pending.pop()
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if isinstance(value, (dict, list)):
+                    if key.endswith("Hashes") and key[:-2] in field_tables and isinstance(value, list):
+                        hashes_by_table.setdefault(field_tables[key[:-2]], set()).update(v for v in value if isinstance(v, int))
+                    else:
+                        pending.append(value)
+                elif key in field_tables and isinstance(value, int) and value:
+                    hashes_by_table.setdefault(field_tables[key], set()).add(value)
+        elif isinstance(node, list):
+            pending.extend(item for item in node if isinstance(item, (dict, list)))
+
+    return hashes_by_table
+
+
+def project_hot_fields(definition):
+    """
+    Projects a decoded definition down to the HOT_COLUMNS fields, matching the rows in the slim index.
+    """
+
+    hot_fields = {}
+    for column, _, json_path in HOT_COLUMNS:
+        value = definition
+        for key in json_path:
+            value = value.get(key) if isinstance(value, dict) else None
+        hot_fields[column] = value
+    return hot_fields
+
+
+def build_slim_index(db_path, index_path=None, tables=HOT_TABLES):
+    """
+    Post-download build step: projects the hot fields of the commonly used tables into a compact sidecar database.
+    Each table gets typed columns (see HOT_COLUMNS) and is filled with SQLite's JSON1 functions, so nothing is decoded in Python.
+    The index is written under a temporary name and renamed into place. Returns its path.
+    """
+
+    index_path = index_path or db_path + SLIM_INDEX_SUFFIX
+    column_defs = ", ".join(f"{column} {sql_type}" for column, sql_type, _ in HOT_COLUMNS)
+    column_exprs = ", ".join(f"json_extract(json, '$.{'.'.join(json_path)}')" for _, _, json_path in HOT_COLUMNS)
+
+    fd, tmp_path = tempfile.mkstemp(suffix=SLIM_INDEX_SUFFIX, dir=os.path.dirname(os.path.abspath(index_path)))
+    os.close(fd)
+    try:
+        con = sqlite3.connect(tmp_path)
+        con.execute("ATTACH DATABASE ? AS src", (os.path.abspath(db_path),))
+        source_tables = {row[0] for row in con.execute("SELECT name FROM src.sqlite_master WHERE type = 'table'")}
+
+        for table_name in tables:
+            if table_name not in source_tables:
+                continue
+            con.execute(f"CREATE TABLE {table_name} (id INTEGER PRIMARY KEY NOT NULL, {column_defs})")
+            con.execute(f"INSERT INTO {table_name} SELECT id, {column_exprs} FROM src.{table_name}")
+
+        con.commit()
+        con.execute("DETACH DATABASE src")
+        con.execute("VACUUM")
+        con.close()
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return index_path
@@ -0,0 +1,260 @@
+# Importing necessary libraries
+import json
+import mmap
+import os
+import sqlite3  # For reading the manifest database while packing it
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+from manifest import ManifestReader, project_hot_fields
+
+# --- Constants & Configuration ---
+
+# "sqlite" reads the manifest database through ManifestReader; "packed" maps a pre-built pack file shared by every worker.
+# Packed mode only uses less memory per worker from roughly 12 workers per machine; below that the mapped pack costs
+# more than the ~7 MB per worker it saves (measurements in benchmarks/bench_shared_manifest.py).
+MANIFEST_MODE = os.getenv("MANIFEST_MODE", "sqlite")
+
+# Pack file written next to the manifest database.
+PACK_SUFFIX = ".pack"
+
+# Layout: header, then the packed JSON blobs, then per-table sorted hash / offset / length arrays, then a JSON directory.
+PACK_MAGIC = b"CFXPACK1"
+PACK_HEADER = struct.Struct("<8sQQ")  # magic, directory offset, directory length
+
+# Manifest databases whose pack this process has started building in the background.
+_background_builds = set()
+_background_builds_lock = threading.Lock()
+
+
+def _pad_to(f, alignment=8):
+    """Pads the file with zero bytes so the next array starts aligned."""
+
+    remainder = f.tell() % alignment
+    if remainder:
+        f.write(b"\0" * (alignment - remainder))
+
+
+def build_manifest_pack(db_path, pack_path=None, tables=None):
+    """
+    Packs the manifest database into an immutable file: every definition's JSON back to back, plus a sorted
+    hash-to-(offset, length) index per table. The result is memory-mapped by PackedManifest.
+    Packs every Destiny*Definition table unless `tables` is given. Written under a temporary name and renamed into place.
+    Returns the pack path.
+    """
+
+    pack_path = pack_path or db_path + PACK_SUFFIX
+    con = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+    if tables is None:
+        tables = [row[0] for row in con.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'Destiny%Definition'")]
+
+    fd, tmp_path = tempfile.mkstemp(suffix=PACK_SUFFIX, dir=os.path.dirname(os.path.abspath(pack_path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b"\0" * PACK_HEADER.size)
+            index = {}
+
+            # Writing the JSON blobs, remembering where each one landed.
+            for table_name in tables:
+                hashes, offsets, lengths = array('I'), array('Q'), array('I')
+                for signed_id, json_blob in con.execute(f"SELECT id, json FROM {table_name}"):
+                    if isinstance(json_blob, str):
+                        json_blob = json_blob.encode('utf-8')
+                    hashes.append(signed_id & 0xFFFFFFFF)
+                    offsets.append(f.tell())
+                    lengths.append(len(json_blob))
+                    f.write(json_blob)
+                index[table_name] = (hashes, offsets, lengths)
+
+            # Writing each table's arrays sorted by hash, so lookups can binary search them in place.
+            directory = {"byteorder": sys.byteorder, "tables": {}}
+            for table_name, (hashes, offsets, lengths) in index.items():
+                order = sorted(range(len(hashes)), key=hashes.__getitem__)
+                positions = []
+                for column, typecode in ((hashes, 'I'), (offsets, 'Q'), (lengths, 'I')):
+                    _pad_to(f)
+                    positions.append(f.tell())
+                    array(typecode, (column[i] for i in order)).tofile(f)
+                directory["tables"][table_name] = [len(hashes)] + positions
+
+            directory_bytes = json.dumps(directory).encode('utf-8')
+            directory_offset = f.tell()
+            f.write(directory_bytes)
+            f.seek(0)
+            f.write(PACK_HEADER.pack(PACK_MAGIC, directory_offset, len(directory_bytes)))
+
+        os.replace(tmp_path, pack_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        con.close()
+
+    return pack_path
+
+
+class PackedManifest:
+    """
+    Read-only manifest backed by a memory-mapped pack file (see build_manifest_pack).
+    The mapping is file-backed and never written, so when it is opened in the Gunicorn master (preload_app) every
+    worker shares the same physical pages. Definitions are decoded on demand and not cached, so there is no per-worker
+    copy of the manifest in Python objects. Implements the same lookup methods as ManifestReader.
+    """
+
+    def __init__(self, pack_path, db_path=None):
+        self.pack_path = pack_path
+        self.db_path = db_path or pack_path[:-len(PACK_SUFFIX)]
+        self.lookups = 0
+        self.misses = 0
+
+        with open(pack_path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, directory_offset, directory_length = PACK_HEADER.unpack_from(self._mm, 0)
+        if magic != PACK_MAGIC:
+            self._mm.close()
+            raise ValueError(f"Not a manifest pack: {pack_path}")
+
+        directory = json.loads(self._mm[directory_offset:directory_offset + directory_length])
+        if directory["byteorder"] != sys.byteorder:
+            self._mm.close()
+            raise ValueError(f"Manifest pack was built on a {directory['byteorder']}-endian machine: {pack_path}")
+
+        # Zero-copy views over each table's arrays.
+        view = memoryview(self._mm)
+        self._tables = {}
+        for table_name, (count, hashes_at, offsets_at, lengths_at) in directory["tables"].items():
+            self._tables[table_name] = (
+                view[hashes_at:hashes_at + 4 * count].cast('I'),
+                view[offsets_at:offsets_at + 8 * count].cast('Q'),
+                view[lengths_at:lengths_at + 4 * count].cast('I')
+            )
+        view.release()
+
+    def has_table(self, table_name):
+        """Returns True if the pack contains the given table."""
+
+        return table_name in self._tables
+
+    def _raw(self, table_name, hash_id):
+        """Returns the raw JSON bytes for a hash, or None if it isn't in the pack."""
+
+        hashes, offsets, lengths = self._tables[table_name]
+        self.lookups += 1
+        position = bisect_left(hashes, hash_id)
+        if position == len(hashes) or hashes[position] != hash_id:
+            self.misses += 1
+            return None
+        offset = offsets[position]
+        return self._mm[offset:offset + lengths[position]]
+
+    def get(self, table_name, hash_id):
+        """
+        Returns the decoded definition for a hash in the given table, or None if it isn't in the manifest.
+        Raises ValueError for unknown tables, like ManifestReader.
+        """
+
+        if hash_id is None:
+            return None
+        if table_name not in self._tables:
+            raise ValueError(f"Unknown manifest table: {table_name}")
+
+        raw = self._raw(table_name, hash_id & 0xFFFFFFFF)
+        return json.loads(raw) if raw is not None else None
+
+    def resolve_many(self, hashes_by_table):
+        """Returns {table_name: {hash: definition}} for a dict of {table_name: [hashes]}."""
+
+        resolved = {}
+        for table_name, hash_ids in hashes_by_table.items():
+            table_defs = {}
+            for hash_id in set(hash_ids):
+                definition = self.get(table_name, hash_id)
+                if definition is not None:
+                    table_defs[hash_id] = definition
+            resolved[table_name] = table_defs
+        return resolved
+
+    def lookup_hot_many(self, hashes_by_table):
+        """Returns {table_name: {hash: hot fields}}, matching ManifestReader.lookup_hot_many()."""
+
+        return {
+            table_name: {hash_id: project_hot_fields(definition) for hash_id, definition in definitions.items()}
+            for table_name, definitions in self.resolve_many(hashes_by_table).items()
+        }
+
+    def lookup_hot(self, table_name, hash_id):
+        """Returns the hot fields of a definition, or None if it isn't in the manifest."""
+
+        return self.lookup_hot_many({table_name: [hash_id]}).get(table_name, {}).get(hash_id)
+
+    def lookup_name(self, table_name, hash_id):
+        """Returns displayProperties.name for a hash, or None if it isn't in the manifest."""
+
+        definition = self.get(table_name, hash_id)
+        return definition.get('displayProperties', {}).get('name') if definition else None
+
+    def stats(self):
+        """Returns lookup counters. There is no definition cache in packed mode."""
+
+        return {"lookups": self.lookups, "misses": self.misses, "tables": len(self._tables), "bytes": len(self._mm)}
+
+    def close(self):
+        """Releases the table views and unmaps the pack."""
+
+        for views in self._tables.values():
+            for view in views:
+                view.release()
+        self._tables = {}
+        self._mm.close()
+
+
+def build_manifest_pack_in_background(db_path):
+    """Starts building the pack for a manifest database on a daemon thread, once per process."""
+
+    with _background_builds_lock:
+        if db_path in _background_builds:
+            return
+        _background_builds.add(db_path)
+
+    def run():
+        try:
+            build_manifest_pack(db_path)
+        except Exception as e:
+            print(f"Failed to build manifest pack: {e}")
+
+    threading.Thread(target=run, name="manifest-pack-build", daemon=True).start()
+
+
+def open_manifest_reader(db_path, mode=MANIFEST_MODE, build=True):
+    """
+    Opens the reader for the configured MANIFEST_MODE: a PackedManifest or a ManifestReader. A missing pack is built
+    first, or with build=False (e.g. inside a web request) built in the background while a ManifestReader stands in.
+    """
+
+    if mode == "packed":
+        pack_path = db_path + PACK_SUFFIX
+        if not os.path.isfile(pack_path):
+            if not build:
+                build_manifest_pack_in_background(db_path)
+                return ManifestReader(db_path)
+            build_manifest_pack(db_path, pack_path)
+        return PackedManifest(pack_path, db_path)
+    return ManifestReader(db_path)
+
+
+def reader_is_current(reader, db_path, mode=MANIFEST_MODE):
+    """
+    Returns True if reader (from open_manifest_reader) serves db_path in the configured mode. A ManifestReader standing
+    in for a pack stops being current once the pack exists.
+    """
+
+    if reader is None or reader.db_path != db_path:
+        return False
+    return mode != "packed" or isinstance(reader, PackedManifest) or not os.path.isfile(db_path + PACK_SUFFIX)
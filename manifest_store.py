@@ -0,0 +1,370 @@
+# Importing necessary libraries
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3  # For writing the pruned manifest database
+import tempfile
+import time
+import zipfile  # For handling the .zip file (manifest)
+from http_client import HTTP_CONNECT_TIMEOUT, get_http_session  # Pooled client for the manifest requests
+from file_lock import FileLock
+from instrumentation import timed
+from manifest import HASH_FIELD_TABLES, HOT_TABLES, build_slim_index
+from manifest_packed import MANIFEST_MODE, build_manifest_pack
+
+# --- Constants & Configuration ---
+
+BASE_BUNGIE_URL = "https://www.bungie.net"
+GET_MANIFEST_ENDPOINT = f"{BASE_BUNGIE_URL}/Platform/Destiny2/Manifest/"
+
+# Directory holding one sub-directory per extracted manifest version.
+MANIFEST_STORE_DIR = os.getenv("MANIFEST_STORE_DIR", "manifest_store")
+
+# How many extracted versions (including the current one) to keep on disk.
+MANIFEST_KEEP_VERSIONS = int(os.getenv("MANIFEST_KEEP_VERSIONS", "2"))
+
+# Files inside MANIFEST_STORE_DIR used to coordinate workers.
+CURRENT_FILE = "CURRENT"  # Holds "<store key>\n<db path relative to the store>" for the active version (see store_key)
+LOCK_FILE = ".lock"
+TEMP_PREFIX = ".tmp-"
+
+# Which manifest tables (and which top-level definition fields) to keep after download. Either a name from
+# TABLE_PROFILES or the path to a JSON file with the same {table: [fields] or null} shape.
+MANIFEST_TABLE_PROFILE = os.getenv("MANIFEST_TABLE_PROFILE", "conflux")
+
+# Large tables whose definitions the app only reads a few fields of.
+CONFLUX_TABLE_FIELDS = {
+    "DestinyInventoryItemDefinition": [
+        "hash", "displayProperties", "itemTypeDisplayName", "flavorText", "screenshot", "itemType", "itemSubType",
+        "classType", "defaultDamageType", "inventory", "equippingBlock", "stats", "investmentStats", "sockets",
+        "perks", "plug", "iconWatermark"
+    ],
+    "DestinyRecordDefinition": [
+        "hash", "displayProperties", "titleInfo", "objectiveHashes", "completionInfo", "parentNodeHashes"
+    ]
+}
+
+# Table profiles. None keeps every table; a table mapped to None keeps whole definitions; a list keeps only those fields.
+# "conflux" keeps every table API responses are resolved against (manifest.HASH_FIELD_TABLES) or the slim index is
+# built from (manifest.HOT_TABLES), plus the plug sets sockets point at, so pruning can't drop a table a lookup needs.
+TABLE_PROFILES = {
+    "full": None,
+    "conflux": dict(
+        {table_name: None for table_name in sorted(set(HASH_FIELD_TABLES.values()) | set(HOT_TABLES) | {"DestinyPlugSetDefinition"})},
+        **CONFLUX_TABLE_FIELDS
+    )
+}
+
+# Download/extraction buffer sizes. Peak memory is bounded by these, not by the size of the manifest.
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+EXTRACT_BUFFER_SIZE = 1024 * 1024
+
+# Read timeout (seconds between bytes) for the manifest download, which is much larger than any API response.
+MANIFEST_READ_TIMEOUT = float(os.getenv("MANIFEST_READ_TIMEOUT", "120"))
+
+# Sanity limits on the manifest zip and the database inside it (guards against truncated or hostile archives).
+MANIFEST_MAX_ZIP_BYTES = int(os.getenv("MANIFEST_MAX_ZIP_BYTES", str(512 * 1024 * 1024)))
+MANIFEST_MAX_DB_BYTES = int(os.getenv("MANIFEST_MAX_DB_BYTES", str(2048 * 1024 * 1024)))
+
+
+def get_manifest_info(headers):
+    """
+    Fetches the current manifest version and the full URL of the English mobile world content database.
+    Returns a dict with "version" and "url", or None if it fails.
+    """
+
+    try:
+        manifest_response = get_http_session().get(GET_MANIFEST_ENDPOINT, headers=headers)
+        manifest_response.raise_for_status()
+        manifest_info = manifest_response.json()['Response']
+        return {
+            "version": manifest_info['version'],
+            "url": BASE_BUNGIE_URL + manifest_info['mobileWorldContentPaths']['en']
+        }
+
+    except Exception as e:
+        print(f"Failed to fetch manifest info: {e}")
+        return None
+
+
+def version_dir_name(version):
+    """Turns a manifest version string into a safe directory name."""
+
+    return re.sub(r'[^A-Za-z0-9._-]', '_', version)
+
+
+def read_current(store_dir=MANIFEST_STORE_DIR):
+    """
+    Returns (version, db_path) for the active manifest in the store, or (None, None) if there isn't a usable one.
+    """
+
+    try:
+        with open(os.path.join(store_dir, CURRENT_FILE), 'r', encoding='utf-8') as f:
+            version, db_relpath = f.read().splitlines()[:2]
+    except (OSError, ValueError):
+        return None, None
+
+    db_path = os.path.join(store_dir, db_relpath)
+    if not os.path.isfile(db_path):
+        return None, None
+    return version, db_path
+
+
+def write_current(version, db_relpath, store_dir=MANIFEST_STORE_DIR):
+    """Atomically points the store at a new active version. db_relpath is relative to store_dir."""
+
+    fd, tmp_path = tempfile.mkstemp(prefix=TEMP_PREFIX, dir=store_dir)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(f"{version}\n{db_relpath}\n")
+    os.replace(tmp_path, os.path.join(store_dir, CURRENT_FILE))
+
+
+def stream_to_file(manifest_url, dest_path):
+    """
+    Streams the response body for manifest_url into dest_path in DOWNLOAD_CHUNK_SIZE pieces.
+    Raises ValueError if the body is larger than MANIFEST_MAX_ZIP_BYTES or shorter than its Content-Length.
+    Returns the number of bytes written.
+    """
+
+    with get_http_session().get(manifest_url, stream=True, timeout=(HTTP_CONNECT_TIMEOUT, MANIFEST_READ_TIMEOUT)) as response:
+        response.raise_for_status()
+        expected_size = int(response.headers.get('Content-Length', 0))
+        if expected_size > MANIFEST_MAX_ZIP_BYTES:
+            raise ValueError(f"Manifest zip is too large ({expected_size} bytes)")
+
+        written = 0
+        with open(dest_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > MANIFEST_MAX_ZIP_BYTES:
+                    raise ValueError(f"Manifest zip exceeded {MANIFEST_MAX_ZIP_BYTES} bytes")
+                f.write(chunk)
+
+    # Content-Length is the compressed size when the body is gzip-encoded, so only check it for identity transfers.
+    if expected_size and 'Content-Encoding' not in response.headers and written != expected_size:
+        raise ValueError(f"Manifest download truncated ({written} of {expected_size} bytes)")
+    return written
+
+
+def extract_manifest(zip_path, dest_dir):
+    """
+    Extracts the database from a manifest zip into dest_dir using a bounded copy buffer.
+    The file is written under a temporary name and renamed into place once its size and CRC have been verified.
+    Returns the path to the extracted SQLite database file.
+    """
+
+    with zipfile.ZipFile(zip_path) as manifest_zip:
+        db_info = manifest_zip.infolist()[0]
+        if db_info.file_size > MANIFEST_MAX_DB_BYTES:
+            raise ValueError(f"Manifest database is too large ({db_info.file_size} bytes)")
+
+        db_filename = os.path.basename(db_info.filename)
+        db_path = os.path.join(dest_dir, db_filename)
+        fd, tmp_path = tempfile.mkstemp(prefix=TEMP_PREFIX, dir=dest_dir)
+        try:
+            # Reading the member to the end makes zipfile verify its CRC, raising BadZipFile on corruption.
+            with manifest_zip.open(db_info) as src, os.fdopen(fd, 'wb') as dst:
+                shutil.copyfileobj(src, dst, EXTRACT_BUFFER_SIZE)
+            if os.path.getsize(tmp_path) != db_info.file_size:
+                raise ValueError(f"Extracted manifest size mismatch for {db_filename}")
+            os.replace(tmp_path, db_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    return db_path
+
+
+def download_manifest(manifest_url, dest_dir):
+    """
+    Downloads the manifest zip from the provided URL and extracts its database into dest_dir.
+    The zip is streamed to a temp file and extracted in bounded chunks, so neither is ever held in memory.
+    Returns the path to the extracted SQLite database file.
+    """
+
+    fd, zip_path = tempfile.mkstemp(prefix=TEMP_PREFIX, suffix=".zip", dir=dest_dir)
+    os.close(fd)
+    try:
+        with timed("manifest_download_seconds", stage="download"):
+            stream_to_file(manifest_url, zip_path)
+        with timed("manifest_download_seconds", stage="extract"):
+            return extract_manifest(zip_path, dest_dir)
+    finally:
+        os.remove(zip_path)
+
+
+def load_table_profile(profile=MANIFEST_TABLE_PROFILE):
+    """
+    Returns the table profile for a profile name or JSON file path. None means keep the whole manifest.
+    """
+
+    if profile in TABLE_PROFILES:
+        return TABLE_PROFILES[profile]
+    with open(profile, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def store_key(version, profile=MANIFEST_TABLE_PROFILE):
+    """
+    Returns the key a manifest version is stored under. Pruned manifests include the profile's name and a digest of its
+    contents, so switching profiles or editing one (built in or a JSON file) triggers a rebuild.
+    """
+
+    table_profile = load_table_profile(profile)
+    if table_profile is None:
+        return version
+    digest = hashlib.sha256(json.dumps(table_profile, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+    return f"{version}@{os.path.splitext(os.path.basename(profile))[0]}-{digest}"
+
+
+def prune_manifest(db_path, table_profile):
+    """
+    Rewrites the manifest database in place keeping only the tables (and definition fields) named in table_profile.
+    Tables the profile names but this manifest version lacks are skipped, with one note listing them.
+    The pruned copy is VACUUMed and renamed over the original, shrinking disk use, page-cache pressure and query times.
+    Returns the path to the database.
+    """
+
+    if table_profile is None:
+        return db_path
+
+    fd, tmp_path = tempfile.mkstemp(prefix=TEMP_PREFIX, dir=os.path.dirname(os.path.abspath(db_path)))
+    os.close(fd)
+    try:
+        con = sqlite3.connect(tmp_path)
+        con.execute("ATTACH DATABASE ? AS src", (os.path.abspath(db_path),))
+        source_tables = {row[0] for row in con.execute("SELECT name FROM src.sqlite_master WHERE type = 'table'")}
+
+        missing_tables = sorted(table_name for table_name in table_profile if table_name not in source_tables)
+        if missing_tables:
+            print(f"Note: {len(missing_tables)} table(s) from the table profile aren't in this manifest: {', '.join(missing_tables)}")
+
+        for table_name, fields in table_profile.items():
+            if table_name not in source_tables:
+                continue
+
+            con.execute(f"CREATE TABLE {table_name} (id INTEGER PRIMARY KEY NOT NULL, json BLOB)")
+            if fields is None:
+                con.execute(f"INSERT INTO {table_name} SELECT id, json FROM src.{table_name}")
+                continue
+
+            # Projecting each definition down to the listed top-level fields, streaming rows rather than loading the table.
+            rows = con.execute(f"SELECT id, json FROM src.{table_name}")
+            con.executemany(f"INSERT INTO {table_name} VALUES (?, ?)", (
+                (row_id, json.dumps({key: value for key, value in json.loads(json_str).items() if key in fields}, separators=(',', ':')))
+                for row_id, json_str in rows
+            ))
+
+        con.commit()
+        con.execute("DETACH DATABASE src")
+        con.execute("VACUUM")
+        con.close()
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return db_path
+
+
+def build_manifest_sidecars(db_path):
+    """
+    Runs the post-download build steps for a freshly extracted manifest database.
+    Failures are reported but not fatal: readers fall back to the full database when a sidecar is missing.
+    """
+
+    try:
+        build_slim_index(db_path)
+    except Exception as e:
+        print(f"Failed to build slim manifest index: {e}")
+
+    if MANIFEST_MODE == "packed":
+        try:
+            build_manifest_pack(db_path)
+        except Exception as e:
+            print(f"Failed to build manifest pack: {e}")
+
+
+def collect_old_versions(store_dir=MANIFEST_STORE_DIR, keep=MANIFEST_KEEP_VERSIONS):
+    """
+    Deletes all but the newest `keep` version directories, never touching the active one.
+    Workers still reading an old database on Windows can't have it deleted; those are skipped and retried next time.
+    """
+
+    current_version, _ = read_current(store_dir)
+    current_dir = version_dir_name(current_version) if current_version else None
+
+    version_dirs = []
+    for entry in os.scandir(store_dir):
+        if not entry.is_dir():
+            continue
+        # Stale temp directories from crashed downloads are always removed.
+        if entry.name.startswith(TEMP_PREFIX):
+            if time.time() - entry.stat().st_mtime > 3600:
+                shutil.rmtree(entry.path, ignore_errors=True)
+            continue
+        if entry.name != current_dir:
+            version_dirs.append(entry)
+
+    version_dirs.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in version_dirs[max(keep - 1, 0):]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def ensure_manifest(headers, store_dir=MANIFEST_STORE_DIR, max_age=0, get_info=get_manifest_info):
+    """
+    Makes sure the store holds the latest manifest and returns the path to its database.
+    If the active version was checked less than max_age seconds ago, it is reused without any network call.
+    Otherwise the version is checked with get_info(headers) (by default straight against Bungie) and the database is
+    only downloaded when it has changed.
+    Returns None if no manifest is available.
+    """
+
+    os.makedirs(store_dir, exist_ok=True)
+    current_file = os.path.join(store_dir, CURRENT_FILE)
+    current_version, current_path = read_current(store_dir)
+
+    # Fast path: a recently checked manifest is reused as-is.
+    if current_path and max_age and time.time() - os.path.getmtime(current_file) < max_age:
+        return current_path
+
+    manifest_info = get_info(headers)
+    if not manifest_info:
+        # Bungie is unreachable; serve whatever we already have.
+        return current_path
+
+    manifest_key = store_key(manifest_info['version'])
+    if manifest_key == current_version:
+        os.utime(current_file)
+        return current_path
+
+    with FileLock(os.path.join(store_dir, LOCK_FILE)):
+
+        # Another worker may have finished the download while we waited for the lock.
+        current_version, current_path = read_current(store_dir)
+        if manifest_key == current_version:
+            return current_path
+
+        version_name = version_dir_name(manifest_key)
+        version_dir = os.path.join(store_dir, version_name)
+        tmp_dir = tempfile.mkdtemp(prefix=TEMP_PREFIX, dir=store_dir)
+        try:
+            db_tmp_path = download_manifest(manifest_info['url'], tmp_dir)
+            db_filename = os.path.basename(db_tmp_path)
+            prune_manifest(db_tmp_path, load_table_profile())
+            build_manifest_sidecars(db_tmp_path)
+            shutil.rmtree(version_dir, ignore_errors=True)
+            os.replace(tmp_dir, version_dir)
+        except Exception as e:
+            print(f"Failed to download or extract manifest: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return current_path
+
+        write_current(manifest_key, os.path.join(version_name, db_filename), store_dir)
+        collect_old_versions(store_dir)
+
+    return os.path.join(version_dir, db_filename)
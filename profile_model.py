@@ -0,0 +1,309 @@
+# Importing necessary libraries
+import os
+from dataclasses import dataclass, field
+
+# --- Constants & Configuration ---
+
+# DestinyComponentType values for GetProfile, by name. Callers declare the names they need and
+# profile_components_param() assembles the ?components= string for a single Profile call.
+COMPONENTS = {
+    "Profiles": 100,
+    "ProfileInventories": 102,
+    "ProfileCurrencies": 103,
+    "Characters": 200,
+    "CharacterInventories": 201,
+    "CharacterProgressions": 202,
+    "CharacterEquipment": 205,
+    "ItemInstances": 300,
+    "ItemStats": 304,
+    "Records": 900
+}
+
+# Everything the dashboard renders, fetched in one round trip.
+DASHBOARD_COMPONENTS = ("Characters", "CharacterEquipment", "ItemInstances")
+
+# Parse large profile responses incrementally (see stream_profile) instead of loading the whole JSON tree first.
+PROFILE_STREAMING = os.getenv("PROFILE_STREAMING", "0") == "1"
+
+# The parts of a GetProfile response the model is built from, as json_stream.iter_json paths.
+PROFILE_STREAM_PATHS = (
+    ("ErrorCode",),
+    ("Message",),
+    ("Response", "responseMintedTimestamp"),
+    ("Response", "characters", "data", "*"),
+    ("Response", "characterEquipment", "data", "*", "items", "*"),
+    ("Response", "characterInventories", "data", "*", "items", "*"),
+    ("Response", "profileInventory", "data", "items", "*"),
+    ("Response", "itemComponents", "instances", "data", "*"),
+    ("Response", "itemComponents", "stats", "data", "*")
+)
+
+# Equipment bucket hashes (DestinyInventoryBucketDefinition) and the slot each one fills.
+EQUIPMENT_SLOTS = {
+    1498876634: "Kinetic Slot",
+    2465295065: "Energy Slot",
+    953998645: "Power Slot",
+    3448274439: "Helmet",
+    3551918588: "Gauntlets",
+    14239492: "Chest Armor",
+    20886954: "Leg Armor",
+    1585787867: "Class Item",
+    4023194814: "Ghost",
+    2025709351: "Vehicle",
+    284967655: "Ship",
+    3284755031: "Subclass"
+}
+
+
+def profile_components_param(components):
+    """
+    Builds the GetProfile components parameter from component names or numbers, e.g. ("Characters", 205) -> "200,205".
+    Raises ValueError for unknown component names.
+    """
+
+    codes = set()
+    for component in components:
+        if isinstance(component, int):
+            codes.add(component)
+        elif component in COMPONENTS:
+            codes.add(COMPONENTS[component])
+        else:
+            raise ValueError(f"Unknown profile component: {component}")
+    return ",".join(str(code) for code in sorted(codes))
+
+
+@dataclass(slots=True)
+class Stat:
+    """A single stat value on a character or item instance."""
+
+    stat_hash: int
+    value: int
+
+
+@dataclass(slots=True)
+class Item:
+    """An item in an inventory or equipment bucket. instance_id is None for non-instanced items (e.g. materials)."""
+
+    item_hash: int
+    bucket_hash: int
+    instance_id: int = None
+    quantity: int = 1
+    state: int = 0
+
+
+@dataclass(slots=True)
+class ItemInstance:
+    """Per-instance item data (component 300), plus stats when component 304 was requested."""
+
+    instance_id: int
+    power: int = None
+    damage_type: int = 0
+    is_equipped: bool = False
+    can_equip: bool = False
+    stats: tuple = ()
+
+
+@dataclass(slots=True)
+class Character:
+    """A character's summary (component 200) with its equipment (205) and inventory (201) when requested."""
+
+    character_id: int
+    class_hash: int
+    race_hash: int
+    light: int
+    title_record_hash: int = None
+    emblem_path: str = ""
+    emblem_background_path: str = ""
+    date_last_played: str = ""
+    stats: tuple = ()
+    equipment: list = field(default_factory=list)
+    inventory: list = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class Profile:
+    """
+    A Destiny profile built from one GetProfile response. Only the fields Conflux uses are kept, as ints and tuples,
+    so a loaded profile is a fraction of the size of the raw JSON dicts.
+    """
+
+    membership_type: int
+    membership_id: int
+    characters: dict = field(default_factory=dict)
+    profile_inventory: list = field(default_factory=list)
+    item_instances: dict = field(default_factory=dict)
+    minted: str = None
+
+    def instance_of(self, item):
+        """Returns the ItemInstance for an item, or None if it isn't instanced or ItemInstances wasn't requested."""
+
+        return self.item_instances.get(item.instance_id) if item.instance_id is not None else None
+
+    def hashes_by_table(self):
+        """Returns {table_name: [hashes]} for every manifest hash the model holds, ready for lookup_hot_many()."""
+
+        hashes = {
+            "DestinyClassDefinition": [],
+            "DestinyRaceDefinition": [],
+            "DestinyRecordDefinition": [],
+            "DestinyInventoryItemDefinition": [item.item_hash for item in self.profile_inventory]
+        }
+        for character in self.characters.values():
+            hashes["DestinyClassDefinition"].append(character.class_hash)
+            hashes["DestinyRaceDefinition"].append(character.race_hash)
+            if character.title_record_hash is not None:
+                hashes["DestinyRecordDefinition"].append(character.title_record_hash)
+            hashes["DestinyInventoryItemDefinition"].extend(item.item_hash for item in character.equipment)
+            hashes["DestinyInventoryItemDefinition"].extend(item.item_hash for item in character.inventory)
+        return hashes
+
+
+def _stats_of(raw_stats):
+    """Converts a {statHash: value} or {statHash: {statHash, value}} mapping into a tuple of Stat."""
+
+    return tuple(
+        Stat(int(stat_hash), value['value'] if isinstance(value, dict) else value)
+        for stat_hash, value in (raw_stats or {}).items()
+    )
+
+
+def _item_of(raw):
+    """Converts a DestinyItemComponent dict into an Item."""
+
+    return Item(
+        raw['itemHash'],
+        raw.get('bucketHash', 0),
+        int(raw['itemInstanceId']) if 'itemInstanceId' in raw else None,
+        raw.get('quantity', 1),
+        raw.get('state', 0)
+    )
+
+
+def _items_of(raw_items):
+    """Converts a list of DestinyItemComponent dicts into Items."""
+
+    return [_item_of(raw) for raw in raw_items or []]
+
+
+def _character_of(character_id, raw):
+    """Converts a DestinyCharacterComponent dict into a Character (without equipment or inventory)."""
+
+    return Character(
+        int(character_id),
+        raw.get('classHash'),
+        raw.get('raceHash'),
+        raw.get('light'),
+        raw.get('titleRecordHash'),
+        raw.get('emblemPath', ''),
+        raw.get('emblemBackgroundPath', ''),
+        raw.get('dateLastPlayed', ''),
+        _stats_of(raw.get('stats'))
+    )
+
+
+def _instance_of(instance_id, raw, raw_stats=None):
+    """Converts a DestinyItemInstanceComponent dict (and its DestinyItemStatsComponent, if any) into an ItemInstance."""
+
+    return ItemInstance(
+        int(instance_id),
+        (raw.get('primaryStat') or {}).get('value'),
+        raw.get('damageType', 0),
+        raw.get('isEquipped', False),
+        raw.get('canEquip', False),
+        _stats_of((raw_stats or {}).get('stats'))
+    )
+
+
+def parse_profile(response, membership_type, membership_id):
+    """
+    Builds a Profile from the Response of a GetProfile call. Components that weren't requested (or are privacy
+    restricted and come back without data) are simply left empty.
+    """
+
+    response = response or {}
+    characters = {}
+    for character_id, raw in ((response.get('characters') or {}).get('data') or {}).items():
+        characters[int(character_id)] = _character_of(character_id, raw)
+
+    for component, attribute in (('characterEquipment', 'equipment'), ('characterInventories', 'inventory')):
+        for character_id, raw in ((response.get(component) or {}).get('data') or {}).items():
+            character = characters.get(int(character_id))
+            if character is not None:
+                setattr(character, attribute, _items_of(raw.get('items')))
+
+    item_instances = {}
+    item_components = response.get('itemComponents') or {}
+    raw_stats = (item_components.get('stats') or {}).get('data') or {}
+    for instance_id, raw in ((item_components.get('instances') or {}).get('data') or {}).items():
+        item_instances[int(instance_id)] = _instance_of(instance_id, raw, raw_stats.get(instance_id))
+
+    return Profile(
+        int(membership_type),
+        int(membership_id),
+        characters,
+        _items_of(((response.get('profileInventory') or {}).get('data') or {}).get('items')),
+        item_instances,
+        response.get('responseMintedTimestamp')
+    )
+
+
+def stream_profile(events, membership_type, membership_id):
+    """
+    Builds a Profile from the (path, value) events of json_stream.iter_json(..., PROFILE_STREAM_PATHS), yielding each
+    Item as soon as it has been read. The finished Profile is the generator's return value, so callers that only want
+    the profile can use `profile = yield from stream_profile(...)` or just exhaust it with collect_profile().
+    Raises ValueError if Bungie answered with a non-success ErrorCode.
+    """
+
+    profile = Profile(int(membership_type), int(membership_id))
+    # Equipment / inventory for characters not seen yet, and stats for instances not seen yet.
+    pending_items, pending_stats = {}, {}
+    error_code, message = 1, ""
+
+    for path, value in events:
+        if path[0] == "ErrorCode":
+            error_code = value
+        elif path[0] == "Message":
+            message = value
+        elif path[1] == "responseMintedTimestamp":
+            profile.minted = value
+        elif path[1] == "characters":
+            character = profile.characters[int(path[3])] = _character_of(path[3], value)
+            for attribute, items in pending_items.pop(character.character_id, {}).items():
+                getattr(character, attribute).extend(items)
+        elif path[1] in ("characterEquipment", "characterInventories"):
+            item = _item_of(value)
+            attribute = "equipment" if path[1] == "characterEquipment" else "inventory"
+            character = profile.characters.get(int(path[3]))
+            if character is not None:
+                getattr(character, attribute).append(item)
+            else:
+                pending_items.setdefault(int(path[3]), {}).setdefault(attribute, []).append(item)
+            yield item
+        elif path[1] == "profileInventory":
+            item = _item_of(value)
+            profile.profile_inventory.append(item)
+            yield item
+        elif path[2] == "instances":
+            profile.item_instances[int(path[4])] = _instance_of(path[4], value, pending_stats.pop(path[4], None))
+        elif path[2] == "stats":
+            instance = profile.item_instances.get(int(path[4]))
+            if instance is not None:
+                instance.stats = _stats_of(value.get('stats'))
+            else:
+                pending_stats[path[4]] = value
+
+    if error_code != 1:
+        raise ValueError(f"Bungie API error {error_code}: {message}")
+    return profile
+
+
+def collect_profile(events, membership_type, membership_id):
+    """Consumes stream_profile() and returns the finished Profile."""
+
+    items = stream_profile(events, membership_type, membership_id)
+    while True:
+        try:
+            next(items)
+        except StopIteration as finished:
+            return finished.value
@@ -0,0 +1,297 @@
+# Importing necessary libraries
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api_cache import MemoryCacheBackend
+
+# --- Constants & Configuration ---
+
+# "0" turns background prefetching off; every dashboard load then fetches inline, as before.
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1") == "1"
+
+# How often an active user's profile is refreshed in the background, and how long after their last page view or
+# open dashboard they count as active.
+PREFETCH_INTERVAL = int(os.getenv("PREFETCH_INTERVAL", "60"))
+PREFETCH_ACTIVE_WINDOW = int(os.getenv("PREFETCH_ACTIVE_WINDOW", "900"))
+
+# Background fetch threads per process. Their calls go out at BACKGROUND priority, behind every interactive one.
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "4"))
+
+# Snapshots older than this aren't served to a page; it fetches inline instead.
+PREFETCH_MAX_AGE = int(os.getenv("PREFETCH_MAX_AGE", "300"))
+PREFETCH_MAX_SNAPSHOTS = int(os.getenv("PREFETCH_MAX_SNAPSHOTS", "1024"))
+
+# Dashboards listen for changes on an event stream, which holds a server thread for as long as it's open: run
+# Gunicorn with threaded workers (see gunicorn.conf.py), or set "0" on sync workers so pages don't open streams.
+PREFETCH_STREAMS = PREFETCH_ENABLED and os.getenv("PREFETCH_STREAMS", "1") == "1"
+
+# An event stream sends a comment this often so proxies don't close it, and ends after PREFETCH_STREAM_SECONDS so
+# it doesn't hold a worker thread forever; the browser's EventSource reconnects on its own.
+PREFETCH_KEEPALIVE = int(os.getenv("PREFETCH_KEEPALIVE", "20"))
+PREFETCH_STREAM_SECONDS = int(os.getenv("PREFETCH_STREAM_SECONDS", "300"))
+
+# Events queued per open stream before new ones are dropped (a stalled client).
+PREFETCH_QUEUE_SIZE = 64
+
+# How often the scheduler looks for users due a refresh.
+PREFETCH_TICK = 5
+
+
+def character_state(character):
+    """The parts of a character a live dashboard patches in place."""
+
+    return {
+        "light": character.light,
+        "emblemPath": character.emblem_path,
+        "emblemBackgroundPath": character.emblem_background_path,
+        "equipment": [item.item_hash for item in character.equipment]
+    }
+
+
+def profile_changes(old_profile, new_profile):
+    """
+    Returns the (event name, data) pairs that turn a page rendered from old_profile into one showing new_profile:
+    a "character" event per changed character, or a single "reload" when characters were added or removed, or their
+    class, race or title changed (those need the manifest and a fresh render). With no old_profile every character
+    is sent.
+    """
+
+    if old_profile is not None:
+        if old_profile.characters.keys() != new_profile.characters.keys():
+            return [("reload", {})]
+        for character_id, character in new_profile.characters.items():
+            old = old_profile.characters[character_id]
+            if (old.class_hash, old.race_hash, old.title_record_hash) != (character.class_hash, character.race_hash, character.title_record_hash):
+                return [("reload", {})]
+
+    events = []
+    for character_id, character in new_profile.characters.items():
+        state = character_state(character)
+        old_state = character_state(old_profile.characters[character_id]) if old_profile is not None else {}
+        changed = {name: value for name, value in state.items() if old_state.get(name) != value and name != "equipment"}
+        equipment_changed = old_profile is None or state["equipment"] != old_state["equipment"]
+        if changed or equipment_changed:
+            events.append(("character", dict(changed, characterId=str(character_id), equipmentChanged=equipment_changed)))
+    return events
+
+
+def sse_event(name, data, event_id=None):
+    """
+    Formats one Server-Sent Event. The browser sends the last event_id back (Last-Event-ID) when it reconnects, so
+    events carry the profile version they bring the page up to.
+    """
+
+    event_id_line = f"id: {event_id}\n" if event_id else ""
+    return f"{event_id_line}event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class ProfilePrefetcher:
+    """
+    Keeps the dashboard data of recently active users fresh in the background.
+
+    Pages call touch() with a way to get the user's OAuth session; a scheduler thread then refreshes every active
+    user's snapshot each PREFETCH_INTERVAL seconds on a small worker pool, through fetch(session, previous_snapshot),
+    which returns a dict holding at least "profile" (or None on failure). Pages serve snapshot() instead of waiting
+    on Bungie, and whenever a refresh changes a profile, the differences are pushed to that user's open event
+    streams (subscribe()) as profile_changes() events.
+
+    Snapshots and streams live in this process; under Gunicorn each worker keeps the users it has served.
+    """
+
+    def __init__(self, fetch, interval=PREFETCH_INTERVAL, active_window=PREFETCH_ACTIVE_WINDOW, workers=PREFETCH_WORKERS,
+                 max_snapshots=PREFETCH_MAX_SNAPSHOTS, enabled=PREFETCH_ENABLED):
+        self.fetch = fetch
+        self.interval = interval
+        self.active_window = active_window
+        self.workers = workers
+        self.enabled = enabled
+        self._snapshots = MemoryCacheBackend(max_snapshots)
+        self._active = {}
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._scheduler_pid = None
+        self.refreshed = 0
+        self.failed = 0
+        self.published = 0
+        self.dropped = 0
+
+    def snapshot(self, user_key, max_age=PREFETCH_MAX_AGE):
+        """Returns the user's latest snapshot if it's at most max_age seconds old (any age for None), otherwise None."""
+
+        if not self.enabled or user_key is None:
+            return None
+        snapshot = self._snapshots.get(user_key)
+        if snapshot is None or (max_age is not None and time.time() - snapshot["fetched_at"] > max_age):
+            return None
+        return snapshot
+
+    def store(self, user_key, snapshot):
+        """Stores a freshly fetched snapshot and pushes what changed since the previous one to the user's streams."""
+
+        if not self.enabled or user_key is None:
+            return
+        snapshot = dict(snapshot, fetched_at=time.time())
+        with self._lock:
+            previous = self._snapshots.get(user_key)
+            # A response minted before the one we hold (e.g. from a lagging edge cache) doesn't replace it.
+            if previous and previous["profile"].minted and snapshot["profile"].minted and snapshot["profile"].minted < previous["profile"].minted:
+                return
+            self._snapshots.set(user_key, snapshot)
+            if previous is None or previous["profile"].minted == snapshot["profile"].minted:
+                return
+            for name, data in profile_changes(previous["profile"], snapshot["profile"]):
+                self._publish(user_key, (name, data, snapshot["profile"].minted))
+
+    def _publish(self, user_key, event):
+        """Queues an (event name, data, profile version) on every stream the user has open. Called with the lock held."""
+
+        for events in self._subscribers.get(user_key, ()):
+            try:
+                events.put_nowait(event)
+                self.published += 1
+            except queue.Full:
+                self.dropped += 1
+
+    def touch(self, user_key, session_factory):
+        """
+        Marks the user active. session_factory() returns an OAuth session for background calls, or None once the user
+        can no longer be refreshed (e.g. their token expired), which stops refreshing them.
+        """
+
+        if not self.enabled or user_key is None:
+            return
+        with self._lock:
+            entry = self._active.setdefault(user_key, {"attempted": 0})
+            entry["seen"] = time.time()
+            entry["session_factory"] = session_factory
+
+    def subscribe(self, user_key):
+        """Opens an event stream for the user. Returns the queue its (event name, data, profile version) events arrive on."""
+
+        events = queue.Queue(PREFETCH_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(user_key, set()).add(events)
+        return events
+
+    def unsubscribe(self, user_key, events):
+        """Closes an event stream opened by subscribe()."""
+
+        with self._lock:
+            streams = self._subscribers.get(user_key)
+            if streams is not None:
+                streams.discard(events)
+                if not streams:
+                    del self._subscribers[user_key]
+
+    def refresh(self, user_key):
+        """Fetches and stores a new snapshot for an active user. Returns True if it succeeded."""
+
+        with self._lock:
+            entry = self._active.get(user_key)
+            if entry is None:
+                return False
+            entry["attempted"] = time.time()
+            session_factory = entry["session_factory"]
+
+        try:
+            session = session_factory()
+            if session is None:
+                with self._lock:
+                    self._active.pop(user_key, None)
+                return False
+            snapshot = self.fetch(session, self._snapshots.get(user_key))
+        except Exception as e:
+            print(f"Warning: Background profile refresh failed for {user_key}: {e}")
+            snapshot = None
+
+        if not snapshot or not snapshot.get("profile"):
+            with self._lock:
+                self.failed += 1
+            return False
+        self.store(user_key, snapshot)
+        with self._lock:
+            self.refreshed += 1
+        return True
+
+    def refresh_if_stale(self, user_key):
+        """Schedules a background refresh for the user now if their snapshot is older than the refresh interval."""
+
+        if self.enabled and user_key in self._active and self.snapshot(user_key, max_age=self.interval) is None:
+            self._schedule(user_key)
+
+    def _schedule(self, user_key):
+        """Submits a refresh to the worker pool, unless one for the user is already waiting or running."""
+
+        with self._lock:
+            entry = self._active.get(user_key)
+            if entry is None or entry.get("in_flight"):
+                return
+            entry["in_flight"] = True
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="profile-prefetch")
+
+        def run():
+            try:
+                self.refresh(user_key)
+            finally:
+                with self._lock:
+                    if user_key in self._active:
+                        self._active[user_key]["in_flight"] = False
+
+        self._executor.submit(run)
+
+    def refresh_due(self):
+        """Forgets users inactive for longer than the active window and schedules a refresh for everyone else due one."""
+
+        now = time.time()
+        with self._lock:
+            for user_key in [key for key, entry in self._active.items() if now - entry["seen"] > self.active_window and key not in self._subscribers]:
+                del self._active[user_key]
+            due = [key for key, entry in self._active.items() if now - entry["attempted"] >= self.interval]
+        for user_key in due:
+            self._schedule(user_key)
+
+    def _refresh_forever(self):
+        """Body of the scheduler thread."""
+
+        while True:
+            try:
+                self.refresh_due()
+            except Exception as e:
+                print(f"Warning: Profile prefetch scheduling failed: {e}")
+            time.sleep(min(PREFETCH_TICK, self.interval))
+
+    def start(self):
+        """
+        Starts the scheduler and worker pool for this process, once. Safe to call on every request: threads don't
+        survive fork, so each Gunicorn worker starts its own the first time it's called there.
+        """
+
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._scheduler_pid == os.getpid():
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="profile-prefetch")
+            for entry in self._active.values():
+                entry["in_flight"] = False
+            threading.Thread(target=self._refresh_forever, name="profile-prefetch-scheduler", daemon=True).start()
+            self._scheduler_pid = os.getpid()
+
+    def stats(self):
+        """Returns refresh and event counters, and how many users are active and listening."""
+
+        with self._lock:
+            return {
+                "refreshed": self.refreshed,
+                "failed": self.failed,
+                "published": self.published,
+                "dropped": self.dropped,
+                "active_users": len(self._active),
+                "open_streams": sum(len(streams) for streams in self._subscribers.values())
+            }
@@ -0,0 +1,267 @@
+# Importing necessary libraries
+import heapq
+import itertools
+import os
+import random
+import re
+import threading
+import time
+
+# --- Constants & Configuration ---
+
+# Priorities for queued requests; lower runs first. Interactive dashboard loads always beat background refreshes.
+INTERACTIVE = 0
+BACKGROUND = 10
+
+# Starting / maximum request rates (requests per second) per API key, and per endpoint family within it.
+API_RATE_LIMIT = float(os.getenv("API_RATE_LIMIT", "20"))
+API_FAMILY_RATE_LIMIT = float(os.getenv("API_FAMILY_RATE_LIMIT", "10"))
+
+# Floor the adaptive rate never drops below, how much a throttle cuts it, and how much of the maximum rate is
+# recovered per second of successful calls. Recovery slows to a quarter near the rate we were last throttled at.
+MIN_RATE = 0.5
+RATE_BACKOFF_FACTOR = 0.7
+RATE_RECOVERY_PER_SECOND = 0.02
+
+# Largest burst a bucket allows, in seconds' worth of its current rate. Bungie's windows punish bursts, so keep it small.
+BURST_SECONDS = 0.25
+
+# Retry policy for throttled or transiently failing calls.
+API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "3"))
+API_BACKOFF_BASE = float(os.getenv("API_BACKOFF_BASE", "0.5"))
+
+# Bungie PlatformErrorCodes that mean "slow down".
+THROTTLE_ERROR_CODES = {
+    36,    # ThrottleLimitExceeded
+    37,    # ThrottleLimitExceededMinutes
+    38,    # ThrottleLimitExceededMomentarily
+    39,    # ThrottleLimitExceededSeconds
+    51,    # PerEndpointRequestThrottleExceeded
+    1672   # DestinyThrottledByGameServer
+}
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Bungie also reports throttling with HTTP 200 and an envelope holding only ErrorCode / ThrottleSeconds. Successful
+# bodies up to this size are checked for that; anything larger carries a real Response and isn't parsed twice.
+THROTTLE_BODY_MAX_BYTES = 8192
+
+
+def endpoint_family(url):
+    """
+    Groups a Bungie API URL by its non-numeric path segments, e.g.
+    ".../Platform/Destiny2/3/Profile/4611686018/?components=200" -> "Destiny2/Profile".
+    """
+
+    path = url.split('?', 1)[0].split('/Platform/', 1)[-1]
+    segments = [segment for segment in path.split('/') if segment and not re.fullmatch(r'-?\d+', segment)]
+    return "/".join(segments) or "root"
+
+
+class TokenBucket:
+    """
+    Token bucket whose refill rate adapts: cut when Bungie throttles us, crept back up while calls succeed.
+    Not thread-safe on its own; RequestScheduler guards it.
+    """
+
+    def __init__(self, max_rate):
+        self.max_rate = max_rate
+        self.rate = max_rate
+        self.tokens = max(max_rate * BURST_SECONDS, 1.0)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.throttled_at_rate = None
+        self.last_adjusted = self.updated
+
+    def _refill(self, now):
+        """Adds the tokens earned since the last refill. Bursts are capped at BURST_SECONDS worth at the current rate."""
+
+        self.tokens = min(max(self.rate * BURST_SECONDS, 1.0), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until a token is available (0 if one is available now)."""
+
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        """Consumes one token."""
+
+        self.tokens -= 1
+
+    def throttled(self, now, throttle_seconds):
+        """Backs off: cuts the rate and stops handing out tokens for throttle_seconds (none accrue during the pause)."""
+
+        self.throttled_at_rate = self.rate
+        self.rate = max(MIN_RATE, self.rate * RATE_BACKOFF_FACTOR)
+        self.last_adjusted = now
+        self.tokens = min(self.tokens, 0)
+        self.paused_until = max(self.paused_until, now + throttle_seconds)
+        self.updated = max(self.updated, self.paused_until)
+
+    def succeeded(self, now):
+        """Additive increase back towards max_rate, proportional to the time since the last adjustment."""
+
+        step = self.max_rate * RATE_RECOVERY_PER_SECOND * (now - self.last_adjusted)
+        if self.throttled_at_rate and self.rate > 0.9 * self.throttled_at_rate:
+            step /= 4
+        self.rate = min(self.max_rate, self.rate + step)
+        self.last_adjusted = now
+
+
+def throttle_seconds_of(response, stream=False):
+    """
+    Returns how long Bungie asked us to back off, or None if the response isn't a throttle/transient failure.
+    Reads ErrorCode / ThrottleSeconds from the body (error responses, and successful ones small enough to be a bare
+    envelope) and falls back to Retry-After. With stream=True a successful body is only read if Content-Length says
+    it is that small, so large streamed bodies stay unread.
+    """
+
+    if response.status_code < 400:
+        length = response.headers.get('Content-Length')
+        if length is not None and length.isdigit():
+            if int(length) > THROTTLE_BODY_MAX_BYTES:
+                return None
+        elif stream or len(response.content) > THROTTLE_BODY_MAX_BYTES:
+            return None
+
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    if not isinstance(body, dict):
+        body = {}
+
+    throttled = body.get('ErrorCode') in THROTTLE_ERROR_CODES or response.status_code in RETRYABLE_STATUS_CODES
+    if not throttled:
+        return None
+
+    seconds = body.get('ThrottleSeconds') or response.headers.get('Retry-After') or 0
+    try:
+        return float(seconds)
+    except ValueError:
+        return 0.0
+
+
+class RequestScheduler:
+    """
+    Sends every Bungie call through per-API-key and per-endpoint-family token buckets.
+    Waiting requests are released in (priority, arrival) order, so interactive loads jump ahead of background work.
+    Throttle responses pause and slow down the affected buckets and are retried with jittered exponential backoff.
+    """
+
+    def __init__(self, rate_limit=API_RATE_LIMIT, family_rate_limit=API_FAMILY_RATE_LIMIT, max_retries=API_MAX_RETRIES):
+        self.rate_limit = rate_limit
+        self.family_rate_limit = family_rate_limit
+        self.max_retries = max_retries
+
+        self._buckets = {}
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+        self.sent = 0
+        self.throttled = 0
+        self.retries = 0
+
+    def _bucket(self, key, max_rate):
+        """Returns the bucket for a key, creating it on first use."""
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(max_rate)
+        return bucket
+
+    def _buckets_for(self, api_key, family):
+        """Returns the (API key, endpoint family) pair of buckets a request must take a token from."""
+
+        return (self._bucket((api_key, None), self.rate_limit), self._bucket((api_key, family), self.family_rate_limit))
+
+    def acquire(self, api_key, family, priority=INTERACTIVE):
+        """
+        Blocks until this request may be sent. Among waiters whose buckets have tokens, the one with the lowest
+        (priority, arrival) goes first.
+        """
+
+        with self._condition:
+            waiter = (priority, next(self._sequence), api_key, family)
+            heapq.heappush(self._waiters, waiter)
+            try:
+                while True:
+                    now = time.monotonic()
+                    soonest = None
+                    for candidate in sorted(self._waiters):
+                        waits = [bucket.wait_time(now) for bucket in self._buckets_for(candidate[2], candidate[3])]
+                        ready_in = max(waits)
+                        if ready_in == 0:
+                            if candidate is waiter:
+                                for bucket in self._buckets_for(api_key, family):
+                                    bucket.take()
+                                return
+                            # Someone ahead of us is ready; let them go first.
+                            soonest = 0
+                            break
+                        soonest = ready_in if soonest is None else min(soonest, ready_in)
+                    self._condition.wait(timeout=soonest if soonest else 0.05)
+            finally:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+    def report(self, api_key, family, throttle_seconds):
+        """Feeds a call's outcome back into its buckets. throttle_seconds is None on success."""
+
+        with self._condition:
+            now = time.monotonic()
+            for bucket in self._buckets_for(api_key, family):
+                if throttle_seconds is None:
+                    bucket.succeeded(now)
+                else:
+                    bucket.throttled(now, throttle_seconds)
+            self._condition.notify_all()
+
+    def send(self, session, url, headers=None, params=None, priority=INTERACTIVE, stream=False):
+        """
+        Performs session.get() under the rate limits, retrying throttled / transient failures.
+        Returns the final response (which may still be an error once retries run out). With stream=True the body of a
+        successful response is left unread, for incremental parsing.
+        """
+
+        api_key = (headers or {}).get('X-API-KEY')
+        family = endpoint_family(url)
+
+        for attempt in range(self.max_retries + 1):
+            self.acquire(api_key, family, priority)
+            response = session.get(url=url, headers=headers, params=params, stream=stream)
+            throttle_seconds = throttle_seconds_of(response, stream)
+            retry = throttle_seconds is not None and attempt < self.max_retries
+            with self._condition:
+                self.sent += 1
+                if throttle_seconds is not None:
+                    self.throttled += 1
+                if retry:
+                    self.retries += 1
+
+            self.report(api_key, family, throttle_seconds)
+            if not retry:
+                return response
+
+            # Hands the connection back to the pool now; a streamed body would otherwise keep it until GC.
+            response.close()
+            # Jittered exponential backoff on top of the pause Bungie asked for (enforced by the buckets).
+            time.sleep(random.uniform(0, API_BACKOFF_BASE * 2 ** attempt))
+
+        return response
+
+    def stats(self):
+        """Returns request counters and the current adaptive rate of every bucket."""
+
+        with self._condition:
+            return {
+                "sent": self.sent,
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "rates": {f"{key[1] or '*'}": round(bucket.rate, 2) for key, bucket in self._buckets.items()}
+            }
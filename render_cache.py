@@ -0,0 +1,65 @@
+# Importing necessary libraries
+import os
+import threading
+
+from api_cache import MemoryCacheBackend
+
+# --- Constants & Configuration ---
+
+# How many rendered fragments each process keeps (roughly three per signed-in account).
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "2048"))
+
+# "0" turns fragment caching off, so every view renders from scratch.
+RENDER_CACHE_ENABLED = os.getenv("RENDER_CACHE_ENABLED", "1") == "1"
+
+
+class FragmentCache:
+    """
+    LRU of rendered HTML fragments (e.g. one character's card), keyed by something like (membership id, character id).
+    Each key holds one fragment together with the version it was rendered from, such as the profile's
+    responseMintedTimestamp and the manifest version. A lookup with any other version is a miss and drops the stale
+    fragment, so a newer profile invalidates what was rendered from the old one.
+    """
+
+    def __init__(self, max_entries=RENDER_CACHE_SIZE, enabled=RENDER_CACHE_ENABLED):
+        self.enabled = enabled
+        self._entries = MemoryCacheBackend(max_entries)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key, version):
+        """Returns the fragment cached for key if it was rendered from this version, otherwise None."""
+
+        if not self.enabled or version is None:
+            return None
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] != version:
+            self._entries.delete(key)
+            with self._lock:
+                self.invalidations += 1
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry[1] if entry is not None else None
+
+    def set(self, key, version, html):
+        """Stores a fragment rendered from the given version. Nothing is cached without a version."""
+
+        if self.enabled and version is not None:
+            self._entries.set(key, (version, html))
+
+    def clear(self):
+        """Drops every fragment."""
+
+        self._entries.clear()
+
+    def stats(self):
+        """Returns hit, miss and invalidation counts."""
+
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "invalidations": self.invalidations}
@@ -0,0 +1,312 @@
+# Importing necessary libraries
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from requests_oauthlib import OAuth2Session
+from http_client import configure_session
+from file_lock import FileLock
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # Optional: without it tokens are never written to disk
+    Fernet = None
+    InvalidToken = ValueError
+
+# --- Constants & Configuration ---
+
+# Encrypted file holding every stored token, keyed by Bungie.net membership id (or "cli" for the command line app).
+TOKEN_STORE_PATH = os.getenv("TOKEN_STORE_PATH", "oauth_tokens.enc")
+
+# Secret the store's encryption key is derived from. Falls back to CLIENT_SECRET when unset.
+TOKEN_STORE_SECRET = os.getenv("TOKEN_STORE_SECRET")
+
+# Access tokens expiring within this many seconds are refreshed ahead of time, and how often the background
+# refresher looks for them.
+TOKEN_REFRESH_MARGIN = int(os.getenv("TOKEN_REFRESH_MARGIN", "600"))
+TOKEN_REFRESH_INTERVAL = int(os.getenv("TOKEN_REFRESH_INTERVAL", "120"))
+
+# The background refresher only refreshes the tokens of users this process handed a session to within this many
+# seconds; everyone else is refreshed on their next request.
+TOKEN_ACTIVE_WINDOW = int(os.getenv("TOKEN_ACTIVE_WINDOW", "3600"))
+
+# Fixed salt for the key derivation; the secret itself is what protects the store.
+KEY_DERIVATION_SALT = b"conflux-token-store"
+KEY_DERIVATION_ROUNDS = 200000
+
+
+def derive_key(secret):
+    """Derives a Fernet key from an arbitrary secret string."""
+
+    raw_key = hashlib.pbkdf2_hmac('sha256', secret.encode('utf-8'), KEY_DERIVATION_SALT, KEY_DERIVATION_ROUNDS)
+    return base64.urlsafe_b64encode(raw_key)
+
+
+def with_expiry(token, now=None):
+    """
+    Returns the token with absolute expires_at / refresh_expires_at timestamps filled in from Bungie's relative
+    expires_in / refresh_expires_in, so stored tokens can be checked after a restart.
+    """
+
+    now = now or time.time()
+    token = dict(token)
+    if 'expires_at' not in token and 'expires_in' in token:
+        token['expires_at'] = now + float(token['expires_in'])
+    if 'refresh_expires_at' not in token and 'refresh_expires_in' in token:
+        token['refresh_expires_at'] = now + float(token['refresh_expires_in'])
+    return token
+
+
+class TokenStore:
+    """
+    OAuth tokens encrypted at rest (Fernet) in a single file shared by every process, keyed by membership.
+    Writes take a file lock and replace the file atomically. The decrypted contents are kept in memory until the file
+    changes, so loads don't decrypt the whole store each time. Disabled (every load misses, saves are dropped) when
+    the cryptography package or a secret is missing, so tokens are never written in plain text.
+    """
+
+    def __init__(self, path=TOKEN_STORE_PATH, secret=None):
+        self.path = path
+        secret = secret or TOKEN_STORE_SECRET or os.getenv("CLIENT_SECRET")
+        self.enabled = Fernet is not None and bool(secret)
+        self._fernet = Fernet(derive_key(secret)) if self.enabled else None
+        self._cache = None
+        self._cache_stamp = None
+        self._cache_lock = threading.Lock()
+        if Fernet is None:
+            print("Warning: cryptography is not installed; OAuth tokens will not be persisted.")
+
+    def lock(self):
+        """Returns the cross-process lock guarding the store (and token refreshes)."""
+
+        return FileLock(self.path + ".lock")
+
+    def _stamp(self):
+        """Identifies the current version of the store file (it is only ever replaced, never written in place)."""
+
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _read(self):
+        """
+        Returns every stored token (a copy the caller may change), or an empty dict if the store is missing or can't be
+        decrypted. The file is only decrypted again once another write has replaced it.
+        """
+
+        if not self.enabled:
+            return {}
+        stamp = self._stamp()
+        if stamp is None:
+            return {}
+        with self._cache_lock:
+            if stamp != self._cache_stamp:
+                try:
+                    with open(self.path, 'rb') as f:
+                        self._cache = json.loads(self._fernet.decrypt(f.read()))
+                except (OSError, InvalidToken, ValueError) as e:
+                    print(f"Warning: Could not read the token store, ignoring it: {e}")
+                    self._cache = {}
+                self._cache_stamp = stamp
+            return {key: dict(token) for key, token in self._cache.items()}
+
+    def _write(self, tokens):
+        """Encrypts and atomically replaces the store. Callers hold the lock."""
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".tokens-", dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(self._fernet.encrypt(json.dumps(tokens).encode('utf-8')))
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._cache_lock:
+            self._cache = {key: dict(token) for key, token in tokens.items()}
+            self._cache_stamp = self._stamp()
+
+    def load(self, key):
+        """Returns the stored token for key, or None."""
+
+        return self._read().get(str(key))
+
+    def items(self):
+        """Returns a list of (key, token) for every stored token."""
+
+        return list(self._read().items())
+
+    def save(self, key, token):
+        """Stores (or replaces) the token for key."""
+
+        if not self.enabled:
+            return
+        with self.lock():
+            tokens = self._read()
+            tokens[str(key)] = with_expiry(token)
+            self._write(tokens)
+
+    def delete(self, key):
+        """Forgets the token for key, e.g. when its refresh token has been revoked."""
+
+        if not self.enabled:
+            return
+        with self.lock():
+            tokens = self._read()
+            if tokens.pop(str(key), None) is not None:
+                self._write(tokens)
+
+
+class OAuthTokens:
+    """
+    Hands out OAuth2Sessions backed by a TokenStore. Sessions refresh themselves when a call finds the access token
+    expired, and a background thread refreshes the tokens of recently active users TOKEN_REFRESH_MARGIN seconds
+    before they expire, so requests normally never wait on a refresh. The token endpoint is called outside the store
+    lock (with the shared client's timeouts), one refresh per key at a time in a process; the stored token is
+    re-checked before and after, so a worker that lost the race to another one takes the token that one stored.
+    """
+
+    def __init__(self, store, token_url, client_id, client_secret):
+        self.store = store
+        self.token_url = token_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refreshed = 0
+        self._last_used = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self._refresher_pid = None
+        self._refresher_lock = threading.Lock()
+
+    def _refresh_kwargs(self):
+        """Client credentials Bungie expects in the refresh request body."""
+
+        return {"client_id": self.client_id, "client_secret": self.client_secret}
+
+    def session_for(self, key, token=None):
+        """
+        Returns an auto-refreshing OAuth2Session for the stored token of key (or the given token), or None if there is
+        no usable token. A token about to expire is refreshed before the session is returned.
+        """
+
+        token = token or self.store.load(key)
+        if not token:
+            return None
+        with self._lock:
+            self._last_used[str(key)] = time.time()
+        if token.get('expires_at', 0) - time.time() < TOKEN_REFRESH_MARGIN:
+            # A token that can't be refreshed is still usable until it actually expires.
+            token = self.refresh(key, token) or (token if token.get('expires_at', 0) > time.time() else None)
+            if not token:
+                return None
+        return OAuth2Session(
+            client_id=self.client_id,
+            token=token,
+            auto_refresh_url=self.token_url,
+            auto_refresh_kwargs=self._refresh_kwargs(),
+            token_updater=lambda new_token: self.store.save(key, new_token)
+        )
+
+    def _key_lock(self, key):
+        """Returns the in-process lock serializing refreshes of one key."""
+
+        with self._lock:
+            return self._key_locks.setdefault(str(key), threading.Lock())
+
+    def _stored(self, key):
+        """Returns the stored token for key (None with the store disabled). Callers hold the store lock."""
+
+        return self.store._read().get(str(key)) if self.store.enabled else None
+
+    def refresh(self, key, token=None):
+        """
+        Exchanges the refresh token for a new token and stores it. Returns the new token (or one another worker
+        stored meanwhile), or None if the refresh token is missing, expired or rejected.
+        """
+
+        with self._key_lock(key):
+            with self.store.lock():
+                token = self._stored(key) or token
+            if not token:
+                return None
+            # Another thread or worker may have refreshed it already.
+            if token.get('expires_at', 0) - time.time() >= TOKEN_REFRESH_MARGIN:
+                return token
+            if not token.get('refresh_token') or token.get('refresh_expires_at', float('inf')) <= time.time():
+                return None
+
+            try:
+                session = configure_session(OAuth2Session(client_id=self.client_id, token=token))
+                new_token = with_expiry(session.refresh_token(self.token_url, **self._refresh_kwargs()))
+            except Exception as e:
+                new_token = None
+                print(f"Warning: Could not refresh the OAuth token for {key}: {e}")
+
+            with self.store.lock():
+                stored = self._stored(key)
+                # A worker that refreshed first has spent the refresh token we sent; its token is the one to use.
+                if stored and stored.get('refresh_token') != token.get('refresh_token') and stored.get('expires_at', 0) > time.time():
+                    return stored
+                if new_token is None:
+                    return None
+                if self.store.enabled:
+                    tokens = self.store._read()
+                    tokens[str(key)] = new_token
+                    self.store._write(tokens)
+            with self._lock:
+                self.refreshed += 1
+            return new_token
+
+    def refresh_expiring(self):
+        """
+        Refreshes the stored tokens of users active within TOKEN_ACTIVE_WINDOW that expire within TOKEN_REFRESH_MARGIN.
+        Tokens that have expired and can't be refreshed are dropped, so their users go through the authorization flow
+        again.
+        """
+
+        now = time.time()
+        with self._lock:
+            for key in [key for key, used in self._last_used.items() if now - used > TOKEN_ACTIVE_WINDOW]:
+                del self._last_used[key]
+            active = set(self._last_used)
+
+        for key, token in self.store.items():
+            if token.get('expires_at', 0) - time.time() >= TOKEN_REFRESH_MARGIN:
+                continue
+            refreshable = token.get('refresh_token') and token.get('refresh_expires_at', float('inf')) > time.time()
+            if key in active and refreshable:
+                if not self.refresh(key, token) and token.get('expires_at', 0) <= time.time():
+                    self.store.delete(key)
+            elif not refreshable and token.get('expires_at', 0) <= time.time():
+                self.store.delete(key)
+
+    def _refresh_forever(self):
+        """Body of the background refresher thread."""
+
+        while True:
+            try:
+                self.refresh_expiring()
+            except Exception as e:
+                print(f"Warning: Background token refresh failed: {e}")
+            time.sleep(TOKEN_REFRESH_INTERVAL)
+
+    def start_background_refresh(self):
+        """
+        Starts the background refresher for this process, once. Safe to call on every request: threads don't survive
+        fork, so each Gunicorn worker starts its own the first time it's called there.
+        """
+
+        if not self.store.enabled:
+            return
+        with self._refresher_lock:
+            if self._refresher_pid == os.getpid():
+                return
+            threading.Thread(target=self._refresh_forever, name="token-refresh", daemon=True).start()
+            self._refresher_pid = os.getpid()